@@ -1,10 +1,36 @@
 import requests
-import json
+import async_http
+import http_client
+import metrics
+import profiling
+import shared_snapshot
+import asyncio
 import atexit
+import functools
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from flask import Flask, render_template, jsonify
+from functools import partial
+from flask import Flask, Response, g, render_template, jsonify, request
 from apscheduler.schedulers.background import BackgroundScheduler
+from candle_store import CandleStore, candles_to_records
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from coin_registry import CoinRegistry
+from content_db import ContentDB
+from indicators import IndicatorEngine, outputs_to_lists, parse_specs as parse_indicator_specs
+from kline_cache import KlineCache, interval_ttl
+from leader import LeaderElection
+from kline_transforms import (INTERVAL_SECONDS, bucket_start, downsample, finer_intervals,
+                               parse_duration, records_to_columns, resample)
+from market_cache import SnapshotCache
+from market_stream import MarketBroadcaster, StreamLimitReached, format_sse
+from payloads import SerializedPayload, encode_json, join_json_object
+from providers import AllProvidersFailed, ConcurrencyLimit, Provider, arace, race
+from rate_limit import RateBudget, background
+from tickers import TickerTable
 
 # Configuration - Use environment variables in production, fallback to config.py for local development
 try:
@@ -18,32 +44,486 @@ except ImportError:
 # --- FLASK APP INITIALIZATION ---
 app = Flask(__name__)
 
+def process_start_time():
+    """Wall-clock time this process started, from /proc where available,
+    otherwise now (i.e. when the app module is imported)."""
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the parenthesised command name; starttime is field 22
+            start_ticks = int(f.read().rpartition(')')[2].split()[19])
+        with open('/proc/stat') as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith('btime'))
+        return boot_time + start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, StopIteration, AttributeError):
+        return time.time()
+
+PROCESS_STARTED = process_start_time()
+# Seconds from process start to the first response, set once
+startup_timing = {"first_byte_seconds": None}
+
+def note_first_byte():
+    """Records the first response of the process; called by both serving modes."""
+    if startup_timing["first_byte_seconds"] is None:
+        startup_timing["first_byte_seconds"] = round(time.time() - PROCESS_STARTED, 3)
+        print(f"⏱️ First response {startup_timing['first_byte_seconds']}s after process start")
+
+@app.after_request
+def record_first_byte(response):
+    note_first_byte()
+    return response
+
+# --- METRICS ---
+REQUEST_SECONDS = metrics.REGISTRY.histogram(
+    'cryptopulse_http_request_duration_seconds', 'Time from request to response headers per route',
+    ('route', 'method'))
+REQUESTS = metrics.REGISTRY.counter(
+    'cryptopulse_http_requests_total', 'Responses per route and status', ('route', 'method', 'status'))
+FALLBACK_DATA = metrics.REGISTRY.counter(
+    'cryptopulse_fallback_data_total', 'Simulated datasets generated because every upstream failed',
+    ('dataset',))
+JOB_SECONDS = metrics.REGISTRY.histogram(
+    'cryptopulse_scheduler_job_duration_seconds', 'Scheduled job run time', ('job',),
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+JOB_FAILURES = metrics.REGISTRY.counter(
+    'cryptopulse_scheduler_job_failures_total', 'Scheduled job runs that raised', ('job',))
+
+def observe_request(route, method, status, seconds):
+    """Records one response; `route` is the URL rule, not the raw path."""
+    REQUEST_SECONDS.labels(route, method).observe(seconds)
+    REQUESTS.labels(route, method, status).inc()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        observe_request(route, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
 # --- API ENDPOINTS ---
-BINANCE_API_URL = "https://api.binance.com/api/v3"
-COINGECKO_API_URL = "https://api.coingecko.com/api/v3"
-NEWS_API_URL = "https://newsapi.org/v2/top-headlines"
-PEXELS_API_URL = "https://api.pexels.com/v1/search"
+# Overridable to point the app at a local stand-in such as
+# benchmarks/upstream_sim.py
+BINANCE_API_URL = os.environ.get('BINANCE_API_URL', "https://api.binance.com/api/v3")
+COINGECKO_API_URL = os.environ.get('COINGECKO_API_URL', "https://api.coingecko.com/api/v3")
+NEWS_API_URL = os.environ.get('NEWS_API_URL', "https://newsapi.org/v2/top-headlines")
+PEXELS_API_URL = os.environ.get('PEXELS_API_URL', "https://api.pexels.com/v1/search")
 # Gemini API endpoint
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent" 
+GEMINI_API_URL = os.environ.get(
+    'GEMINI_API_URL', "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent")
+
+# --- TUNING SETTINGS ---
+# How often the background poller refreshes the market snapshot, and the age
+# after which a served snapshot is counted as stale.
+MARKET_POLL_SECONDS = int(os.environ.get('MARKET_POLL_SECONDS', 15))
+MARKET_CACHE_TTL = int(os.environ.get('MARKET_CACHE_TTL', 30))
+
+# Seconds to wait on the primary provider before also starting the next one
+# (0 races all providers immediately).
+PROVIDER_HEDGE_DELAY = float(os.environ.get('PROVIDER_HEDGE_DELAY', 1.0))
+
+# Memory budget for cached kline responses, in megabytes.
+KLINE_CACHE_MB = int(os.environ.get('KLINE_CACHE_MB', 32))
+
+# Most candles one kline request may span; longer ranges need a coarser
+# interval (or max_points to shrink the response).
+MAX_KLINE_CANDLES = int(os.environ.get('MAX_KLINE_CANDLES', 5000))
+
+# Seconds a parsed Binance ticker universe is shared between callers.
+TICKER_TABLE_TTL = int(os.environ.get('TICKER_TABLE_TTL', 10))
+
+# Pending delta events buffered per SSE client before it is dropped as a slow
+# consumer, and seconds between keep-alive comments in the async serving mode.
+STREAM_QUEUE_SIZE = int(os.environ.get('STREAM_QUEUE_SIZE', 32))
+STREAM_KEEPALIVE_SECONDS = int(os.environ.get('STREAM_KEEPALIVE_SECONDS', 15))
+# SSE clients served at once from the request threads, each holding one; the
+# rest are told to poll. Defaults to half of GUNICORN_THREADS. The async
+# serving mode streams without threads and is not capped.
+STREAM_MAX_CLIENTS = int(os.environ.get('STREAM_MAX_CLIENTS',
+                                        max(int(os.environ.get('GUNICORN_THREADS', 8)) // 2, 1)))
+# Seconds a client turned away from the stream should wait before retrying
+STREAM_RETRY_AFTER = 30
+# Seconds between probe comments on an idle stream served from a request
+# thread. A closed connection only shows up as a failed write, and until then
+# it keeps its thread and its STREAM_MAX_CLIENTS slot.
+STREAM_PROBE_SECONDS = int(os.environ.get('STREAM_PROBE_SECONDS', 2))
+
+# Calls allowed in flight at once per upstream, shared by all its providers.
+BINANCE_MAX_CONCURRENCY = int(os.environ.get('BINANCE_MAX_CONCURRENCY', 8))
+COINGECKO_MAX_CONCURRENCY = int(os.environ.get('COINGECKO_MAX_CONCURRENCY', 2))
+
+# Upstream request budgets per minute (Binance counts request weight), and
+# the share of each budget held back for user-triggered fetches.
+BINANCE_WEIGHT_PER_MINUTE = int(os.environ.get('BINANCE_WEIGHT_PER_MINUTE', 4800))
+COINGECKO_CALLS_PER_MINUTE = int(os.environ.get('COINGECKO_CALLS_PER_MINUTE', 25))
+RATE_LIMIT_RESERVE = float(os.environ.get('RATE_LIMIT_RESERVE', 0.2))
+
+# Workers fetching the uncached symbols of batch kline requests, and the most
+# symbols one batch may ask for.
+KLINE_BATCH_WORKERS = int(os.environ.get('KLINE_BATCH_WORKERS', 8))
+KLINE_BATCH_MAX_SYMBOLS = int(os.environ.get('KLINE_BATCH_MAX_SYMBOLS', 50))
+
+# Opt-in profiling, off by default: PROFILE_REQUESTS=true profiles requests
+# sent with `X-Profile: 1` (or ?profile=1) and an `X-Profile-Token` header
+# matching PROFILE_TOKEN, without which it stays off; PROFILE_SAMPLE_MS > 0
+# samples all thread stacks at that period and writes them every
+# PROFILE_DUMP_SECONDS.
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS', 'false').lower() == 'true'
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_SAMPLE_MS = int(os.environ.get('PROFILE_SAMPLE_MS', 0))
+PROFILE_DUMP_SECONDS = int(os.environ.get('PROFILE_DUMP_SECONDS', 60))
+
+# Consecutive failures that open an upstream's circuit breaker, and seconds
+# before a single half-open probe is let through.
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', 3))
+BREAKER_RESET_SECONDS = int(os.environ.get('BREAKER_RESET_SECONDS', 30))
+
+# --- CIRCUIT BREAKERS ---
+BREAKERS = {
+    name: CircuitBreaker(name, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                         reset_timeout=BREAKER_RESET_SECONDS)
+    for name in ("coingecko", "binance", "newsapi", "gemini", "pexels")
+}
+
+# --- UPSTREAM CONCURRENCY LIMITS ---
+UPSTREAM_LIMITS = {
+    "binance": ConcurrencyLimit("binance", BINANCE_MAX_CONCURRENCY),
+    "coingecko": ConcurrencyLimit("coingecko", COINGECKO_MAX_CONCURRENCY),
+}
+
+# --- UPSTREAM RATE BUDGETS ---
+RATE_BUDGETS = {
+    "binance": RateBudget("binance", BINANCE_WEIGHT_PER_MINUTE, reserve=RATE_LIMIT_RESERVE,
+                          used_weight_header='X-MBX-USED-WEIGHT-1M'),
+    "coingecko": RateBudget("coingecko", COINGECKO_CALLS_PER_MINUTE, reserve=RATE_LIMIT_RESERVE),
+}
+
+def binance_request_weight(path, params):
+    """Request weight of a Binance REST call, per the API docs."""
+    if path.endswith('/ticker/24hr'):
+        # All symbols at once is far heavier than a single one
+        return 2 if 'symbol' in params else 80
+    if path.endswith('/klines'):
+        return 2
+    return 1
+
+http_client.register_budget(BINANCE_API_URL, RATE_BUDGETS["binance"], cost=binance_request_weight)
+http_client.register_budget(COINGECKO_API_URL, RATE_BUDGETS["coingecko"])
+
+for name, url in (("binance", BINANCE_API_URL), ("coingecko", COINGECKO_API_URL),
+                  ("newsapi", NEWS_API_URL), ("gemini", GEMINI_API_URL), ("pexels", PEXELS_API_URL)):
+    http_client.register_upstream(url, name)
 
 # --- DATA PERSISTENCE ---
+# Candle history, one directory per symbol and interval
+CANDLE_STORE_DIR = os.environ.get('CANDLE_STORE_DIR', 'candles')
+KLINE_INTERVAL_SECONDS = INTERVAL_SECONDS
+# Default number of candles when no range is requested
+KLINE_DEFAULT_CANDLES = 100
+candle_store = CandleStore(CANDLE_STORE_DIR)
+
+# Rendered kline responses, keyed by (symbol, interval, candles, max_points)
+kline_cache = KlineCache(max_bytes=KLINE_CACHE_MB * 1024 * 1024)
+# Fetches the uncached symbols of batch kline requests
+kline_batch_pool = ThreadPoolExecutor(max_workers=KLINE_BATCH_WORKERS, thread_name_prefix="kline-batch")
+KLINE_DEGRADED_TTL = 30
+
+# Indicator results per (symbol, interval, indicator, params), extended in
+# place as new candles arrive
+indicator_engine = IndicatorEngine()
+
+# Articles and news history live in SQLite; data.json is the legacy format
+# and is imported once on first start.
 DATA_FILE = "data.json"
+CONTENT_DB_FILE = os.environ.get('CONTENT_DB_FILE', 'content.db')
+
+content_db = ContentDB(CONTENT_DB_FILE)
+content_db.migrate_from_json(DATA_FILE)
+
+# Last real market snapshot, memory-mapped by worker processes that do not
+# poll and served on startup until the first refresh
+MARKET_SNAPSHOT_FILE = os.environ.get('MARKET_SNAPSHOT_FILE', 'market_snapshot.bin')
+
+# Lock file electing the one worker process that runs the background jobs
+SCHEDULER_LOCK_FILE = os.environ.get('SCHEDULER_LOCK_FILE', 'scheduler.lock')
+
+# Directory where worker processes share their metrics so any of them can
+# answer /metrics for the whole server; unset in a single process
+METRICS_DIR = os.environ.get('METRICS_DIR')
+
+# Saved request profiles and collapsed stack samples
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+# CoinGecko's coin list for symbol -> id lookups and search. Loaded in the
+# background at startup and refreshed once a day; until the first load
+# finishes, lookups are answered from the major coins below.
+COIN_REGISTRY_FILE = os.environ.get('COIN_REGISTRY_FILE', 'coins.json')
+STATIC_COINS = [
+    {'id': coin_id, 'symbol': symbol, 'name': name, 'rank': None}
+    for symbol, coin_id, name in [
+        ('btc', 'bitcoin', 'Bitcoin'), ('eth', 'ethereum', 'Ethereum'),
+        ('bnb', 'binancecoin', 'BNB'), ('xrp', 'ripple', 'XRP'),
+        ('ada', 'cardano', 'Cardano'), ('sol', 'solana', 'Solana'),
+        ('doge', 'dogecoin', 'Dogecoin'), ('dot', 'polkadot', 'Polkadot'),
+        ('avax', 'avalanche-2', 'Avalanche'), ('ltc', 'litecoin', 'Litecoin'),
+        ('link', 'chainlink', 'Chainlink'), ('atom', 'cosmos', 'Cosmos Hub'),
+        ('xlm', 'stellar', 'Stellar'), ('near', 'near', 'NEAR Protocol'),
+        ('algo', 'algorand', 'Algorand'), ('vet', 'vechain', 'VeChain'),
+        ('icp', 'internet-computer', 'Internet Computer'), ('fil', 'filecoin', 'Filecoin'),
+        ('trx', 'tron', 'TRON'), ('etc', 'ethereum-classic', 'Ethereum Classic'),
+    ]
+]
+coin_registry = CoinRegistry(
+    COIN_REGISTRY_FILE, background(lambda: BREAKERS["coingecko"].call(fetch_coingecko_coin_list)),
+    fallback=STATIC_COINS)
 
 def read_data():
-    try:
-        with open(DATA_FILE, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Return a default structure if the file is missing or corrupt
-        return {"featured_article": {}, "news_articles": []}
+    """Returns the featured article and latest news in the data.json shape."""
+    return content_db.home_document()
+
+def checked_request(method, url, **kwargs):
+    """Performs an HTTP request and raises for error statuses, so breakers see them."""
+    response = http_client.request(method, url, **kwargs)
+    response.raise_for_status()
+    return response
+
+# --- UPSTREAM PROVIDERS ---
+# Each fetch returns data already normalized for the frontend, so any provider
+# in a group can answer a request.
+
+def fetch_coingecko_markets():
+    """Top 100 coins by market cap from CoinGecko, in Binance ticker format."""
+    print("Trying CoinGecko API...")
+    response = http_client.get(
+        f"{COINGECKO_API_URL}/coins/markets",
+        params={
+            'vs_currency': 'usd',
+            'order': 'market_cap_desc',
+            'per_page': 100,
+            'page': 1,
+            'sparkline': False,
+            'price_change_percentage': '24h'
+        }
+    )
+    response.raise_for_status()
+    formatted_data = format_coingecko_markets(response.json())
+
+    print(f"✅ CoinGecko API success: {len(formatted_data)} coins")
+    return formatted_data
+
+def format_coingecko_markets(coingecko_data):
+    """Converts a CoinGecko /coins/markets response to our expected format."""
+    formatted_data = []
+    for coin in coingecko_data:
+        formatted_data.append({
+            'symbol': f"{coin['symbol'].upper()}USDT",
+            'lastPrice': f"{coin['current_price']:.6f}",
+            'priceChangePercent': f"{coin.get('price_change_percentage_24h', 0):.2f}",
+            'volume': f"{coin.get('total_volume', 0):.0f}",
+            'quoteVolume': f"{coin.get('market_cap', 0):.0f}",
+            'weightedAvgPrice': f"{coin['current_price']:.6f}"
+        })
+    return formatted_data
+
+_ticker_table_lock = threading.Lock()
+_ticker_table = {"table": None, "fetched_at": 0.0}
+
+def fetch_binance_tickers():
+    """24hr ticker statistics for every Binance symbol as a TickerTable. The
+    parsed table is shared by all callers for TICKER_TABLE_TTL seconds."""
+    with _ticker_table_lock:
+        if _ticker_table["table"] is not None and time.monotonic() - _ticker_table["fetched_at"] < TICKER_TABLE_TTL:
+            return _ticker_table["table"]
+
+    response = http_client.get(f"{BINANCE_API_URL}/ticker/24hr")
+    response.raise_for_status()
+    table = TickerTable.from_payload(response.json())
+
+    with _ticker_table_lock:
+        _ticker_table["table"] = table
+        _ticker_table["fetched_at"] = time.monotonic()
+    return table
+
+def fetch_binance_markets():
+    """Top 100 USDT pairs by quote volume from Binance."""
+    print("Trying Binance API...")
+    top_pairs = binance_top_pairs(fetch_binance_tickers())
+
+    print(f"✅ Binance API success: {len(top_pairs)} coins")
+    return top_pairs
+
+def binance_top_pairs(tickers):
+    """Filters a TickerTable for USDT pairs and takes the top 100 by volume."""
+    return tickers.filter_quote('USDT').top_k('quoteVolume', 100).records()
+
+def fetch_coingecko_coin_list():
+    """Every CoinGecko coin's id, symbol and name, with market-cap ranks for
+    the top 250."""
+    coins = checked_request('GET', f"{COINGECKO_API_URL}/coins/list").json()
+    markets = checked_request('GET', f"{COINGECKO_API_URL}/coins/markets", params={
+        'vs_currency': 'usd',
+        'order': 'market_cap_desc',
+        'per_page': 250,
+        'page': 1,
+    }).json()
+    ranks = {coin['id']: coin.get('market_cap_rank') for coin in markets}
+    return [
+        {'id': coin['id'], 'symbol': coin['symbol'], 'name': coin['name'], 'rank': ranks.get(coin['id'])}
+        for coin in coins
+    ]
 
-def write_data(data):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+# Kline fetches are written as fetch plans (see http_client) so the same code
+# runs on the sync client and, in the async serving mode, on async_http.
+
+def coingecko_ohlc_plan(symbol, days=100):
+    """OHLC candles covering the last `days` days for a symbol from CoinGecko."""
+    coin_id = coin_registry.resolve(symbol)
+    if coin_id is None:
+        raise LookupError(f"no CoinGecko id for {symbol}")
+
+    ohlc_data = yield f"{COINGECKO_API_URL}/coins/{coin_id}/ohlc", {'vs_currency': 'usd', 'days': days}
+
+    # Format for TradingView Lightweight Charts
+    formatted_data = []
+    for candle in ohlc_data:
+        formatted_data.append({
+            "time": int(candle[0] / 1000),  # timestamp in seconds
+            "open": float(candle[1]),
+            "high": float(candle[2]),
+            "low": float(candle[3]),
+            "close": float(candle[4])
+        })
+
+    print(f"✅ CoinGecko chart data success: {len(formatted_data)} candles")
+    return formatted_data
+
+def binance_klines_plan(symbol, interval='1d', limit=100, start_time=None):
+    """Candles for a symbol's USDT pair from Binance, optionally only those
+    opening at or after `start_time` (seconds)."""
+    params = {
+        'symbol': f"{symbol}USDT",
+        'interval': interval,
+        'limit': limit
+    }
+    if start_time is not None:
+        params['startTime'] = start_time * 1000
+    klines = yield f"{BINANCE_API_URL}/klines", params
+
+    formatted_data = [
+        {
+            "time": int(k[0] / 1000),
+            "open": float(k[1]),
+            "high": float(k[2]),
+            "low": float(k[3]),
+            "close": float(k[4]),
+            "volume": float(k[5])
+        } for k in klines
+    ]
+
+    print(f"✅ Binance chart data success: {len(formatted_data)} candles")
+    return formatted_data
+
+# Most candles Binance returns per /klines request
+BINANCE_KLINE_PAGE = 1000
+
+def binance_kline_window_plan(symbol, interval, start_time):
+    """All candles opening at or after `start_time`, paging through Binance's
+    per-request limit."""
+    candles = []
+    while True:
+        page = yield from binance_klines_plan(symbol, interval, BINANCE_KLINE_PAGE, start_time=start_time)
+        candles.extend(page)
+        if len(page) < BINANCE_KLINE_PAGE:
+            return candles
+        start_time = page[-1]['time'] + KLINE_INTERVAL_SECONDS[interval]
+
+def kline_window_start(interval, limit):
+    """Open time of the oldest of the newest `limit` candles."""
+    current = int(bucket_start(int(time.time()), interval))
+    return current - (limit - 1) * KLINE_INTERVAL_SECONDS[interval]
+
+def stored_klines_window(symbol, interval, limit):
+    """`(series, start, fetch_from)`: the stored series, the open time its
+    window starts at, and where its Binance top-up must start."""
+    series = candle_store.series(symbol, interval)
+    start = kline_window_start(interval, limit)
+    return series, start, series.top_up_start(start)
+
+def coingecko_klines_plan(symbol, interval='1d', limit=100):
+    """CoinGecko OHLC as candle columns. Only used for daily charts, since its
+    candle size follows the requested range rather than an interval."""
+    days = -(-limit * KLINE_INTERVAL_SECONDS[interval] // 86400)
+    return records_to_columns((yield from coingecko_ohlc_plan(symbol, days=days)))
+
+def fetch_stored_klines(symbol, interval='1d', limit=100):
+    """Candle columns from the local candle store, topped up from Binance with
+    only the candles newer than the last one stored."""
+    series, start, fetch_from = stored_klines_window(symbol, interval, limit)
+    candles = http_client.run_plan(binance_kline_window_plan(symbol, interval, fetch_from))
+    return series.merge(candles, fetch_from, start=start)
+
+async def afetch_stored_klines(symbol, interval='1d', limit=100):
+    """fetch_stored_klines() with the store's disk work on worker threads, so
+    only the upstream requests are awaited on the event loop."""
+    series, start, fetch_from = await asyncio.to_thread(stored_klines_window, symbol, interval, limit)
+    candles = await async_http.run_plan(binance_kline_window_plan(symbol, interval, fetch_from))
+    return await asyncio.to_thread(series.merge, candles, fetch_from, start=start)
+
+def fetch_coingecko_klines(symbol, interval='1d', limit=100):
+    return http_client.run_plan(coingecko_klines_plan(symbol, interval, limit))
+
+async def afetch_coingecko_klines(symbol, interval='1d', limit=100):
+    return await async_http.run_plan(coingecko_klines_plan(symbol, interval, limit))
+
+def read_resampled_klines(symbol, interval, limit):
+    """Builds the newest `limit` candles from a finer stored series that
+    already covers them and is up to date. Returns `(columns, finer)`, or
+    None if no stored series qualifies."""
+    start = kline_window_start(interval, limit)
+    now = time.time()
+    for finer in finer_intervals(interval):
+        series = candle_store.series(symbol, finer)
+        first_time, last_time = series.first_time(), series.last_time()
+        if first_time is None or first_time > start:
+            continue
+        if now - last_time > 2 * KLINE_INTERVAL_SECONDS[finer]:
+            continue
+        return resample(series.read(start=start), interval), finer
+    return None
+
+# Provider groups, in order of preference
+MARKET_PROVIDERS = [
+    Provider("coingecko", fetch_coingecko_markets, breaker=BREAKERS["coingecko"],
+             limit=UPSTREAM_LIMITS["coingecko"]),
+    Provider("binance", fetch_binance_markets, breaker=BREAKERS["binance"],
+             limit=UPSTREAM_LIMITS["binance"]),
+]
+# Binance candles are persisted and refreshed incrementally. CoinGecko's OHLC
+# granularity depends on the requested range, so its candles are served as-is,
+# never stored, and only raced for daily charts.
+KLINE_PROVIDERS = [
+    Provider("binance", fetch_stored_klines, breaker=BREAKERS["binance"],
+             limit=UPSTREAM_LIMITS["binance"], afetch=afetch_stored_klines),
+    Provider("coingecko", fetch_coingecko_klines, breaker=BREAKERS["coingecko"],
+             limit=UPSTREAM_LIMITS["coingecko"], afetch=afetch_coingecko_klines),
+]
+BINANCE_TICKERS = Provider("binance", fetch_binance_tickers, breaker=BREAKERS["binance"],
+                           limit=UPSTREAM_LIMITS["binance"])
+
+def kline_providers(symbol, interval):
+    """Kline providers worth racing; CoinGecko only for daily charts of
+    coins the registry knows, so unknown symbols cost no upstream call."""
+    if interval == '1d' and coin_registry.resolve(symbol) is not None:
+        return KLINE_PROVIDERS
+    return KLINE_PROVIDERS[:1]
 
 # --- AUTOMATED TASKS (SCHEDULER) ---
 
 # Task 1: Fetch trending news articles
+@background
 def fetch_latest_news():
     print(f"[{datetime.now()}] Running scheduled task: Fetching news...")
     params = {
@@ -54,36 +534,37 @@ def fetch_latest_news():
         'pageSize': 10 
     }
     try:
-        response = requests.get(NEWS_API_URL, params=params)
-        response.raise_for_status()
+        response = BREAKERS["newsapi"].call(checked_request, "GET", NEWS_API_URL, params=params)
         news_data = response.json().get('articles', [])
         
         # Format and save news
-        current_data = read_data()
-        current_data['news_articles'] = [
-            {
-                "source": article['source']['name'],
-                "title": article['title'],
-                "url": article['url'],
-                "image_url": article.get('urlToImage', 'https://via.placeholder.com/150'),
-                "published_at": article['publishedAt']
-            } for article in news_data
-        ]
-        write_data(current_data)
+        content_db.add_news(format_news_articles(news_data))
         print("News fetching completed successfully.")
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, CircuitOpenError) as e:
         print(f"Error fetching news: {e}")
 
+def format_news_articles(news_data):
+    """Converts NewsAPI articles to the stored news shape."""
+    return [
+        {
+            "source": article['source']['name'],
+            "title": article['title'],
+            "url": article['url'],
+            "image_url": article.get('urlToImage', 'https://via.placeholder.com/150'),
+            "published_at": article['publishedAt']
+        } for article in news_data
+    ]
+
+@background
 def generate_daily_article():
     print(f"[{datetime.now()}] Running scheduled task: Generating AI article...")
     try:
         # Step 1: Try to identify a trending topic (e.g., top gainer)
         try:
-            market_data = requests.get(f"{BINANCE_API_URL}/ticker/24hr", timeout=10).json()
+            tickers, _ = race([BINANCE_TICKERS])
             # Find a coin with significant movement (e.g., top gainer)
-            top_gainer = sorted([coin for coin in market_data if coin['symbol'].endswith('USDT')], 
-                                  key=lambda x: float(x['priceChangePercent']), 
-                                  reverse=True)[0]
+            usdt_tickers = tickers.filter_quote('USDT')
+            top_gainer = usdt_tickers.top_k('priceChangePercent', 1).records()[0]
             topic = f"{top_gainer['symbol'].replace('USDT','')} ({top_gainer['priceChangePercent']}% move)"
         except Exception as api_error:
             print(f"Binance API timeout, using fallback topic: {api_error}")
@@ -114,13 +595,14 @@ def generate_daily_article():
                 }]
             }
             
-            gemini_response = requests.post(
+            gemini_response = BREAKERS["gemini"].call(
+                checked_request,
+                "POST",
                 f"{GEMINI_API_URL}?key={AI_API_KEY}",
                 json=gemini_payload,
                 headers={'Content-Type': 'application/json'},
-                timeout=30
+                read_timeout=30
             )
-            gemini_response.raise_for_status()
             
             generated_content = gemini_response.json()['candidates'][0]['content']['parts'][0]['text']
             generated_title = f"Market Analysis: {topic.split('(')[0].strip()}"
@@ -140,8 +622,7 @@ def generate_daily_article():
         try:
             headers = {'Authorization': PEXELS_API_KEY}
             params = {'query': image_search_term, 'per_page': 1}
-            pexels_response = requests.get(PEXELS_API_URL, headers=headers, params=params)
-            pexels_response.raise_for_status()
+            pexels_response = BREAKERS["pexels"].call(checked_request, "GET", PEXELS_API_URL, headers=headers, params=params)
             
             pexels_data = pexels_response.json()
             if pexels_data['photos']:
@@ -156,14 +637,12 @@ def generate_daily_article():
             image_url = "https://images.pexels.com/photos/730547/pexels-photo-730547.jpeg"
 
         # Step 4: Save the new article
-        current_data = read_data()
-        current_data['featured_article'] = {
+        content_db.add_article({
             "title": generated_title,
             "summary": generated_summary,
             "content": generated_content, # In a real app, save full content
             "image_url": image_url
-        }
-        write_data(current_data)
+        }, topic=topic)
         print("AI article generation completed successfully.")
 
     except Exception as e:
@@ -186,73 +665,224 @@ def coin_detail(symbol):
 
 # --- API ENDPOINTS FOR FRONTEND ---
 
+@app.route("/api/articles")
+def get_articles():
+    """Pages through generated articles, newest first. Pass `cursor` from the
+    previous page to continue."""
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    before_id = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        if not cursor.isdigit():
+            return jsonify({"error": "invalid cursor"}), 400
+        before_id = int(cursor)
+    articles = content_db.list_articles(limit=limit, before_id=before_id)
+    next_cursor = articles[-1]['id'] if len(articles) == limit else None
+    return jsonify({"articles": articles, "next_cursor": next_cursor})
+
+@app.route("/api/news")
+def get_news():
+    """Pages through stored news by publish time, optionally for one `source`."""
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    before = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        published_at, _, news_id = cursor.rpartition('|')
+        if not news_id.isdigit():
+            return jsonify({"error": "invalid cursor"}), 400
+        before = (published_at, int(news_id))
+    news = content_db.list_news(limit=limit, before=before, source=request.args.get('source'))
+    next_cursor = f"{news[-1]['published_at']}|{news[-1]['id']}" if len(news) == limit else None
+    return jsonify({"news": news, "next_cursor": next_cursor})
+
+@app.route("/api/search")
+def search_coins():
+    """Coin autocomplete by symbol, name or CoinGecko id prefix, e.g. `?q=eth`."""
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    query = request.args.get('q', '')
+    coins = coin_registry.search(query, limit)
+    return jsonify({
+        "query": query,
+        "results": [
+            {"id": c['id'], "symbol": c['symbol'].upper(), "name": c['name'], "market_cap_rank": c.get('rank')}
+            for c in coins
+        ],
+    })
+
 @app.route("/api/market-data")
 def get_market_data():
-    """Provides live market data for the top 100 coins."""
-    
-    # Try CoinGecko API first (no API key required, more reliable)
+    """Provides live market data for the top 100 coins from the in-memory snapshot."""
+    if not scheduler_election.is_leader:
+        # A stat() call; maps the leader's snapshot once per new version
+        follow_market_snapshot()
+    payload = market_cache.peek()
+    if payload is None:
+        # The poller has not completed its first run yet
+        payload = SerializedPayload(get_fallback_market_data())
+    return payload.make_response(request)
+
+@app.route("/api/market-stream")
+def get_market_stream():
+    """Streams the market snapshot once, then per-symbol deltas, as Server-Sent Events.
+
+    Each connected client holds a request thread, so past STREAM_MAX_CLIENTS
+    clients get a 503 and the page falls back to polling /api/market-data.
+    Idle streams write a comment every STREAM_PROBE_SECONDS, so a client that
+    went away frees its thread within a few seconds.
+    """
     try:
-        print("Trying CoinGecko API...")
-        response = requests.get(
-            f"{COINGECKO_API_URL}/coins/markets",
-            params={
-                'vs_currency': 'usd',
-                'order': 'market_cap_desc',
-                'per_page': 100,
-                'page': 1,
-                'sparkline': False,
-                'price_change_percentage': '24h'
-            },
-            timeout=10
-        )
-        response.raise_for_status()
-        coingecko_data = response.json()
-        
-        # Convert CoinGecko format to our expected format
-        formatted_data = []
-        for coin in coingecko_data:
-            formatted_data.append({
-                'symbol': f"{coin['symbol'].upper()}USDT",
-                'lastPrice': f"{coin['current_price']:.6f}",
-                'priceChangePercent': f"{coin.get('price_change_percentage_24h', 0):.2f}",
-                'volume': f"{coin.get('total_volume', 0):.0f}",
-                'quoteVolume': f"{coin.get('market_cap', 0):.0f}",
-                'weightedAvgPrice': f"{coin['current_price']:.6f}"
-            })
-        
-        print(f"✅ CoinGecko API success: {len(formatted_data)} coins")
-        return jsonify(formatted_data)
-        
-    except Exception as coingecko_error:
-        print(f"CoinGecko API error: {coingecko_error}")
-    
-    # Fallback to Binance API
+        subscription, snapshot, version = market_stream.subscribe()
+    except StreamLimitReached:
+        return (jsonify({"error": "too many live streams; poll /api/market-data"}), 503,
+                {'Retry-After': str(STREAM_RETRY_AFTER)})
+    if snapshot is None:
+        snapshot = get_fallback_market_data()
+
+    def stream():
+        try:
+            yield format_sse("snapshot", snapshot, event_id=version)
+            while not subscription.dropped:
+                try:
+                    delta_version, delta = subscription.queue.get(timeout=STREAM_PROBE_SECONDS)
+                except queue.Empty:
+                    # Fails once the client has gone, which closes the stream
+                    yield ":\n\n"
+                    continue
+                yield format_sse("delta", delta, event_id=delta_version)
+        finally:
+            market_stream.unsubscribe(subscription)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route("/api/stats/market-stream")
+def get_market_stream_stats():
+    """Exposes SSE subscriber counts and slow-consumer drops."""
+    return jsonify(market_stream.stats())
+
+@app.route("/api/stats/market-cache")
+def get_market_cache_stats():
+    """Exposes market snapshot counters and recent refresh timings."""
+    return jsonify(market_cache.stats())
+
+@app.route("/api/stats/coin-registry")
+def get_coin_registry_stats():
+    """Exposes coin registry size, age and refresh state."""
+    return jsonify(coin_registry.stats())
+
+@app.route("/api/stats/breakers")
+def get_breaker_stats():
+    """Exposes circuit breaker state and transition counts per upstream."""
+    return jsonify({name: breaker.stats() for name, breaker in BREAKERS.items()})
+
+@app.route("/api/stats/upstream-limits")
+def get_upstream_limit_stats():
+    """Exposes in-flight calls and waits per upstream concurrency limit."""
+    return jsonify({name: limit.stats() for name, limit in UPSTREAM_LIMITS.items()})
+
+@app.route("/api/stats/rate-limits")
+def get_rate_limit_stats():
+    """Exposes remaining budget, throttling and grants per upstream and priority."""
+    return jsonify({name: budget.stats() for name, budget in RATE_BUDGETS.items()})
+
+def fetch_market_snapshot():
+    """Fetches the top 100 coins from the fastest healthy provider, or fallback data."""
     try:
-        print("Trying Binance API...")
-        response = requests.get(f"{BINANCE_API_URL}/ticker/24hr", timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Filter for USDT pairs and sort by volume
-        usdt_pairs = [item for item in data if item['symbol'].endswith('USDT')]
-        usdt_pairs.sort(key=lambda x: float(x.get('quoteVolume', 0)), reverse=True)
-        
-        print(f"✅ Binance API success: {len(usdt_pairs[:100])} coins")
-        return jsonify(usdt_pairs[:100])
-        
-    except Exception as binance_error:
-        print(f"Binance API error: {binance_error}")
-    
+        return race(MARKET_PROVIDERS, hedge_delay=PROVIDER_HEDGE_DELAY)
+    except AllProvidersFailed as e:
+        print(f"Market data providers failed: {e}")
+        if market_cache.source not in (None, "fallback"):
+            # Keep serving the last real snapshot (now stale) over simulated data
+            raise
+
     # Final fallback to simulated data
     print("Using fallback simulated data...")
-    fallback_data = get_fallback_market_data()
-    return jsonify(fallback_data)
+    return get_fallback_market_data(), "fallback"
+
+def load_market_payload():
+    """Fetches a snapshot and serializes it once for every request that serves it."""
+    data, source = fetch_market_snapshot()
+    return SerializedPayload(data), source
+
+market_cache = SnapshotCache(load_market_payload, ttl=MARKET_CACHE_TTL, name="market")
+market_stream = MarketBroadcaster(queue_size=STREAM_QUEUE_SIZE, max_threaded=STREAM_MAX_CLIENTS)
+market_cache.add_listener(lambda payload: market_stream.publish(payload.data))
+
+def publish_market_snapshot(payload):
+    """Publishes each real snapshot to the shared file that follower workers
+    map, which also persists it for the next process."""
+    if market_cache.source in ("fallback", "disk", "leader"):
+        return
+    try:
+        shared_snapshot.publish(MARKET_SNAPSHOT_FILE, payload, market_cache.source, market_cache.fetched_at)
+    except OSError as e:
+        print(f"Could not publish market snapshot: {e}")
+
+market_snapshot_reader = shared_snapshot.SnapshotReader(MARKET_SNAPSHOT_FILE)
+
+def load_shared_market_snapshot(source):
+    """Seeds the market cache from the shared snapshot file if it holds a
+    version this process has not mapped yet. Returns the payload if used."""
+    payload = market_snapshot_reader.poll()
+    if payload is not None and market_cache.seed(payload, source, payload.fetched_at):
+        return payload
+    return None
+
+market_cache.add_listener(publish_market_snapshot)
+saved = load_shared_market_snapshot("disk")
+if saved is not None:
+    print(f"📦 Serving saved market snapshot from {time.time() - saved.fetched_at:.0f}s ago")
+
+def follow_market_snapshot():
+    """Follower workers: picks up each snapshot the leader publishes."""
+    load_shared_market_snapshot("leader")
+
+@app.route("/api/stats/shared-snapshot")
+def get_shared_snapshot_stats():
+    """Exposes the shared snapshot version this worker maps."""
+    return jsonify(market_snapshot_reader.stats())
+
+@app.route("/api/ready")
+def get_readiness():
+    """Reports which datasets are available and fresh. Returns 503 until a
+    market snapshot (live or saved) can be served."""
+    market_age = market_cache.age()
+    content = content_ages()
+    datasets = {
+        "market": {
+            "available": market_age is not None,
+            "age_seconds": round(market_age, 1) if market_age is not None else None,
+            "fresh": market_age is not None and market_age < MARKET_CACHE_TTL
+                     and market_cache.source not in ("disk", "fallback"),
+            "source": market_cache.source,
+        },
+    }
+    for name, interval in (("news", NEWS_INTERVAL_SECONDS), ("article", ARTICLE_INTERVAL_SECONDS)):
+        age = content[name]
+        datasets[name] = {
+            "available": age is not None,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "fresh": age is not None and age < interval,
+        }
+    ready = datasets["market"]["available"]
+    return jsonify({
+        "ready": ready,
+        "uptime_seconds": round(time.time() - PROCESS_STARTED, 1),
+        "first_byte_seconds": startup_timing["first_byte_seconds"],
+        "datasets": datasets,
+    }), 200 if ready else 503
+
+# Scheduled task: refresh the in-memory market snapshot
+@background
+def poll_market_data():
+    market_cache.refresh()
 
 def get_fallback_market_data():
     """Provides fallback market data when APIs are unavailable."""
     import random
     import time
     
+    FALLBACK_DATA.labels("market").inc()
     # Popular cryptocurrencies with simulated data
     popular_cryptos = [
         'BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'XRPUSDT', 'ADAUSDT', 
@@ -292,90 +922,313 @@ def get_top_100_symbols_by_market_cap():
     # This is a simplified approach. A better way is to use an endpoint that lists all coins
     # and then filter, but for this example, we use a pre-compiled (but extensive) list.
     # In a real app, you might fetch this list periodically.
-    response = requests.get(f"{BINANCE_API_URL}/ticker/24hr")
-    all_tickers = response.json()
-    usdt_tickers = [t for t in all_tickers if t['symbol'].endswith('USDT')]
-    # Sort by a proxy for market cap: volume * price
-    usdt_tickers.sort(key=lambda x: float(x.get('quoteVolume', 0)), reverse=True)
-    return [t['symbol'].replace('USDT', '') for t in usdt_tickers[:100]]
+    tickers, _ = race([BINANCE_TICKERS])
+    usdt_tickers = tickers.filter_quote('USDT')
+    # Rank by a proxy for market cap: quote volume
+    return usdt_tickers.top_k('quoteVolume', 100).base_assets('USDT')
+
+def parse_kline_query(args):
+    """Validates the `interval` and `range` query parameters and returns
+    `(interval, limit)`. Raises ValueError with a client-facing message."""
+    interval = args.get('interval', '1d')
+    if interval not in KLINE_INTERVAL_SECONDS:
+        raise ValueError(f"interval must be one of {', '.join(KLINE_INTERVAL_SECONDS)}")
+
+    limit = KLINE_DEFAULT_CANDLES
+    if 'range' in args:
+        seconds = parse_duration(args['range'])
+        if seconds is None:
+            raise ValueError("invalid range")
+        limit = max(1, -(-seconds // KLINE_INTERVAL_SECONDS[interval]))
+    if limit > MAX_KLINE_CANDLES:
+        raise ValueError(f"range spans more than {MAX_KLINE_CANDLES} {interval} candles")
+    return interval, limit
 
 @app.route("/api/kline-data/<symbol>")
 def get_kline_data(symbol):
-    """Provides historical k-line (candlestick) data for a given symbol."""
-    
-    # Try CoinGecko API first for historical data
+    """Provides historical k-line (candlestick) data for a given symbol.
+
+    Optional query parameters: `interval` (1m to 1w, default 1d), `range`
+    (e.g. 12h, 7d, 1y; default 100 candles) and `max_points`, which
+    downsamples longer responses to at most that many candles.
+    """
+    symbol = symbol.upper()
     try:
-        print(f"Getting chart data for {symbol} from CoinGecko...")
-        
-        # Get coin ID from symbol (simplified mapping)
-        symbol_to_id = {
-            'BTC': 'bitcoin', 'ETH': 'ethereum', 'BNB': 'binancecoin',
-            'XRP': 'ripple', 'ADA': 'cardano', 'SOL': 'solana',
-            'DOGE': 'dogecoin', 'DOT': 'polkadot', 'AVAX': 'avalanche-2',
-            'LTC': 'litecoin', 'LINK': 'chainlink', 'ATOM': 'cosmos',
-            'XLM': 'stellar', 'NEAR': 'near', 'ALGO': 'algorand',
-            'VET': 'vechain', 'ICP': 'internet-computer', 'FIL': 'filecoin',
-            'TRX': 'tron', 'ETC': 'ethereum-classic'
-        }
-        
-        coin_id = symbol_to_id.get(symbol.upper(), symbol.lower())
-        
-        response = requests.get(
-            f"{COINGECKO_API_URL}/coins/{coin_id}/ohlc",
-            params={'vs_currency': 'usd', 'days': 100},
-            timeout=10
-        )
-        response.raise_for_status()
-        ohlc_data = response.json()
-        
-        # Format for TradingView Lightweight Charts
-        formatted_data = []
-        for candle in ohlc_data:
-            formatted_data.append({
-                "time": int(candle[0] / 1000),  # timestamp in seconds
-                "open": float(candle[1]),
-                "high": float(candle[2]),
-                "low": float(candle[3]),
-                "close": float(candle[4])
-            })
-        
-        print(f"✅ CoinGecko chart data success: {len(formatted_data)} candles")
-        return jsonify(formatted_data)
-        
-    except Exception as coingecko_error:
-        print(f"CoinGecko chart API error: {coingecko_error}")
-    
-    # Fallback to Binance API
-    params = {
-        'symbol': f"{symbol}USDT",
-        'interval': '1d',
-        'limit': 100
-    }
+        interval, limit = parse_kline_query(request.args)
+        max_points = parse_max_points(request.args, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not candle_store.is_valid_key(symbol, interval):
+        return jsonify(get_fallback_chart_data(symbol))
+
+    payload = kline_cache.get_or_load(
+        kline_cache_key(symbol, interval, limit, max_points),
+        partial(load_kline_payload, symbol, interval, limit, max_points))
+    return payload.make_response(request)
+
+@app.route("/api/kline-data")
+def get_kline_batch():
+    """Candles for several symbols at once, e.g. `?symbols=BTC,ETH,SOL`.
+
+    Takes the same `interval`, `range` and `max_points` parameters as the
+    single-symbol endpoint. Cached symbols are answered immediately and the
+    rest fetched concurrently. With `stream=1` the response is NDJSON, one
+    line per symbol as soon as it is ready.
+    """
     try:
-        print(f"Trying Binance API for {symbol}...")
-        response = requests.get(f"{BINANCE_API_URL}/klines", params=params, timeout=10)
-        response.raise_for_status()
-        
-        formatted_data = [
-            {
-                "time": int(k[0] / 1000),
-                "open": float(k[1]),
-                "high": float(k[2]),
-                "low": float(k[3]),
-                "close": float(k[4])
-            } for k in response.json()
-        ]
-        
-        print(f"✅ Binance chart data success: {len(formatted_data)} candles")
-        return jsonify(formatted_data)
-        
-    except Exception as binance_error:
-        print(f"Binance chart API error: {binance_error}")
-    
+        interval, limit = parse_kline_query(request.args)
+        max_points = parse_max_points(request.args, limit)
+        symbols = parse_kline_batch_symbols(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    results = iter_kline_batch(symbols, interval, limit, max_points)
+    if request.args.get('stream') in ('1', 'true'):
+        def stream():
+            for result in results:
+                yield kline_batch_line(*result)
+        return Response(stream(), mimetype='application/x-ndjson', headers=KLINE_STREAM_HEADERS)
+
+    return Response(kline_batch_body(interval, symbols, results), mimetype='application/json',
+                    headers={'Cache-Control': 'no-cache'})
+
+KLINE_STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def parse_kline_batch_symbols(args):
+    """The distinct symbols of a batch request, in request order."""
+    symbols = list(dict.fromkeys(
+        s.strip().upper() for s in args.get('symbols', '').split(',') if s.strip()))
+    if not symbols:
+        raise ValueError("symbols is required")
+    if len(symbols) > KLINE_BATCH_MAX_SYMBOLS:
+        raise ValueError(f"at most {KLINE_BATCH_MAX_SYMBOLS} symbols per request")
+    return symbols
+
+def kline_batch_line(symbol, payload, error):
+    """One NDJSON line of a streamed batch response."""
+    value = ('candles', payload.body) if payload is not None else ('error', encode_json(error))
+    return join_json_object([('symbol', encode_json(symbol)), value]) + b'\n'
+
+def kline_batch_body(interval, symbols, results):
+    """Splices each symbol's pre-serialized body into one object, in request order."""
+    bodies, errors = {}, {}
+    for symbol, payload, error in results:
+        if payload is not None:
+            bodies[symbol] = payload.body
+        else:
+            errors[symbol] = error
+    return join_json_object([
+        ('interval', encode_json(interval)),
+        ('candles', join_json_object((s, bodies[s]) for s in symbols if s in bodies)),
+        ('errors', encode_json(errors)),
+    ])
+
+def kline_cache_key(symbol, interval, limit, max_points):
+    return (symbol, interval, str(limit), str(max_points or ''))
+
+def parse_max_points(args, limit):
+    """Validates the optional `max_points` query parameter and returns the
+    downsampling target actually applied to `limit` candles: None when no
+    downsampling is needed, otherwise `max_points` rounded down to a coarse
+    series of sizes (..., 256, 384, 512, 768, ...). Charts send their pixel
+    width, so this keeps every width from getting its own cache entry and
+    upstream fetch."""
+    max_points = args.get('max_points', type=int)
+    if 'max_points' in args and (max_points is None or max_points < 3):
+        raise ValueError("max_points must be an integer of at least 3")
+    if max_points is None or max_points >= limit:
+        return None
+    if max_points < 64:
+        return max_points
+    power = 1 << (max_points.bit_length() - 1)
+    return power + power // 2 if max_points >= power + power // 2 else power
+
+def iter_kline_batch(symbols, interval, limit, max_points):
+    """Yields `(symbol, payload, error)` per symbol: cached ones first, then
+    the rest as their fetches complete on the batch pool. Concurrent batches
+    asking for the same symbol share one fetch through the kline cache."""
+    cached, pending, invalid = [], {}, []
+    for symbol in symbols:
+        if not candle_store.is_valid_key(symbol, interval):
+            invalid.append(symbol)
+            continue
+        key = kline_cache_key(symbol, interval, limit, max_points)
+        payload = kline_cache.peek(key)
+        if payload is not None:
+            cached.append((symbol, payload))
+        else:
+            future = kline_batch_pool.submit(
+                kline_cache.get_or_load, key,
+                partial(load_kline_payload, symbol, interval, limit, max_points))
+            pending[future] = symbol
+
+    for symbol in invalid:
+        yield symbol, None, "invalid symbol"
+    for symbol, payload in cached:
+        yield symbol, payload, None
+    for future in as_completed(pending):
+        try:
+            yield pending[future], future.result(), None
+        except Exception as e:
+            print(f"Batch chart data failed for {pending[future]}: {e}")
+            yield pending[future], None, str(e)
+
+async def aiter_kline_batch(symbols, interval, limit, max_points):
+    """iter_kline_batch() for the async serving mode: uncached symbols load
+    as tasks on the event loop rather than on the batch pool."""
+    cached, pending, invalid = [], {}, []
+    for symbol in symbols:
+        if not candle_store.is_valid_key(symbol, interval):
+            invalid.append(symbol)
+            continue
+        key = kline_cache_key(symbol, interval, limit, max_points)
+        payload = kline_cache.peek(key)
+        if payload is not None:
+            cached.append((symbol, payload))
+        else:
+            task = asyncio.ensure_future(kline_cache.aget_or_load(
+                key, partial(aload_kline_payload, symbol, interval, limit, max_points)))
+            pending[task] = symbol
+
+    for symbol in invalid:
+        yield symbol, None, "invalid symbol"
+    for symbol, payload in cached:
+        yield symbol, payload, None
+    while pending:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            symbol = pending.pop(task)
+            try:
+                yield symbol, task.result(), None
+            except Exception as e:
+                print(f"Batch chart data failed for {symbol}: {e}")
+                yield symbol, None, str(e)
+
+@app.route("/api/indicators/<symbol>")
+def get_indicators(symbol):
+    """Technical indicators computed server-side over the same candles as
+    /api/kline-data, e.g. `?indicators=sma:20,rsi:14,macd:12:26:9`.
+
+    Accepts the same `interval` and `range` parameters. Each indicator's
+    outputs are arrays aligned with `time`, with null during warm-up.
+    """
+    symbol = symbol.upper()
+    try:
+        interval, limit = parse_kline_query(request.args)
+        specs = parse_indicator_specs(request.args.get('indicators', ''))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not candle_store.is_valid_key(symbol, interval):
+        return jsonify({"error": "invalid symbol"}), 400
+
+    key = ('indicators', symbol, interval, str(limit), ','.join(spec for spec, _, _ in specs))
+    payload = kline_cache.get_or_load(
+        key, lambda: load_indicator_payload(symbol, interval, limit, specs))
+    return payload.make_response(request)
+
+@app.route("/api/stats/kline-cache")
+def get_kline_cache_stats():
+    """Exposes kline cache memory footprint and per-key hit rates."""
+    return jsonify(kline_cache.stats())
+
+@app.route("/api/stats/indicators")
+def get_indicator_stats():
+    """Exposes how often indicator results were extended vs fully recomputed."""
+    return jsonify(indicator_engine.stats())
+
+def load_kline_columns(symbol, interval='1d', limit=100):
+    """Candle columns for a symbol as `(columns, ttl, source)`, falling back
+    to stored and then generated candles when every upstream fails."""
+    resampled = resampled_kline_columns(symbol, interval, limit)
+    if resampled is not None:
+        return resampled
+
+    print(f"Getting {interval} chart data for {symbol}...")
+    try:
+        columns, source = race(kline_providers(symbol, interval), symbol, interval, limit,
+                               hedge_delay=PROVIDER_HEDGE_DELAY)
+        return columns, interval_ttl(interval), source
+    except AllProvidersFailed as e:
+        print(f"Chart data providers failed for {symbol}: {e}")
+    return degraded_kline_columns(symbol, interval, limit)
+
+async def aload_kline_columns(symbol, interval='1d', limit=100):
+    """load_kline_columns() for the async serving mode: upstream calls are
+    awaited, and local disk and NumPy work runs on worker threads."""
+    resampled = await asyncio.to_thread(resampled_kline_columns, symbol, interval, limit)
+    if resampled is not None:
+        return resampled
+
+    print(f"Getting {interval} chart data for {symbol}...")
+    # May load the coin registry on first use
+    providers = await asyncio.to_thread(kline_providers, symbol, interval)
+    try:
+        columns, source = await arace(providers, symbol, interval, limit, hedge_delay=PROVIDER_HEDGE_DELAY)
+        return columns, interval_ttl(interval), source
+    except AllProvidersFailed as e:
+        print(f"Chart data providers failed for {symbol}: {e}")
+    return await asyncio.to_thread(degraded_kline_columns, symbol, interval, limit)
+
+def resampled_kline_columns(symbol, interval, limit):
+    """Coarser candles built from finer ones already stored, without asking
+    upstream, as `(columns, ttl, source)`; None if none qualify. They only
+    stay as fresh as the finer series."""
+    resampled = read_resampled_klines(symbol, interval, limit)
+    if resampled is None:
+        return None
+    columns, finer = resampled
+    print(f"Resampled {finer} candles into {interval} chart data for {symbol}")
+    return columns, interval_ttl(finer), "resampled"
+
+def degraded_kline_columns(symbol, interval, limit):
+    """Whatever history is stored, even if the newest candles are missing,
+    else generated candles. Degraded responses are cached briefly so recovery
+    shows up quickly."""
+    stored = candle_store.series(symbol, interval).tail(limit)
+    if len(stored['time']):
+        print(f"Using stored chart data for {symbol}...")
+        return stored, KLINE_DEGRADED_TTL, "stored"
+
     # Final fallback to generated data
     print(f"Using fallback chart data for {symbol}...")
-    fallback_chart_data = get_fallback_chart_data(symbol)
-    return jsonify(fallback_chart_data)
+    return records_to_columns(get_fallback_chart_data(symbol)), KLINE_DEGRADED_TTL, "fallback"
+
+def load_kline_payload(symbol, interval='1d', limit=100, max_points=None):
+    """Fetches candles for a symbol and returns `(payload, ttl)` for the kline cache."""
+    columns, ttl, _ = load_kline_columns(symbol, interval, limit)
+    return kline_payload(columns, max_points), ttl
+
+async def aload_kline_payload(symbol, interval='1d', limit=100, max_points=None):
+    columns, ttl, _ = await aload_kline_columns(symbol, interval, limit)
+    return await asyncio.to_thread(kline_payload, columns, max_points), ttl
+
+def kline_payload(columns, max_points):
+    return SerializedPayload(candles_to_records(downsample(columns, max_points)))
+
+def load_indicator_payload(symbol, interval, limit, specs):
+    """Computes the requested indicators and returns `(payload, ttl)`."""
+    columns, ttl, source = load_kline_columns(symbol, interval, limit)
+    return indicator_payload(symbol, interval, specs, columns, source), ttl
+
+async def aload_indicator_payload(symbol, interval, limit, specs):
+    columns, ttl, source = await aload_kline_columns(symbol, interval, limit)
+    return await asyncio.to_thread(indicator_payload, symbol, interval, specs, columns, source), ttl
+
+def indicator_payload(symbol, interval, specs, columns, source):
+    # Generated fallback candles must not be mixed into cached indicator state
+    series_key = None if source == "fallback" else (symbol, interval)
+
+    results = {}
+    for spec, name, params in specs:
+        outputs = indicator_engine.compute(series_key, name, params, columns)
+        results[spec] = outputs_to_lists(outputs)
+    return SerializedPayload({
+        "symbol": symbol,
+        "interval": interval,
+        "time": columns['time'].tolist(),
+        "indicators": results,
+    })
 
 def get_fallback_chart_data(symbol):
     """Generate fallback chart data when API is unavailable."""
@@ -383,6 +1236,7 @@ def get_fallback_chart_data(symbol):
     import time
     from datetime import datetime, timedelta
     
+    FALLBACK_DATA.labels("chart").inc()
     # Base prices for different symbols
     base_prices = {
         'BTC': 45000, 'ETH': 2800, 'BNB': 320, 'XRP': 0.6, 'ADA': 0.45,
@@ -419,35 +1273,166 @@ def get_fallback_chart_data(symbol):
     return data
 
 # --- SCHEDULER SETUP AND EXECUTION ---
-if __name__ == '__main__':
-    print("🚀 Starting CryptoPulse AI...")
-    print("🔧 Initializing components...")
-    
-    # Run tasks once on startup (with error handling)
-    try:
-        print("📰 Fetching initial news...")
-        fetch_latest_news()
-        print("✅ News fetch completed")
-    except Exception as e:
-        print(f"⚠️ News fetch failed: {e} (will retry automatically)")
-    
-    try:
-        print("🤖 Generating initial article...")
-        generate_daily_article()
-        print("✅ Article generation completed")
-    except Exception as e:
-        print(f"⚠️ Article generation failed: {e} (will retry automatically)")
+NEWS_INTERVAL_SECONDS = 3600
+ARTICLE_INTERVAL_SECONDS = 24 * 3600
+
+def content_ages():
+    """Seconds since the newest stored article and news fetch (None if never)."""
+    ages = {}
+    for name, stamp in content_db.freshness().items():
+        try:
+            ages[name] = max(time.time() - datetime.fromisoformat(stamp).timestamp(), 0)
+        except (TypeError, ValueError):
+            ages[name] = None
+    return ages
+
+def timed_job(func):
+    """Records each run's duration, and failures, in the job metrics."""
+    @functools.wraps(func)
+    def run():
+        started = time.perf_counter()
+        try:
+            return func()
+        except Exception:
+            JOB_FAILURES.labels(func.__name__).inc()
+            raise
+        finally:
+            JOB_SECONDS.labels(func.__name__).observe(time.perf_counter() - started)
+    return run
+
+def start_scheduler():
+    """Starts the background jobs. The market poller runs immediately, and the
+    news and article jobs too when their stored data is already due."""
+    now = datetime.now()
+    ages = content_ages()
+
+    def run_now_if(due):
+        # Omitting next_run_time schedules the first run one interval out
+        return {"next_run_time": now} if due else {}
 
-    # Configure scheduler
-    print("⏰ Setting up automated tasks...")
     scheduler = BackgroundScheduler()
-    scheduler.add_job(func=fetch_latest_news, trigger="interval", hours=1)
-    scheduler.add_job(func=generate_daily_article, trigger="interval", hours=24)
+    scheduler.add_job(func=timed_job(fetch_latest_news), trigger="interval", seconds=NEWS_INTERVAL_SECONDS,
+                      max_instances=1, coalesce=True,
+                      **run_now_if(ages["news"] is None or ages["news"] >= NEWS_INTERVAL_SECONDS))
+    scheduler.add_job(func=timed_job(generate_daily_article), trigger="interval", seconds=ARTICLE_INTERVAL_SECONDS,
+                      max_instances=1, coalesce=True,
+                      **run_now_if(ages["article"] is None or ages["article"] >= ARTICLE_INTERVAL_SECONDS))
+    scheduler.add_job(func=timed_job(poll_market_data), trigger="interval", seconds=MARKET_POLL_SECONDS,
+                      next_run_time=now, max_instances=1, coalesce=True)
     scheduler.start()
-    print("✅ Scheduler started")
 
     # Shut down the scheduler when exiting the app
     atexit.register(lambda: scheduler.shutdown())
+    return scheduler
+
+# One process per host runs the scheduler; the others follow its snapshots
+scheduler_election = LeaderElection(SCHEDULER_LOCK_FILE, on_elected=start_scheduler,
+                                    on_follow=follow_market_snapshot)
+
+shared_metrics = metrics.SharedMetrics(metrics.REGISTRY, METRICS_DIR) if METRICS_DIR else None
+
+if PROFILE_REQUESTS and not PROFILE_TOKEN:
+    print("⚠️ PROFILE_REQUESTS is set without PROFILE_TOKEN; request profiling stays off")
+    PROFILE_REQUESTS = False
+if PROFILE_REQUESTS:
+    app.wsgi_app = profiling.RequestProfiler(app.wsgi_app, PROFILE_DIR, PROFILE_TOKEN)
+stack_sampler = (profiling.StackSampler(PROFILE_DIR, interval=PROFILE_SAMPLE_MS / 1000,
+                                        dump_every=PROFILE_DUMP_SECONDS)
+                 if PROFILE_SAMPLE_MS > 0 else None)
+
+def start_background_jobs():
+    """Starts the scheduler in this process if it wins the leader election,
+    otherwise follows the leader and takes over if it exits."""
+    scheduler_election.start()
+    coin_registry.start()
+    if shared_metrics is not None:
+        shared_metrics.start()
+    if stack_sampler is not None:
+        stack_sampler.start()
+
+@app.route("/api/stats/scheduler")
+def get_scheduler_stats():
+    """Exposes which process leads the background jobs."""
+    return jsonify(scheduler_election.stats())
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+@metrics.REGISTRY.add_collector
+def collect_component_metrics():
+    """Cache, breaker and rate budget metrics, read from their stats."""
+    market = market_cache.stats()
+    klines = kline_cache.stats(top=0)
+    indicator_counts = indicator_engine.stats()
+    breakers = {name: breaker.stats() for name, breaker in BREAKERS.items()}
+    budgets = {name: budget.stats() for name, budget in RATE_BUDGETS.items()}
+    return [
+        metrics.family('cryptopulse_cache_lookups_total', 'counter', 'Cache lookups by result', [
+            ({"cache": "market", "result": "hit"}, market["hits"]),
+            ({"cache": "market", "result": "stale_hit"}, market["stale_hits"]),
+            ({"cache": "market", "result": "miss"}, market["misses"]),
+            ({"cache": "kline", "result": "hit"}, klines["hits"]),
+            ({"cache": "kline", "result": "miss"}, klines["misses"]),
+            ({"cache": "kline", "result": "coalesced"}, klines["coalesced"]),
+        ]),
+        metrics.family('cryptopulse_cache_hit_ratio', 'gauge', 'Share of lookups served fresh from cache', [
+            ({"cache": "market"}, market["hit_ratio"]),
+            ({"cache": "kline"}, klines["hit_rate"]),
+        ]),
+        metrics.family('cryptopulse_kline_cache_bytes', 'gauge', 'Memory held by cached kline responses', [
+            ({}, klines["bytes"]),
+        ]),
+        metrics.family('cryptopulse_kline_cache_evictions_total', 'counter', 'Kline responses evicted for memory', [
+            ({}, klines["evictions"]),
+        ]),
+        metrics.family('cryptopulse_market_refreshes_total', 'counter', 'Market snapshot refreshes by result', [
+            ({"result": "ok"}, market["refreshes"]),
+            ({"result": "error"}, market["refresh_errors"]),
+        ]),
+        metrics.family('cryptopulse_indicator_computations_total', 'counter',
+                       'Indicator results by how they were produced', [
+            ({"kind": kind}, indicator_counts[kind]) for kind in ("full", "incremental", "unchanged")
+        ]),
+        metrics.family('cryptopulse_circuit_breaker_state', 'gauge', 'Breaker state: 0 closed, 1 half-open, 2 open', [
+            ({"upstream": name}, BREAKER_STATES.get(stats["state"])) for name, stats in breakers.items()
+        ]),
+        metrics.family('cryptopulse_circuit_breaker_rejected_total', 'counter',
+                       'Calls rejected by an open breaker', [
+            ({"upstream": name}, stats["rejected_calls"]) for name, stats in breakers.items()
+        ]),
+        metrics.family('cryptopulse_rate_budget_tokens', 'gauge', 'Request budget left per upstream', [
+            ({"upstream": name}, stats["tokens"]) for name, stats in budgets.items()
+        ]),
+        metrics.family('cryptopulse_rate_budget_rejected_total', 'counter',
+                       'Requests not sent because the budget ran out', [
+            ({"upstream": name, "priority": level}, count)
+            for name, stats in budgets.items() for level, count in stats["rejected"].items()
+        ]),
+    ]
+
+@app.route("/api/stats/profiling")
+def get_profiling_stats():
+    """Exposes whether profiling is enabled and the stack sampler's progress."""
+    return jsonify({
+        "request_profiling": PROFILE_REQUESTS,
+        "directory": PROFILE_DIR,
+        "sampler": stack_sampler.stats() if stack_sampler is not None else None,
+    })
+
+@app.route("/metrics")
+def get_metrics():
+    """Prometheus text exposition of this server's metrics (all workers
+    when METRICS_DIR is shared)."""
+    families = shared_metrics.collect() if shared_metrics is not None else metrics.REGISTRY.collect()
+    return Response(metrics.render(families), content_type=metrics.CONTENT_TYPE)
+
+if __name__ == '__main__':
+    print("🚀 Starting CryptoPulse AI...")
+    print("🔧 Initializing components...")
+    
+    # Warm-up runs in the background; saved data is served meanwhile
+    print("⏰ Setting up automated tasks...")
+    start_background_jobs()
+    print("✅ Scheduler started")
 
     # Production-ready configuration
     port = int(os.environ.get('PORT', 5000))
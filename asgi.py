@@ -0,0 +1,246 @@
+"""
+ASGI entry point: the async serving mode.
+
+    SERVER_MODE=asgi gunicorn -c gunicorn.conf.py
+    uvicorn asgi:app                      # single process, for development
+
+The upstream-bound chart routes (/api/kline-data, /api/kline-data/<symbol>
+and /api/indicators/<symbol>) run on the event loop. Cache hits are answered
+there directly, and misses await upstream I/O on the shared async client
+(async_http), so a slow upstream holds a coroutine rather than a thread and
+one process can keep thousands of such requests in flight. The market
+stream (/api/market-stream) runs there too, so open homepage tabs hold no
+threads and are not capped by STREAM_MAX_CLIENTS.
+
+Every other route, the templates and static files go to the unchanged Flask
+app, run on a thread pool through a2wsgi. The async handlers reuse the Flask
+app's parsing, caches and payloads, so responses are the same in both modes.
+
+Requires httpx, a2wsgi and an ASGI server such as uvicorn.
+"""
+import asyncio
+import io
+import os
+import re
+import time
+from functools import partial
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from flask import Response, jsonify
+from werkzeug.wrappers import Request
+
+import async_http
+import app as web
+
+# Threads running the Flask routes
+WSGI_THREADS = int(os.environ.get('GUNICORN_THREADS', 8))
+
+wsgi_app = WSGIMiddleware(web.app, workers=WSGI_THREADS)
+
+
+class AsyncStream:
+    """A streamed response whose chunks come from an async iterator."""
+
+    def __init__(self, chunks, mimetype, headers):
+        self.chunks = chunks
+        self.mimetype = mimetype
+        self.headers = headers
+
+
+# --- ASYNC ROUTES ---
+
+async def get_kline_data(request, symbol):
+    """Async /api/kline-data/<symbol>; see app.get_kline_data."""
+    symbol = symbol.upper()
+    try:
+        interval, limit = web.parse_kline_query(request.args)
+        max_points = web.parse_max_points(request.args, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not web.candle_store.is_valid_key(symbol, interval):
+        return jsonify(web.get_fallback_chart_data(symbol))
+
+    payload = await web.kline_cache.aget_or_load(
+        web.kline_cache_key(symbol, interval, limit, max_points),
+        partial(web.aload_kline_payload, symbol, interval, limit, max_points))
+    return payload.make_response(request)
+
+
+async def get_kline_batch(request):
+    """Async /api/kline-data?symbols=...; see app.get_kline_batch."""
+    try:
+        interval, limit = web.parse_kline_query(request.args)
+        max_points = web.parse_max_points(request.args, limit)
+        symbols = web.parse_kline_batch_symbols(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    results = web.aiter_kline_batch(symbols, interval, limit, max_points)
+    if request.args.get('stream') in ('1', 'true'):
+        async def stream():
+            async for result in results:
+                yield web.kline_batch_line(*result)
+        return AsyncStream(stream(), 'application/x-ndjson', web.KLINE_STREAM_HEADERS)
+
+    collected = [result async for result in results]
+    return Response(web.kline_batch_body(interval, symbols, collected), mimetype='application/json',
+                    headers={'Cache-Control': 'no-cache'})
+
+
+async def get_indicators(request, symbol):
+    """Async /api/indicators/<symbol>; see app.get_indicators."""
+    symbol = symbol.upper()
+    try:
+        interval, limit = web.parse_kline_query(request.args)
+        specs = web.parse_indicator_specs(request.args.get('indicators', ''))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not web.candle_store.is_valid_key(symbol, interval):
+        return jsonify({"error": "invalid symbol"}), 400
+
+    key = ('indicators', symbol, interval, str(limit), ','.join(spec for spec, _, _ in specs))
+    payload = await web.kline_cache.aget_or_load(
+        key, partial(web.aload_indicator_payload, symbol, interval, limit, specs))
+    return payload.make_response(request)
+
+
+async def get_market_stream(request):
+    """Async /api/market-stream; see app.get_market_stream."""
+    async def stream():
+        subscription, snapshot, version = web.market_stream.subscribe(loop=asyncio.get_running_loop())
+        try:
+            if snapshot is None:
+                snapshot = web.get_fallback_market_data()
+            yield web.format_sse("snapshot", snapshot, event_id=version).encode('utf-8')
+            while not subscription.dropped:
+                try:
+                    item = await subscription.get(timeout=web.STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+                delta_version, delta = item
+                yield web.format_sse("delta", delta, event_id=delta_version).encode('utf-8')
+        finally:
+            web.market_stream.unsubscribe(subscription)
+
+    return AsyncStream(stream(), 'text/event-stream', {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# (pattern, Flask rule used as the metrics route label, handler)
+ROUTES = [
+    (re.compile(r'^/api/kline-data/(?P<symbol>[^/]+)$'), '/api/kline-data/<symbol>', get_kline_data),
+    (re.compile(r'^/api/kline-data$'), '/api/kline-data', get_kline_batch),
+    (re.compile(r'^/api/indicators/(?P<symbol>[^/]+)$'), '/api/indicators/<symbol>', get_indicators),
+    (re.compile(r'^/api/market-stream$'), '/api/market-stream', get_market_stream),
+]
+
+
+# --- ASGI PLUMBING ---
+
+def _match(scope):
+    if scope['method'] not in ('GET', 'HEAD'):
+        return None, None
+    for pattern, rule, handler in ROUTES:
+        match = pattern.match(scope['path'])
+        if match:
+            return rule, partial(handler, **match.groupdict())
+    return None, None
+
+
+def _status(response):
+    if isinstance(response, AsyncStream):
+        return 200
+    if isinstance(response, tuple):
+        return response[1]
+    return response.status_code
+
+
+def _header_list(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers.to_wsgi_list()]
+
+
+async def _stream_body(receive, send, chunks):
+    """Sends `chunks` until they run out or the client disconnects, which
+    for an endless stream is the only way it ends."""
+    async def pump():
+        async for chunk in chunks:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def disconnected():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    sending = asyncio.ensure_future(pump())
+    watching = asyncio.ensure_future(disconnected())
+    try:
+        await asyncio.wait((sending, watching), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (sending, watching):
+            task.cancel()
+        await asyncio.gather(sending, watching, return_exceptions=True)
+        # Runs the generator's cleanup (e.g. unsubscribing) now
+        await chunks.aclose()
+    if not sending.cancelled():
+        sending.result()
+
+
+async def _send_response(scope, receive, send, response):
+    if isinstance(response, AsyncStream):
+        headers = Response(mimetype=response.mimetype, headers=response.headers).headers
+        headers.remove('Content-Length')
+        await send({'type': 'http.response.start', 'status': 200, 'headers': _header_list(headers)})
+        if scope['method'] == 'HEAD':
+            await response.chunks.aclose()
+            await send({'type': 'http.response.body', 'body': b''})
+        else:
+            await _stream_body(receive, send, response.chunks)
+        return
+
+    if isinstance(response, tuple):
+        response, status = response
+        response.status_code = status
+    await send({'type': 'http.response.start', 'status': response.status_code,
+                'headers': _header_list(response.headers)})
+    body = b'' if scope['method'] == 'HEAD' else response.get_data()
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_http.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    rule, handler = _match(scope) if scope['type'] == 'http' else (None, None)
+    if handler is None:
+        return await wsgi_app(scope, receive, send)
+
+    started = time.perf_counter()
+    request = Request(build_environ(scope, io.BytesIO()))
+    with web.app.app_context():
+        try:
+            response = await handler(request)
+        except Exception as e:
+            print(f"Async route {scope['path']} failed: {e}")
+            response = jsonify({"error": "internal server error"}), 500
+    # Measured to the response headers, as the Flask routes are
+    web.observe_request(rule, scope['method'], _status(response), time.perf_counter() - started)
+    web.note_first_byte()
+    await _send_response(scope, receive, send, response)
+
+
+web.start_background_jobs()
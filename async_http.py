@@ -0,0 +1,124 @@
+"""
+Shared async HTTP client for the ASGI serving mode.
+
+The async counterpart of http_client: one `httpx.AsyncClient` per process
+keeps upstream connections alive, with the same timeouts, headers, retry
+policy and rate budgets: failed connections are retried, and so are 5xx
+answers to idempotent requests, each attempt charged to the budget; read
+timeouts are not. A request that has to wait for budget gives up its
+provider's concurrency slot meanwhile. A request waiting on the network holds no thread, so one
+process can have thousands in flight.
+
+Rate budgets are shared with the sync client. Waiting for budget may block,
+so it happens on a worker thread, and only when a budget is registered.
+Latency and outcomes are recorded in the same upstream metrics.
+
+httpx is optional; without it only the WSGI mode is available.
+"""
+import asyncio
+import time
+
+import http_client
+from providers import aslot_released
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+_client = None
+
+
+def client():
+    """The shared client, created on first use inside the serving loop."""
+    global _client
+    if httpx is None:
+        raise RuntimeError("the async serving mode requires the httpx package")
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(http_client.READ_TIMEOUT, connect=http_client.CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=None,
+                                max_keepalive_connections=http_client.POOL_MAXSIZE * 4),
+            headers={'Accept-Encoding': 'gzip, deflate', 'User-Agent': 'CryptoPulseAI/1.0'},
+        )
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def request(method, url, params=None, **kwargs):
+    """Sends a request on the shared client with the standard timeouts,
+    retries and rate budget."""
+    charge = http_client.budget_for(url, params)
+    if charge is not None:
+        budget, cost = charge
+        if not budget.try_acquire(cost):
+            async with aslot_released():
+                # Runs in a copy of this context, so the caller's priority applies
+                await asyncio.to_thread(budget.acquire, cost)
+
+    retries = http_client.RETRIES if method.upper() in http_client.RETRY_METHODS else 0
+    attempt = 0
+    started = time.perf_counter()
+    while True:
+        try:
+            response = await client().request(method, url, params=params, **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            # Nothing reached the upstream, so any method may be retried
+            if attempt < http_client.RETRIES:
+                await asyncio.sleep(http_client.backoff(attempt))
+                if http_client.charge_retry(charge):
+                    attempt += 1
+                    continue
+            outcome = 'timeout' if isinstance(e, httpx.TimeoutException) else 'error'
+            http_client.observe_upstream(url, started, outcome)
+            raise
+        except httpx.TransportError as e:
+            outcome = 'timeout' if isinstance(e, httpx.TimeoutException) else 'error'
+            http_client.observe_upstream(url, started, outcome)
+            raise
+        else:
+            if charge is not None:
+                budget.observe(response)
+            if response.status_code not in http_client.RETRY_STATUSES or attempt >= retries:
+                break
+            await asyncio.sleep(http_client.backoff(attempt))
+            # Takes budget only if no wait is needed, so it can run on the loop
+            if not http_client.charge_retry(charge):
+                break
+            await response.aclose()
+            attempt += 1
+
+    http_client.observe_upstream(url, started, http_client.response_outcome(response.status_code))
+    return response
+
+
+async def get(url, **kwargs):
+    return await request("GET", url, **kwargs)
+
+
+def _advance(plan, response=None):
+    """Runs `plan` up to its next request, sending it `response`'s decoded
+    body. Returns `(request, None)`, or `(None, result)` once it finishes."""
+    try:
+        return (next(plan) if response is None else plan.send(response.json())), None
+    except StopIteration as finished:
+        return None, finished.value
+
+
+async def run_plan(plan):
+    """Async counterpart of http_client.run_plan(). Only the requests are
+    awaited on the loop: decoding each body and the plan's own work on it
+    run on a worker thread."""
+    request, result = await asyncio.to_thread(_advance, plan)
+    while request is not None:
+        url, params = request
+        response = await get(url, params=params)
+        response.raise_for_status()
+        request, result = await asyncio.to_thread(_advance, plan, response)
+    return result
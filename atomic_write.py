@@ -0,0 +1,45 @@
+"""
+Atomic file writes.
+
+Writes go to a temp file in the same directory which is fsynced and renamed
+over the original, so readers see either the old or the new file, never a
+half-written one.
+"""
+import json
+import os
+import tempfile
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """Writes `data` as JSON to `path` via temp file + fsync + rename."""
+    atomic_write_bytes(path, json.dumps(data, **dump_kwargs).encode('utf-8'))
+
+
+def atomic_write_bytes(path, body):
+    """Writes `body` to `path` via temp file + fsync + rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Persist the rename itself; not supported on every platform
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
@@ -0,0 +1,288 @@
+"""
+Benchmark suite: app.py's data transforms, fallbacks, storage and pages.
+
+Runs offline against the upstream fixtures in benchmarks/fixtures/ (see
+fixtures.py), importing the app in a scratch directory so no real data files
+are touched and nothing is fetched. Fetch plans are driven with the recorded
+bodies in place of HTTP responses, so the timed code is the code the app
+runs.
+
+Each benchmark is timed with timeit: loops per run are picked so a run takes
+at least 0.2s, and the best and median per-call times over `--repeat` runs
+are reported. Results can be saved as JSON and compared with an earlier run;
+`--compare` exits with status 1 when a benchmark's best time got slower by
+more than `--threshold`, so it can gate a commit.
+
+    python benchmarks/bench_app.py                            # run all
+    python benchmarks/bench_app.py -k kline                   # names containing "kline"
+    python benchmarks/bench_app.py --save                     # also write results/<commit>.json
+    python benchmarks/bench_app.py --compare base.json        # run, then compare with base
+    python benchmarks/bench_app.py --compare base.json new.json
+"""
+import argparse
+import atexit
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+sys.path.append(REPO_DIR)
+sys.path.append(BENCH_DIR)
+
+import fixtures
+
+BENCHMARKS = {}
+
+
+def benchmark(setup):
+    """Registers `setup(ctx)`, which returns the zero-argument callable to time."""
+    BENCHMARKS[setup.__name__] = setup
+    return setup
+
+
+def run_offline(plan, bodies):
+    """Drives a fetch plan (see http_client.run_plan) with recorded response
+    bodies instead of HTTP requests."""
+    bodies = iter(bodies)
+    try:
+        plan.send(None)
+        while True:
+            plan.send(next(bodies))
+    except StopIteration as finished:
+        return finished.value
+
+
+class Context:
+    """The app, imported into a scratch directory and seeded from fixtures."""
+
+    def __init__(self):
+        self.scratch = tempfile.mkdtemp(prefix='cryptopulse-bench-')
+        atexit.register(shutil.rmtree, self.scratch, ignore_errors=True)
+        self._devnull = open(os.devnull, 'w')
+        markets = fixtures.load('coingecko_coins_markets')
+        coins = [{'id': c['id'], 'symbol': c['symbol'], 'name': c['name'], 'rank': c['market_cap_rank']}
+                 for c in markets]
+        with open(os.path.join(self.scratch, 'coins.json'), 'w') as f:
+            json.dump({'fetched_at': time.time(), 'coins': coins}, f)
+
+        os.chdir(self.scratch)
+        with self.quiet():
+            import app
+        self.app = app
+        self.fixtures = {name: fixtures.load(name) for name in fixtures.ENDPOINTS}
+
+        news = app.format_news_articles(self.fixtures['newsapi_top_headlines']['articles'])
+        app.content_db.add_news(news)
+        app.content_db.add_article({
+            'title': 'Bitcoin (BTC) market analysis',
+            'summary': 'What moved the market this week.',
+            'content': 'Lorem ipsum dolor sit amet. ' * 120,
+            'image_url': 'https://images.example.com/bitcoin.jpg',
+        }, topic='Bitcoin (BTC) market analysis')
+
+    def quiet(self):
+        """Silences the app's progress prints, which would flood the output."""
+        return contextlib.redirect_stdout(self._devnull)
+
+
+# --- Market data ---
+
+@benchmark
+def coingecko_markets_format(ctx):
+    body = ctx.fixtures['coingecko_coins_markets']
+    return lambda: ctx.app.format_coingecko_markets(body)
+
+
+@benchmark
+def binance_top_pairs(ctx):
+    from tickers import TickerTable
+    body = ctx.fixtures['binance_ticker_24hr']
+    # A fresh table each call, as each fetch converts its own payload
+    return lambda: ctx.app.binance_top_pairs(TickerTable.from_payload(body))
+
+
+@benchmark
+def market_payload_encode(ctx):
+    rows = ctx.app.format_coingecko_markets(ctx.fixtures['coingecko_coins_markets'])
+    return lambda: ctx.app.SerializedPayload(rows)
+
+
+@benchmark
+def fallback_market_data(ctx):
+    return ctx.app.get_fallback_market_data
+
+
+# --- Chart data ---
+
+@benchmark
+def kline_binance_format(ctx):
+    body = ctx.fixtures['binance_klines']
+    return lambda: run_offline(ctx.app.binance_klines_plan('BTC', '1d', len(body)), [body])
+
+
+@benchmark
+def kline_coingecko_format(ctx):
+    body = ctx.fixtures['coingecko_ohlc']
+    return lambda: run_offline(ctx.app.coingecko_ohlc_plan('BTC', days=100), [body])
+
+
+@benchmark
+def kline_payload_encode(ctx):
+    from kline_transforms import records_to_columns
+    candles = run_offline(ctx.app.binance_klines_plan('BTC', '1d', 1000), [ctx.fixtures['binance_klines']])
+    columns = records_to_columns(candles)
+    return lambda: ctx.app.kline_payload(columns, None)
+
+
+@benchmark
+def kline_payload_downsample(ctx):
+    from kline_transforms import records_to_columns
+    candles = run_offline(ctx.app.binance_klines_plan('BTC', '1d', 1000), [ctx.fixtures['binance_klines']])
+    columns = records_to_columns(candles)
+    return lambda: ctx.app.kline_payload(columns, 200)
+
+
+@benchmark
+def fallback_chart_data(ctx):
+    return lambda: ctx.app.get_fallback_chart_data('BTC')
+
+
+# --- Content storage and pages ---
+
+@benchmark
+def read_data(ctx):
+    return ctx.app.read_data
+
+
+@benchmark
+def write_news(ctx):
+    articles = ctx.fixtures['newsapi_top_headlines']['articles']
+    return lambda: ctx.app.content_db.add_news(ctx.app.format_news_articles(articles))
+
+
+@benchmark
+def home_render(ctx):
+    def render():
+        with ctx.app.app.test_request_context('/'):
+            return ctx.app.home()
+    return render
+
+
+# --- Running and comparing ---
+
+def time_callable(func, repeat):
+    """`(best_ms, median_ms, loops)` per call."""
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    runs = [elapsed / loops * 1000 for elapsed in timer.repeat(repeat=repeat, number=loops)]
+    return min(runs), statistics.median(runs), loops
+
+
+def git_commit():
+    try:
+        # e.g. "b1deb36-dirty" when run with uncommitted changes
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(pattern=None, repeat=5):
+    ctx = Context()
+    results = {}
+    print(f"App benchmarks (best / median per call, {repeat} runs)")
+    for name, setup in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        with ctx.quiet():
+            best, median, loops = time_callable(setup(ctx), repeat)
+        results[name] = {"best_ms": best, "median_ms": median, "loops": loops, "repeat": repeat}
+        print(f"  {name:<26} {best:10.4f} ms {median:10.4f} ms   ({loops} loops)")
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        "results": results,
+    }
+
+
+def compare(base, new, threshold):
+    """Prints each benchmark's change in best time; returns the names that
+    got slower by more than `threshold` (a fraction)."""
+    print(f"Comparing {base['meta'].get('commit')} -> {new['meta'].get('commit')} "
+          f"(regression above +{threshold:.0%})")
+    regressions = []
+    for name, result in new["results"].items():
+        before = base["results"].get(name)
+        if before is None:
+            print(f"  {name:<26} {'new':>10}   {result['best_ms']:10.4f} ms")
+            continue
+        change = result["best_ms"] / before["best_ms"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"  {name:<26} {before['best_ms']:10.4f} ms -> {result['best_ms']:10.4f} ms {change:+8.1%}{flag}")
+    for name in sorted(base["results"].keys() - new["results"].keys()):
+        print(f"  {name:<26} missing from the new run")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-k', dest='pattern', help="only run benchmarks whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark (default 5)")
+    parser.add_argument('--save', nargs='?', const='', metavar='PATH',
+                        help="write results as JSON (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', nargs='+', metavar='RESULTS',
+                        help="BASE to compare a fresh run against, or BASE NEW to compare two saved runs")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="percent slowdown counted as a regression (default 10)")
+    args = parser.parse_args()
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes BASE or BASE NEW")
+    # The run moves into a scratch directory, so resolve paths first
+    if args.save:
+        args.save = os.path.abspath(args.save)
+    args.compare = [os.path.abspath(path) for path in args.compare or ()]
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+    else:
+        current = run(args.pattern, args.repeat)
+
+    if args.save is not None:
+        path = args.save or os.path.join(RESULTS_DIR, f"{current['meta']['commit'] or 'results'}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved {path}")
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        if args.pattern:
+            base["results"] = {name: r for name, r in base["results"].items() if args.pattern in name}
+        if compare(base, current, args.threshold / 100):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Benchmark: per-candle Python loops vs the vectorized indicator engine.
+
+Runs offline on a synthetic random-walk series (100,000 candles by default)
+and times three things per indicator: a plain loop like the chart used to
+run client-side, a full vectorized computation, and an incremental update
+after one new candle arrives.
+
+    python benchmarks/bench_indicators.py [candles]
+"""
+import math
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import INDICATORS, IndicatorEngine, public_outputs
+
+CASES = [
+    ('sma', (20,)), ('ema', (20,)), ('rsi', (14,)), ('macd', (12, 26, 9)),
+    ('bollinger', (20, 2.0)), ('atr', (14,)), ('vwap', (1,)),
+]
+
+
+def make_candles(count=100000, seed=42, step=3600):
+    """Synthetic hourly OHLCV candles following a random walk."""
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.005, count)) * close
+    return {
+        'time': np.arange(count, dtype=np.int64) * step + 1_600_000_000,
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1, 100, count),
+    }
+
+
+def slice_candles(candles, start=None, end=None):
+    return {field: values[start:end] for field, values in candles.items()}
+
+
+# --- Loop implementations, kept here as the reference ---
+
+def _loop_ema(values, period, alpha):
+    out = [math.nan] * len(values)
+    if len(values) >= period:
+        out[period - 1] = sum(values[:period]) / period
+        for i in range(period, len(values)):
+            out[i] = alpha * values[i] + (1 - alpha) * out[i - 1]
+    return out
+
+
+def loop_sma(c, period):
+    close = c['close'].tolist()
+    out = [math.nan] * len(close)
+    for i in range(period - 1, len(close)):
+        out[i] = sum(close[i - period + 1:i + 1]) / period
+    return {'sma': out}
+
+
+def loop_ema(c, period):
+    return {'ema': _loop_ema(c['close'].tolist(), period, 2 / (period + 1))}
+
+
+def loop_rsi(c, period):
+    close = c['close'].tolist()
+    gains = [max(b - a, 0.0) for a, b in zip(close, close[1:])]
+    losses = [max(a - b, 0.0) for a, b in zip(close, close[1:])]
+    avg_gain = [math.nan] + _loop_ema(gains, period, 1 / period)
+    avg_loss = [math.nan] + _loop_ema(losses, period, 1 / period)
+    return {'rsi': [100.0 if l == 0 else 100 - 100 / (1 + g / l) if g == g else math.nan
+                    for g, l in zip(avg_gain, avg_loss)]}
+
+
+def loop_macd(c, fast, slow, signal):
+    close = c['close'].tolist()
+    macd = [f - s for f, s in zip(_loop_ema(close, fast, 2 / (fast + 1)), _loop_ema(close, slow, 2 / (slow + 1)))]
+    first = max(fast, slow) - 1
+    sig = [math.nan] * first + _loop_ema(macd[first:], signal, 2 / (signal + 1))
+    return {'macd': macd, 'signal': sig, 'histogram': [m - s for m, s in zip(macd, sig)]}
+
+
+def loop_bollinger(c, period, width):
+    close = c['close'].tolist()
+    middle, upper, lower = ([math.nan] * len(close) for _ in range(3))
+    for i in range(period - 1, len(close)):
+        window = close[i - period + 1:i + 1]
+        mean = sum(window) / period
+        std = math.sqrt(sum((x - mean) ** 2 for x in window) / period)
+        middle[i], upper[i], lower[i] = mean, mean + width * std, mean - width * std
+    return {'middle': middle, 'upper': upper, 'lower': lower}
+
+
+def loop_atr(c, period):
+    high, low, close = c['high'].tolist(), c['low'].tolist(), c['close'].tolist()
+    ranges = [high[0] - low[0]] + [max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+                                   for i in range(1, len(close))]
+    return {'atr': _loop_ema(ranges, period, 1 / period)}
+
+
+def loop_vwap(c, session):
+    out, pv, v, current = [], 0.0, 0.0, None
+    for t, h, l, cl, vol in zip(*(c[f].tolist() for f in ('time', 'high', 'low', 'close', 'volume'))):
+        day = t // (session * 86400)
+        if day != current:
+            pv, v, current = 0.0, 0.0, day
+        typical = (h + l + cl) / 3
+        pv += typical * vol
+        v += vol
+        out.append(pv / v if v > 0 else typical)
+    return {'vwap': out}
+
+
+LOOPS = {
+    'sma': loop_sma, 'ema': loop_ema, 'rsi': loop_rsi, 'macd': loop_macd,
+    'bollinger': loop_bollinger, 'atr': loop_atr, 'vwap': loop_vwap,
+}
+
+
+def assert_close(expected, actual, label):
+    for output, values in expected.items():
+        if not np.allclose(np.asarray(values, dtype=np.float64), actual[output], rtol=1e-9, atol=1e-9, equal_nan=True):
+            raise AssertionError(f"{label}: {output} differs from the loop implementation")
+
+
+def best_of(func, number=3, repeat=5):
+    """Best per-call time in milliseconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1000
+
+
+def run(count=100000):
+    candles = make_candles(count + 1)
+    history, latest = slice_candles(candles, end=count), candles
+
+    results = {}
+    print(f"Indicator benchmark ({count} candles)")
+    for name, params in CASES:
+        indicator = INDICATORS[name]
+        loop = LOOPS[name]
+
+        # Both the full and the incremental path must match the loop
+        vectorized = public_outputs(indicator.compute(history, params))
+        assert_close(loop(history, *params), vectorized, name)
+        engine = IndicatorEngine()
+        engine.compute(('BENCH', '1h'), name, params, history)
+        assert_close(loop(latest, *params), engine.compute(('BENCH', '1h'), name, params, latest), f"{name} incremental")
+
+        loop_ms = best_of(lambda: loop(history, *params), number=1, repeat=3)
+        vectorized_ms = best_of(lambda: indicator.compute(history, params))
+
+        def incremental():
+            # Re-prime with the old history, then time only the update
+            engine.compute(('BENCH', '1h'), name, params, history)
+            return timeit.timeit(lambda: engine.compute(('BENCH', '1h'), name, params, latest), number=1)
+        incremental_ms = min(incremental() for _ in range(5)) * 1000
+
+        results[name] = {"loop_ms": loop_ms, "vectorized_ms": vectorized_ms, "incremental_ms": incremental_ms}
+        print(f"  {name:<10} loop {loop_ms:9.2f} ms   vectorized {vectorized_ms:7.2f} ms   "
+              f"x{loop_ms / vectorized_ms:6.1f}   +1 candle {incremental_ms:6.3f} ms")
+    return results
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
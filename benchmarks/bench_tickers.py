@@ -0,0 +1,121 @@
+"""
+Benchmark: list-comprehension ticker handling vs the columnar TickerTable.
+
+Runs offline against a synthetic /ticker/24hr payload shaped like Binance's
+(~2,500 symbols, numeric fields as strings).
+
+    python benchmarks/bench_tickers.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tickers import TickerTable
+
+QUOTES = ['USDT', 'BTC', 'ETH', 'BNB', 'FDUSD', 'TRY', 'EUR']
+
+
+def make_ticker_payload(count=2500, seed=42):
+    """Synthetic /ticker/24hr response with string-encoded numbers."""
+    rng = random.Random(seed)
+    payload = []
+    for i in range(count):
+        price = rng.uniform(0.0001, 50000)
+        volume = rng.uniform(0, 1e9)
+        payload.append({
+            'symbol': f"C{i:04d}{rng.choice(QUOTES)}",
+            'priceChange': f"{price * rng.uniform(-0.1, 0.1):.8f}",
+            'priceChangePercent': f"{rng.uniform(-30, 30):.3f}",
+            'weightedAvgPrice': f"{price:.8f}",
+            'openPrice': f"{price * 0.98:.8f}",
+            'highPrice': f"{price * 1.05:.8f}",
+            'lowPrice': f"{price * 0.95:.8f}",
+            'lastPrice': f"{price:.8f}",
+            'volume': f"{volume:.8f}",
+            'quoteVolume': f"{volume * price:.8f}",
+            'count': rng.randint(0, 1000000),
+        })
+    return payload
+
+
+# --- Previous implementations, kept here for comparison ---
+
+def legacy_top_gainer(payload):
+    return sorted([coin for coin in payload if coin['symbol'].endswith('USDT')],
+                  key=lambda x: float(x['priceChangePercent']),
+                  reverse=True)[0]
+
+
+def legacy_top_markets(payload):
+    usdt_pairs = [item for item in payload if item['symbol'].endswith('USDT')]
+    usdt_pairs.sort(key=lambda x: float(x.get('quoteVolume', 0)), reverse=True)
+    return usdt_pairs[:100]
+
+
+def legacy_top_symbols(payload):
+    usdt_tickers = [t for t in payload if t['symbol'].endswith('USDT')]
+    usdt_tickers.sort(key=lambda x: float(x.get('quoteVolume', 0)), reverse=True)
+    return [t['symbol'].replace('USDT', '') for t in usdt_tickers[:100]]
+
+
+# --- Columnar implementations used by app.py ---
+# The app converts each fetched payload into one table shared by every
+# caller, so the queries take the table and its conversion is timed apart.
+
+def columnar_top_gainer(table):
+    return table.filter_quote('USDT').top_k('priceChangePercent', 1).records()[0]
+
+
+def columnar_top_markets(table):
+    return table.filter_quote('USDT').top_k('quoteVolume', 100).records()
+
+
+def columnar_top_symbols(table):
+    return table.filter_quote('USDT').top_k('quoteVolume', 100).base_assets('USDT')
+
+
+def best_of(func, payload, number=20, repeat=9):
+    """Best per-call time in milliseconds."""
+    return min(timeit.repeat(lambda: func(payload), number=number, repeat=repeat)) / number * 1000
+
+
+def run(count=2500):
+    payload = make_ticker_payload(count)
+    table = TickerTable.from_payload(payload)
+
+    # Both implementations must agree before timing them
+    assert legacy_top_gainer(payload) == columnar_top_gainer(table)
+    assert legacy_top_markets(payload) == columnar_top_markets(table)
+    assert legacy_top_symbols(payload) == columnar_top_symbols(table)
+
+    cases = [
+        ("top gainer", legacy_top_gainer, columnar_top_gainer),
+        ("top 100 markets", legacy_top_markets, columnar_top_markets),
+        ("top 100 symbols", legacy_top_symbols, columnar_top_symbols),
+    ]
+    results = {}
+    print(f"Ticker pipeline benchmark ({count} tickers)")
+    build_ms = best_of(TickerTable.from_payload, payload)
+    results["build table"] = {"columnar_ms": build_ms}
+    print(f"  {'build table':<18} once per fetch            columnar {build_ms:8.3f} ms")
+    for name, legacy, columnar in cases:
+        legacy_ms = best_of(legacy, payload)
+        columnar_ms = best_of(columnar, table)
+        results[name] = {"legacy_ms": legacy_ms, "columnar_ms": columnar_ms}
+        print(f"  {name:<18} legacy {legacy_ms:8.3f} ms   columnar {columnar_ms:8.3f} ms   "
+              f"x{legacy_ms / columnar_ms:.2f}")
+
+    # One fetch serving each query once, build included
+    legacy_total = sum(results[name]["legacy_ms"] for name, _, _ in cases)
+    columnar_total = build_ms + sum(results[name]["columnar_ms"] for name, _, _ in cases)
+    results["all three"] = {"legacy_ms": legacy_total, "columnar_ms": columnar_total}
+    print(f"  {'all three + build':<18} legacy {legacy_total:8.3f} ms   columnar {columnar_total:8.3f} ms   "
+          f"x{legacy_total / columnar_total:.2f}")
+    return results
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2500)
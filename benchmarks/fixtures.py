@@ -0,0 +1,75 @@
+"""
+Upstream response fixtures for the offline benchmarks.
+
+One gzipped JSON body per upstream endpoint the app calls, in
+benchmarks/fixtures/. The checked-in files were generated with fixed seeds
+to match the live responses field for field and in size (100 CoinGecko
+markets, 2,000 Binance tickers with string-encoded numbers, 1,000 daily
+klines), so benchmark results stay comparable between commits. Replace them
+with live captures, which needs network access (and NEWS_API_KEY for
+NewsAPI), with:
+
+    python benchmarks/fixtures.py record [name ...]
+
+The Gemini and Pexels fixtures are replayed only by upstream_sim.py, whose
+`--record` mode captures those too.
+"""
+import gzip
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+COINGECKO = "https://api.coingecko.com/api/v3"
+BINANCE = "https://api.binance.com/api/v3"
+
+# name -> (url, params) of the live request the fixture stands in for
+ENDPOINTS = {
+    'coingecko_coins_markets': (f"{COINGECKO}/coins/markets", {
+        'vs_currency': 'usd', 'order': 'market_cap_desc', 'per_page': 100, 'page': 1,
+        'sparkline': 'false', 'price_change_percentage': '24h'}),
+    'coingecko_ohlc': (f"{COINGECKO}/coins/bitcoin/ohlc", {'vs_currency': 'usd', 'days': 100}),
+    'binance_ticker_24hr': (f"{BINANCE}/ticker/24hr", {}),
+    'binance_klines': (f"{BINANCE}/klines", {'symbol': 'BTCUSDT', 'interval': '1d', 'limit': 1000}),
+    'newsapi_top_headlines': ("https://newsapi.org/v2/top-headlines", {
+        'category': 'business', 'language': 'en', 'sortBy': 'publishedAt', 'pageSize': 10}),
+}
+
+
+def path(name):
+    return os.path.join(FIXTURE_DIR, f"{name}.json.gz")
+
+
+def load(name):
+    """The decoded JSON body of fixture `name`."""
+    with gzip.open(path(name), 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save(name, data):
+    # mtime=0 keeps re-recorded files byte-identical when the data is
+    with open(path(name), 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+        f.write(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+
+def record(names=None):
+    """Fetches each endpoint live and overwrites its fixture."""
+    import http_client
+
+    for name in names or ENDPOINTS:
+        url, params = ENDPOINTS[name]
+        if name.startswith('newsapi'):
+            params = {**params, 'apiKey': os.environ.get('NEWS_API_KEY', '')}
+        response = http_client.get(url, params=params)
+        response.raise_for_status()
+        save(name, response.json())
+        print(f"Recorded {name} ({os.path.getsize(path(name))} bytes gzipped)")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] != ['record']:
+        sys.exit(__doc__)
+    record(sys.argv[2:])
@@ -0,0 +1,145 @@
+"""
+Load driver for a running app: throughput and latency percentiles per route.
+
+Meant to run against the app pointed at upstream_sim.py, so results depend
+on the app and the simulated upstream behaviour rather than on live APIs:
+
+    python benchmarks/upstream_sim.py --latency lognormal:80:0.5      # terminal 1
+    export BINANCE_API_URL=...  (as printed by the simulator)          # terminal 2
+    gunicorn -c gunicorn.conf.py wsgi:app
+    python benchmarks/load_test.py --concurrency 32 --duration 30      # terminal 3
+
+Each of `--concurrency` threads sends requests back to back over its own
+keep-alive connection, cycling through the route mix (each thread starting
+at a different route). Requests finishing in the first `--warmup` seconds
+are not counted, so cold caches and connection setup do not skew the
+results. Any response other than a 200, and any connection error, counts
+as an error; its latency is still recorded.
+"""
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+
+import requests
+
+DEFAULT_ROUTES = [
+    '/api/market-data',
+    '/api/kline-data/BTC',
+    '/api/kline-data/ETH?interval=1h&range=7d',
+    '/api/kline-data?symbols=BTC,ETH,SOL&interval=1d',
+    '/api/indicators/BTC?indicators=sma:20,rsi:14',
+    '/api/news',
+    '/api/search?q=bt',
+    '/',
+]
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    if not ordered:
+        return None
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def worker(base_url, routes, offset, until, counted_from, results):
+    session = requests.Session()
+    i = offset
+    while True:
+        route = routes[i % len(routes)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            response = session.get(base_url + route, timeout=60)
+            response.content
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        finished = time.perf_counter()
+        if finished >= until:
+            return
+        if finished >= counted_from:
+            results.append((route, finished - started, ok))
+
+
+def summarize(latencies, errors, seconds):
+    ordered = sorted(latencies)
+    ms = lambda value: None if value is None else round(value * 1000, 2)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / seconds, 1),
+        "p50_ms": ms(percentile(ordered, 0.50)),
+        "p90_ms": ms(percentile(ordered, 0.90)),
+        "p99_ms": ms(percentile(ordered, 0.99)),
+        "max_ms": ms(ordered[-1] if ordered else None),
+    }
+
+
+def run(base_url, routes, concurrency, duration, warmup):
+    start = time.perf_counter()
+    counted_from = start + warmup
+    until = counted_from + duration
+    per_thread = [[] for _ in range(concurrency)]
+    threads = [
+        threading.Thread(target=worker, args=(base_url, routes, n, until, counted_from, per_thread[n]), daemon=True)
+        for n in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    by_route = {route: ([], 0) for route in routes}
+    for results in per_thread:
+        for route, seconds, ok in results:
+            latencies, errors = by_route[route]
+            latencies.append(seconds)
+            by_route[route] = (latencies, errors + (not ok))
+    report = {route: summarize(latencies, errors, duration) for route, (latencies, errors) in by_route.items()}
+    everything = [seconds for latencies, _ in by_route.values() for seconds in latencies]
+    report["all"] = summarize(everything, sum(errors for _, errors in by_route.values()), duration)
+    return report
+
+
+def print_report(report):
+    print(f"  {'route':<48} {'reqs':>7} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p90 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    for route, row in report.items():
+        cells = [f"{row[key]:>9}" if row[key] is not None else f"{'-':>9}"
+                 for key in ("p50_ms", "p90_ms", "p99_ms", "max_ms")]
+        print(f"  {route[:48]:<48} {row['requests']:>7} {row['errors']:>6} {row['rps']:>8} {' '.join(cells)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help="app base URL (default %(default)s)")
+    parser.add_argument('--concurrency', type=int, default=32, help="concurrent clients (default 32)")
+    parser.add_argument('--duration', type=float, default=30, help="measured seconds (default 30)")
+    parser.add_argument('--warmup', type=float, default=5, help="unmeasured seconds first (default 5)")
+    parser.add_argument('--route', action='append', dest='routes', metavar='PATH',
+                        help="route to request, repeatable (default: a mix of the API routes and /)")
+    parser.add_argument('--json', metavar='PATH', help="also write the report as JSON")
+    args = parser.parse_args()
+
+    routes = args.routes or DEFAULT_ROUTES
+    base_url = args.url.rstrip('/')
+    print(f"Load testing {base_url}: {args.concurrency} clients, {args.warmup:g}s warmup, "
+          f"{args.duration:g}s measured, {len(routes)} routes")
+    report = run(base_url, routes, args.concurrency, args.duration, args.warmup)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"url": base_url, "concurrency": args.concurrency, "duration": args.duration,
+                       "warmup": args.warmup, "routes": report}, f, indent=2)
+        print(f"Saved {args.json}")
+    if report["all"]["requests"] == 0:
+        sys.exit("No requests completed; is the app running?")
+
+
+if __name__ == '__main__':
+    main()
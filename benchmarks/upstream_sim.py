@@ -0,0 +1,380 @@
+"""
+Local stand-in for every upstream the app calls, for end-to-end load tests.
+
+Serves all five upstreams from one port, each under its own path prefix, by
+replaying the response fixtures in benchmarks/fixtures/:
+
+    /coingecko/api/v3/coins/markets, /coins/list, /coins/<id>/ohlc
+    /binance/api/v3/ticker/24hr, /klines
+    /newsapi/v2/top-headlines
+    /gemini/v1beta/models/<model>:generateContent   (POST)
+    /pexels/v1/search
+
+Klines and OHLC are re-stamped to end at the current candle and honour
+`interval`, `limit` and `startTime`, so the candle store's incremental
+top-ups behave as they do against Binance.
+
+Each upstream can be given a latency distribution, an error rate (500, 502
+or 503), a timeout rate (the response is held for --hang-seconds, past the
+app's read timeout) and a per-minute rate limit. Over the limit, requests
+get a 429 with Retry-After, and Binance responses carry
+X-MBX-USED-WEIGHT-1M with the same request weights Binance uses. Settings
+apply to every upstream, or to one with an `upstream=` prefix:
+
+    python benchmarks/upstream_sim.py --latency lognormal:80:0.5 \\
+        --latency binance=uniform:20:60 --error-rate 0.01 --rate-limit coingecko=30
+
+Latencies are in milliseconds: `50` (fixed), `uniform:LOW:HIGH`, or
+`lognormal:MEDIAN:SIGMA`.
+
+With --record the simulator proxies every request to the live upstream
+instead, saving each successful JSON response as the endpoint's fixture.
+
+On start it prints the environment variables that point the app at it.
+Counts per upstream and outcome are served at /_sim/stats.
+"""
+import argparse
+import gzip
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(BENCH_DIR))
+sys.path.append(BENCH_DIR)
+
+import fixtures
+from kline_transforms import INTERVAL_SECONDS, bucket_start
+
+UPSTREAMS = ('coingecko', 'binance', 'newsapi', 'gemini', 'pexels')
+
+# Live origins, for --record
+LIVE = {
+    'coingecko': "https://api.coingecko.com",
+    'binance': "https://api.binance.com",
+    'newsapi': "https://newsapi.org",
+    'gemini': "https://generativelanguage.googleapis.com",
+    'pexels': "https://api.pexels.com",
+}
+
+# App setting -> base URL path on the simulator
+APP_SETTINGS = {
+    'COINGECKO_API_URL': "/coingecko/api/v3",
+    'BINANCE_API_URL': "/binance/api/v3",
+    'NEWS_API_URL': "/newsapi/v2/top-headlines",
+    'GEMINI_API_URL': "/gemini/v1beta/models/gemini-pro:generateContent",
+    'PEXELS_API_URL': "/pexels/v1/search",
+}
+
+# (method, path pattern, fixture name)
+ROUTES = [
+    ('GET', re.compile(r'^/coingecko/api/v3/coins/markets$'), 'coingecko_coins_markets'),
+    ('GET', re.compile(r'^/coingecko/api/v3/coins/list$'), 'coingecko_coins_list'),
+    ('GET', re.compile(r'^/coingecko/api/v3/coins/[^/]+/ohlc$'), 'coingecko_ohlc'),
+    ('GET', re.compile(r'^/binance/api/v3/ticker/24hr$'), 'binance_ticker_24hr'),
+    ('GET', re.compile(r'^/binance/api/v3/klines$'), 'binance_klines'),
+    ('GET', re.compile(r'^/newsapi/v2/top-headlines$'), 'newsapi_top_headlines'),
+    ('POST', re.compile(r'^/gemini/v1beta/models/[^/]+:generateContent$'), 'gemini_generate_content'),
+    ('GET', re.compile(r'^/pexels/v1/search$'), 'pexels_search'),
+]
+
+ERROR_STATUSES = (500, 502, 503)
+
+
+def parse_latency(text):
+    """A sampler of seconds from a spec in milliseconds: `N`, `uniform:LOW:HIGH`
+    or `lognormal:MEDIAN:SIGMA` (SIGMA is the spread of the log, unitless)."""
+    kind, _, args = text.partition(':')
+    try:
+        values = [float(v) for v in args.split(':')] if args else []
+        if not args:
+            fixed = float(kind) / 1000
+            return lambda rng: fixed
+        if kind == 'uniform' and len(values) == 2:
+            low, high = values[0] / 1000, values[1] / 1000
+            return lambda rng: rng.uniform(low, high)
+        if kind == 'lognormal' and len(values) == 2:
+            median, sigma = values[0] / 1000, values[1]
+            return lambda rng: median * math.exp(rng.gauss(0, sigma))
+    except ValueError:
+        pass
+    raise SystemExit(f"invalid latency {text!r}")
+
+
+def binance_weight(path, params):
+    """Request weight as Binance counts it (cf. app.binance_request_weight)."""
+    if path.endswith('/ticker/24hr'):
+        return 2 if 'symbol' in params else 80
+    if path.endswith('/klines'):
+        return 2
+    return 1
+
+
+class Upstream:
+    """Simulated behaviour and counters of one upstream."""
+
+    def __init__(self, name, latency, error_rate, timeout_rate, rate_limit):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.rate_limit = rate_limit
+
+        self._lock = threading.Lock()
+        self._window = 0
+        self._used = 0
+        self.outcomes = {}
+
+    def charge(self, weight):
+        """Counts `weight` against this minute's limit. Returns `(used,
+        retry_after)`, where retry_after is None if the request may proceed."""
+        now = time.time()
+        with self._lock:
+            window = int(now // 60)
+            if window != self._window:
+                self._window, self._used = window, 0
+            if self.rate_limit is not None and self._used + weight > self.rate_limit:
+                return self._used, math.ceil((window + 1) * 60 - now)
+            self._used += weight
+            return self._used, None
+
+    def count(self, outcome):
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+
+# --- Replayed bodies ---
+
+def _fixture(name):
+    if name == 'coingecko_coins_list':
+        try:
+            return fixtures.load(name)
+        except FileNotFoundError:
+            # Derived from the markets fixture unless one was recorded
+            return [{'id': c['id'], 'symbol': c['symbol'], 'name': c['name']}
+                    for c in fixtures.load('coingecko_coins_markets')]
+    return fixtures.load(name)
+
+
+def replay_klines(rows, params):
+    interval = params.get('interval', '1d')
+    if interval not in INTERVAL_SECONDS:
+        return 400, {"code": -1120, "msg": "Invalid interval."}
+    step = INTERVAL_SECONDS[interval]
+    limit = min(int(params.get('limit', 500)), 1000)
+    current = int(bucket_start(int(time.time()), interval))
+    if 'startTime' in params:
+        start = int(params['startTime']) // 1000
+        first = int(bucket_start(start, interval))
+        if first < start:
+            first += step
+        count = max(min(limit, (current - first) // step + 1), 0)
+    else:
+        count = limit
+        first = current - (count - 1) * step
+    candles = []
+    for i in range(count):
+        row = list(rows[i % len(rows)])
+        opened = (first + i * step) * 1000
+        row[0], row[6] = opened, opened + step * 1000 - 1
+        candles.append(row)
+    return 200, candles
+
+
+def replay(name, params, data):
+    """`(status, body)` for a request to fixture `name`."""
+    if name == 'coingecko_coins_markets':
+        return 200, data[:int(params.get('per_page', 100))]
+    if name == 'coingecko_ohlc':
+        shift = int(time.time()) * 1000 - data[-1][0]
+        return 200, [[row[0] + shift, *row[1:]] for row in data]
+    if name == 'binance_ticker_24hr' and 'symbol' in params:
+        match = next((t for t in data if t['symbol'] == params['symbol']), None)
+        if match is None:
+            return 400, {"code": -1121, "msg": "Invalid symbol."}
+        return 200, match
+    if name == 'binance_klines':
+        return replay_klines(data, params)
+    return 200, data
+
+
+class Simulator:
+    """Request handling shared by the server threads."""
+
+    def __init__(self, upstreams, hang_seconds=60.0, seed=None, record=False):
+        self.upstreams = upstreams
+        self.hang_seconds = hang_seconds
+        self.record = record
+        self.fixtures = {} if record else {name: _fixture(name) for _, _, name in ROUTES}
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        # Static bodies are encoded once; klines and OHLC change every call
+        self._encoded = {}
+
+    def request_rng(self):
+        """An RNG for one request, drawn from the seeded one."""
+        with self._rng_lock:
+            return random.Random(self._rng.random())
+
+    def encoded(self, name, body, static):
+        if static and name in self._encoded:
+            return self._encoded[name]
+        raw = json.dumps(body, separators=(',', ':')).encode('utf-8')
+        encoded = (raw, gzip.compress(raw, compresslevel=5 if static else 1))
+        if static:
+            self._encoded[name] = encoded
+        return encoded
+
+    def stats(self):
+        return {name: dict(upstream.outcomes) for name, upstream in self.upstreams.items()}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    simulator = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _send(self, status, body, headers=(), name=None, static=False):
+        if isinstance(body, bytes):
+            raw, compressed = body, None
+        else:
+            raw, compressed = self.simulator.encoded(name, body, static)
+        payload = raw
+        extra = list(headers)
+        if compressed is not None and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            payload = compressed
+            extra.append(('Content-Encoding', 'gzip'))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in extra:
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self, method):
+        parts = urlsplit(self.path)
+        request_body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if parts.path == '/_sim/stats':
+            return self._send(200, json.dumps(self.simulator.stats()).encode('utf-8'))
+        route = next((name for m, pattern, name in ROUTES if m == method and pattern.match(parts.path)), None)
+        if route is None:
+            return self._send(404, b'{"error":"not simulated"}')
+        upstream = self.simulator.upstreams[parts.path.split('/')[1]]
+        params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+        if self.simulator.record:
+            return self._record(route, upstream, method, parts, request_body)
+
+        rng = self.simulator.request_rng()
+        weight = binance_weight(parts.path, params) if upstream.name == 'binance' else 1
+        used, retry_after = upstream.charge(weight)
+        headers = [('X-MBX-USED-WEIGHT-1M', str(used))] if upstream.name == 'binance' else []
+        time.sleep(upstream.latency(rng))
+
+        if retry_after is not None:
+            upstream.count('throttled')
+            return self._send(429, b'{"error":"rate limited"}', headers + [('Retry-After', str(retry_after))])
+        roll = rng.random()
+        if roll < upstream.timeout_rate:
+            upstream.count('timeout')
+            time.sleep(self.simulator.hang_seconds)
+            return self._send(504, b'{"error":"simulated timeout"}', headers)
+        if roll < upstream.timeout_rate + upstream.error_rate:
+            upstream.count('error')
+            return self._send(rng.choice(ERROR_STATUSES), b'{"error":"simulated failure"}', headers)
+
+        status, body = replay(route, params, self.simulator.fixtures[route])
+        upstream.count('ok' if status == 200 else 'client_error')
+        static = body is self.simulator.fixtures[route]
+        self._send(status, body, headers, name=route, static=static)
+
+    def _record(self, route, upstream, method, parts, request_body):
+        import http_client
+
+        url = LIVE[upstream.name] + parts.path[len(upstream.name) + 1:]
+        forward = {k: v for k, v in self.headers.items() if k in ('Authorization', 'Content-Type', 'X-Api-Key')}
+        response = http_client.request(method, f"{url}?{parts.query}" if parts.query else url,
+                                       data=request_body or None, headers=forward)
+        upstream.count(f"recorded_{response.status_code}")
+        if response.status_code == 200:
+            fixtures.save(route, response.json())
+            print(f"Recorded {route}")
+        self._send(response.status_code, response.content)
+
+
+def per_upstream(values, parse, default):
+    """`{upstream: setting}` from `[upstream=]value` arguments; a value for
+    one upstream wins over a value for all, whatever their order."""
+    settings = {name: default for name in UPSTREAMS}
+    scoped = []
+    for value in values or ():
+        name, sep, spec = value.partition('=')
+        if not sep:
+            settings = {name: parse(value) for name in UPSTREAMS}
+        elif name not in UPSTREAMS:
+            raise SystemExit(f"unknown upstream {name!r}; expected one of {', '.join(UPSTREAMS)}")
+        else:
+            scoped.append((name, spec))
+    for name, spec in scoped:
+        settings[name] = parse(spec)
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays recorded upstream responses for load tests.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--latency', action='append', metavar='[UPSTREAM=]MS',
+                        help="response latency in ms: N, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--error-rate', action='append', metavar='[UPSTREAM=]P',
+                        help="share of requests answered with a 5xx (default 0)")
+    parser.add_argument('--timeout-rate', action='append', metavar='[UPSTREAM=]P',
+                        help="share of requests held for --hang-seconds (default 0)")
+    parser.add_argument('--rate-limit', action='append', metavar='[UPSTREAM=]N',
+                        help="requests (Binance: request weight) per minute before 429s")
+    parser.add_argument('--hang-seconds', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, help="seed for repeatable latencies and failures")
+    parser.add_argument('--record', action='store_true', help="proxy to the live upstreams and save fixtures")
+    args = parser.parse_args()
+
+    latency = per_upstream(args.latency, parse_latency, parse_latency('0'))
+    error_rate = per_upstream(args.error_rate, float, 0.0)
+    timeout_rate = per_upstream(args.timeout_rate, float, 0.0)
+    rate_limit = per_upstream(args.rate_limit, int, None)
+    upstreams = {
+        name: Upstream(name, latency[name], error_rate[name], timeout_rate[name], rate_limit[name])
+        for name in UPSTREAMS
+    }
+
+    Handler.simulator = Simulator(upstreams, args.hang_seconds, args.seed, args.record)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    base = f"http://{args.host}:{args.port}"
+    print(f"Upstream simulator on {base}{' (recording)' if args.record else ''}. Point the app at it with:")
+    for setting, path in APP_SETTINGS.items():
+        print(f"  export {setting}={base}{path}")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""
+Persistent, memory-mapped OHLCV candle store.
+
+Each (symbol, interval) series is a directory with one append-only binary
+file per column (time as int64 seconds, prices and volume as float64).
+Reads memory-map the columns and return zero-copy slices, so serving the
+latest N candles costs O(N) regardless of how much history is stored.
+
+Writes only ever append candles newer than the last stored one, except that
+the last candle may be overwritten in place while it is still open. If a
+crash leaves the column files with different lengths, the shortest length
+wins on the next read. Extending history backwards rewrites the series into
+fresh files that replace the old ones.
+
+`merge()` stores a freshly fetched window and reads it back under the same
+lock, and never drops stored history the window overlaps, so concurrent
+fetches of different ranges of one series cannot truncate each other's
+results. When a fetch shows the upstream's history starts later than asked
+(a recent listing), that start is remembered, so later requests for longer
+ranges top the series up instead of re-fetching it whole.
+
+Several server processes may share a store: writes also hold an exclusive
+lock file per series, and readers remap when another process has grown or
+replaced the files.
+"""
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single process only
+    fcntl = None
+
+COLUMNS = {
+    'time': np.dtype('<i8'),
+    'open': np.dtype('<f8'),
+    'high': np.dtype('<f8'),
+    'low': np.dtype('<f8'),
+    'close': np.dtype('<f8'),
+    'volume': np.dtype('<f8'),
+}
+
+# Symbols and intervals become directory names, so only allow plain tokens
+_SAFE_NAME = re.compile(r'^[A-Za-z0-9]{1,20}$')
+
+
+def candles_to_records(columns, fields=('time', 'open', 'high', 'low', 'close')):
+    """Converts column arrays into the list-of-dicts format the chart expects."""
+    values = [columns[field].tolist() for field in fields]
+    return [dict(zip(fields, row)) for row in zip(*values)]
+
+
+class CandleSeries:
+    """One symbol/interval series backed by per-column files."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._maps = None
+        self._mapped_state = None
+
+    def _path(self, column):
+        return os.path.join(self.directory, f"{column}.bin")
+
+    def _state(self):
+        """(length, time file inode): the common length of the column files,
+        and which version of the files a replace() left behind."""
+        lengths = []
+        for column, dtype in COLUMNS.items():
+            try:
+                info = os.stat(self._path(column))
+            except FileNotFoundError:
+                return 0, None
+            lengths.append(info.st_size // dtype.itemsize)
+            if column == 'time':
+                inode = info.st_ino
+        return min(lengths), inode
+
+    @contextmanager
+    def _exclusive(self):
+        """Serializes writers across threads and processes."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _columns(self):
+        """Current column memmaps, remapped when the files have grown or been
+        replaced."""
+        state = self._state()
+        length = state[0]
+        if self._maps is None or state != self._mapped_state:
+            if length == 0:
+                self._maps = {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS.items()}
+            else:
+                self._maps = {
+                    column: np.memmap(self._path(column), dtype=dtype, mode='r', shape=(length,))
+                    for column, dtype in COLUMNS.items()
+                }
+            self._mapped_state = state
+        return self._maps
+
+    def __len__(self):
+        with self._lock:
+            return len(self._columns()['time'])
+
+    def first_time(self):
+        """Open time of the oldest stored candle, or None if empty."""
+        with self._lock:
+            times = self._columns()['time']
+            return int(times[0]) if len(times) else None
+
+    def last_time(self):
+        """Open time of the newest stored candle, or None if empty."""
+        with self._lock:
+            times = self._columns()['time']
+            return int(times[-1]) if len(times) else None
+
+    def _history_path(self):
+        return os.path.join(self.directory, 'history_start')
+
+    def history_start(self):
+        """Earliest open time the upstream has for this series, if known."""
+        try:
+            with open(self._history_path(), 'rb') as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def top_up_start(self, start):
+        """Open time to fetch from so the series covers `start` to now: the
+        newest stored candle if the stored series already reaches back to
+        `start` (or to the start of the upstream's history), else `start`."""
+        first, last = self.first_time(), self.last_time()
+        covered_from = max(start, self.history_start() or start)
+        if last is None or first > covered_from or last < start:
+            # Empty, too short, or too far behind to be worth bridging
+            return start
+        # Includes the still-open newest candle, which is overwritten in place
+        return last
+
+    def read(self, start=None, end=None, limit=None):
+        """Zero-copy column views for candles with start <= time <= end,
+        keeping only the newest `limit` of them."""
+        with self._lock:
+            columns = self._columns()
+        return self._slice(columns, start, end, limit)
+
+    @staticmethod
+    def _slice(columns, start=None, end=None, limit=None):
+        times = columns['time']
+        lo = int(np.searchsorted(times, start, side='left')) if start is not None else 0
+        hi = int(np.searchsorted(times, end, side='right')) if end is not None else len(times)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return {column: values[lo:hi] for column, values in columns.items()}
+
+    def tail(self, count):
+        return self.read(limit=count)
+
+    @staticmethod
+    def _to_columns(candles):
+        if isinstance(candles, dict):
+            return {column: np.asarray(candles.get(column, np.zeros(len(candles['time']))), dtype=dtype)
+                    for column, dtype in COLUMNS.items()}
+        return {column: np.array([c.get(column, 0) for c in candles], dtype=dtype)
+                for column, dtype in COLUMNS.items()}
+
+    def write(self, candles):
+        """Stores candle dicts (or column arrays) sorted by time. Candles older
+        than the newest stored one are ignored; one with the same time
+        replaces it. Returns the number of candles appended."""
+        columns = self._to_columns(candles)
+        if len(columns['time']) == 0:
+            return 0
+        with self._exclusive():
+            return self._append(columns)
+
+    def _append(self, columns):
+        stored = self._columns()
+        length = len(stored['time'])
+        last = int(stored['time'][-1]) if length else None
+        times = columns['time']
+        if last is not None:
+            # Overwrite the still-open newest candle in place
+            same = np.flatnonzero(times == last)
+            if len(same):
+                i = same[-1]
+                for column, dtype in COLUMNS.items():
+                    with open(self._path(column), 'r+b') as f:
+                        f.seek((length - 1) * dtype.itemsize)
+                        f.write(columns[column][i:i + 1].tobytes())
+            keep = times > last
+            columns = {column: values[keep] for column, values in columns.items()}
+
+        appended = len(columns['time'])
+        if appended:
+            for column in COLUMNS:
+                with open(self._path(column), 'ab') as f:
+                    f.write(columns[column].tobytes())
+        # Drop the cached maps so the next read sees the new data
+        self._maps = None
+        return appended
+
+    def replace(self, candles):
+        """Replaces the whole series with `candles`, sorted by time. Views
+        handed out earlier keep reading the old files."""
+        columns = self._to_columns(candles)
+        with self._exclusive():
+            return self._rewrite(columns)
+
+    def _rewrite(self, columns):
+        for column in COLUMNS:
+            tmp_path = self._path(column) + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(columns[column].tobytes())
+            os.replace(tmp_path, self._path(column))
+        self._maps = None
+        return len(columns['time'])
+
+    def merge(self, candles, fetched_from, start=None):
+        """Stores `candles`, fetched from the upstream starting at open time
+        `fetched_from` and running to the newest candle, and returns
+        `read(start=start)` as of right after the write.
+
+        Stored candles the fetch overlaps are kept: if the stored series
+        begins earlier it is only appended to, and if it begins later the
+        fetch replaces its overlapping part. A stored series the fetch does
+        not reach is replaced, as there would be a gap between them."""
+        columns = self._to_columns(candles)
+        with self._exclusive():
+            times = columns['time']
+            if len(times):
+                stored = self._columns()
+                stored_times = stored['time']
+                if len(stored_times) == 0 or times[0] > stored_times[-1]:
+                    self._rewrite(columns)
+                elif stored_times[0] <= times[0]:
+                    self._append(columns)
+                else:
+                    newer = stored_times > times[-1]
+                    self._rewrite({column: np.concatenate((columns[column], stored[column][newer]))
+                                   for column in COLUMNS})
+                if times[0] > fetched_from:
+                    # The upstream has nothing older
+                    tmp_path = self._history_path() + '.tmp'
+                    with open(tmp_path, 'wb') as f:
+                        f.write(str(int(times[0])).encode())
+                    os.replace(tmp_path, self._history_path())
+            return self._slice(self._columns(), start)
+
+
+class CandleStore:
+    """Directory of candle series keyed by (symbol, interval)."""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._series = {}
+
+    @staticmethod
+    def is_valid_key(symbol, interval):
+        return bool(_SAFE_NAME.match(symbol) and _SAFE_NAME.match(interval))
+
+    def series(self, symbol, interval):
+        """Returns the series for a symbol/interval, creating it on first write."""
+        if not self.is_valid_key(symbol, interval):
+            raise ValueError(f"invalid candle series key: {symbol}/{interval}")
+        key = (symbol.upper(), interval)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = CandleSeries(os.path.join(self.root, key[0], interval))
+            return series
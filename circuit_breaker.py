@@ -0,0 +1,183 @@
+"""
+Per-upstream circuit breakers.
+
+A breaker opens after `failure_threshold` consecutive failures and then
+rejects calls immediately with CircuitOpenError, so callers skip straight to
+their next provider or fallback instead of waiting out a timeout. Once
+`reset_timeout` seconds have passed, exactly one call is let through as a
+half-open probe: success closes the breaker, failure re-opens it. A probe
+that ends without saying anything about the upstream (cancelled, or never
+sent for lack of rate budget) is released, and the next call probes instead.
+
+Client errors do not count against the upstream, except throttling: a 429,
+or Binance's 418 once an IP is banned for ignoring 429s, opens the breaker
+at once, for as long as its Retry-After asks if that is longer than
+`reset_timeout`, so a throttled upstream is left alone rather than hammered.
+"""
+import asyncio
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+
+# Too Many Requests, and Binance's "I'm a teapot" IP ban
+THROTTLED_STATUSES = (418, 429)
+
+
+def _status(error):
+    return getattr(getattr(error, 'response', None), 'status_code', None)
+
+
+def should_trip(error):
+    """Client errors (4xx other than 418/429) mean the upstream is healthy."""
+    status = _status(error)
+    if status is not None and 400 <= status < 500 and status not in THROTTLED_STATUSES:
+        return False
+    return True
+
+
+def retry_after(error):
+    """Seconds a throttling error's Retry-After header asks for, or None."""
+    headers = getattr(error.response, 'headers', None) or {}
+    value = headers.get('Retry-After', '')
+    return int(value) if value.isdigit() else None
+
+
+class CircuitBreaker:
+    """Tracks consecutive failures of a single upstream."""
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._open_for = reset_timeout
+        self._probe_in_flight = False
+        self._transitions = {}
+        self._rejected = 0
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow(self):
+        """Returns True if a call may go to the upstream right now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self._open_for:
+                self._transition(HALF_OPEN)
+                self._probe_in_flight = True
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                # The last probe was released without an outcome
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def release_probe(self):
+        """Lets another half-open probe through without changing state."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._open(self.reset_timeout)
+
+    def trip(self, open_for=None):
+        """Opens the breaker now, for `open_for` seconds if that is longer
+        than `reset_timeout`."""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            self._open(max(self.reset_timeout, open_for or 0))
+
+    def _open(self, open_for):
+        if self._state != OPEN:
+            self._transition(OPEN)
+        self._opened_at = time.monotonic()
+        self._open_for = open_for
+
+    def call(self, func, *args, **kwargs):
+        """Calls `func` through the breaker, raising CircuitOpenError while open."""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._record_error(e)
+            raise
+        self.record_success()
+        return result
+
+    async def acall(self, func, *args, **kwargs):
+        """Awaits coroutine function `func` through the breaker."""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            self.release_probe()
+            raise
+        except Exception as e:
+            self._record_error(e)
+            raise
+        self.record_success()
+        return result
+
+    def _record_error(self, error):
+        if getattr(error, 'before_request', False):
+            # Never reached the upstream (e.g. no rate budget left), so it
+            # says nothing about the upstream's health
+            self.release_probe()
+        elif _status(error) in THROTTLED_STATUSES:
+            self.trip(retry_after(error))
+        elif should_trip(error):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def stats(self):
+        with self._lock:
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = max(self._open_for - (time.monotonic() - self._opened_at), 0)
+            return {
+                "name": self.name,
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "probe_in_flight": self._probe_in_flight,
+                "retry_in_seconds": retry_in,
+                "rejected_calls": self._rejected,
+                "transitions": dict(self._transitions),
+            }
+
+    def _transition(self, state):
+        key = f"{self._state}->{state}"
+        self._transitions[key] = self._transitions.get(key, 0) + 1
+        print(f"Circuit breaker {self.name}: {self._state} -> {state}")
+        self._state = state
@@ -0,0 +1,176 @@
+"""
+Coin registry: symbol/id lookup and prefix search over CoinGecko's coin list.
+
+The list is loaded in a background thread, started by `start()` or by the
+first lookup, from the copy persisted on disk when there is one and from
+upstream otherwise, and refreshed the same way once it is older than
+`max_age`. Lookups never wait for a load: until the first one finishes they
+answer from a small static fallback list. Each load builds an immutable
+index that is swapped in whole, so lookups never take a lock:
+
+- symbol -> coins sharing that ticker, best market-cap rank first, and
+  id -> coin, both plain dicts;
+- a sorted list of lowercase symbols, names and ids, searched by prefix
+  with bisect. Coins are stored in rank order and a parallel array holds
+  each key's coin position, so the best-ranked matches in a prefix range
+  are picked with one NumPy partition instead of a sort.
+"""
+import bisect
+import json
+import threading
+import time
+
+import numpy as np
+
+from atomic_write import atomic_write_json
+
+# Sort key for coins without a market-cap rank
+UNRANKED = 10 ** 9
+
+
+def _rank_key(coin):
+    rank = coin.get('rank')
+    return (rank if rank else UNRANKED, coin['id'])
+
+
+class _Index:
+    """Lookup structures for one version of the coin list."""
+
+    def __init__(self, coins, fetched_at):
+        self.fetched_at = fetched_at
+        self.coins = sorted(coins, key=_rank_key)
+        self.by_id = {coin['id']: coin for coin in self.coins}
+        self.by_symbol = {}
+        for coin in self.coins:
+            self.by_symbol.setdefault(coin['symbol'].upper(), []).append(coin)
+
+        entries = set()
+        for position, coin in enumerate(self.coins):
+            for text in (coin['symbol'], coin['name'], coin['id']):
+                if text:
+                    entries.add((text.lower(), position))
+        entries = sorted(entries)
+        self.keys = [key for key, _ in entries]
+        # Coins are sorted by rank, so the position doubles as the rank order
+        self.positions = np.array([position for _, position in entries], dtype=np.int64)
+
+    def search(self, query, limit):
+        lo = bisect.bisect_left(self.keys, query)
+        hi = bisect.bisect_left(self.keys, query + '\uffff')
+        results = list(self.by_symbol.get(query.upper(), ()))[:limit]
+        seen = {coin['id'] for coin in results}
+        if hi > lo and len(results) < limit:
+            positions = self.positions[lo:hi]
+            # A coin can match through several keys; over-select, then dedupe
+            want = min(len(positions), limit * 3)
+            if want < len(positions):
+                positions = np.partition(positions, want - 1)[:want]
+            for position in np.unique(positions).tolist():
+                coin = self.coins[position]
+                if coin['id'] not in seen:
+                    seen.add(coin['id'])
+                    results.append(coin)
+                    if len(results) == limit:
+                        break
+        return results
+
+
+class CoinRegistry:
+    """Coin list cache with O(1) lookups and prefix search."""
+
+    def __init__(self, path, loader, fallback=(), max_age=24 * 3600, retry_after=300):
+        self.path = path
+        self.loader = loader
+        self.max_age = max_age
+        self.retry_after = retry_after
+
+        self._fallback = _Index(list(fallback), 0)
+        self._index = None
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+        self._last_attempt = 0.0
+        self._last_error = None
+
+    def _current(self):
+        index = self._index
+        if index is None:
+            # Not loaded yet: answer from the fallback rather than wait
+            self.start()
+            return self._fallback
+        if time.time() - index.fetched_at > self.max_age:
+            self._refresh_in_background()
+        return index
+
+    def start(self):
+        """Starts loading the list in a background thread."""
+        self._refresh_in_background()
+
+    def _read_disk_copy(self):
+        try:
+            with open(self.path) as f:
+                document = json.load(f)
+            return _Index(document['coins'], document['fetched_at'])
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Ignoring unreadable coin registry {self.path}: {e}")
+            return None
+
+    def refresh(self):
+        """Reloads the coin list from upstream and persists it."""
+        fetched_at = time.time()
+        coins = self.loader()
+        index = _Index(coins, fetched_at)
+        atomic_write_json(self.path, {'fetched_at': fetched_at, 'coins': coins}, separators=(',', ':'))
+        self._index = index
+        self._last_error = None
+        print(f"✅ Coin registry refreshed: {len(coins)} coins")
+        return index
+
+    def _refresh_in_background(self):
+        with self._load_lock:
+            if self._refreshing or time.time() - self._last_attempt < self.retry_after:
+                return
+            self._refreshing = True
+            self._last_attempt = time.time()
+
+        def run():
+            try:
+                if self._index is None:
+                    self._index = self._read_disk_copy()
+                index = self._index
+                if index is None or time.time() - index.fetched_at > self.max_age:
+                    self.refresh()
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"Coin registry refresh failed: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="coin-registry-refresh", daemon=True).start()
+
+    def resolve(self, symbol):
+        """CoinGecko id for a ticker symbol, preferring the best-ranked coin
+        when several share it, or None if unknown."""
+        coins = self._current().by_symbol.get(symbol.upper())
+        return coins[0]['id'] if coins else None
+
+    def get(self, coin_id):
+        return self._current().by_id.get(coin_id)
+
+    def search(self, query, limit=10):
+        """Coins whose symbol, name or id starts with `query`; exact symbol
+        matches first, then by market-cap rank."""
+        query = query.strip().lower()
+        if not query:
+            return []
+        return self._current().search(query, limit)
+
+    def stats(self):
+        index = self._index
+        return {
+            "loaded": index is not None,
+            "coins": len(index.coins) if index else 0,
+            "age_seconds": round(time.time() - index.fetched_at, 1) if index and index.fetched_at else None,
+            "refreshing": self._refreshing,
+            "last_error": self._last_error,
+        }
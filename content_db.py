@@ -0,0 +1,279 @@
+"""
+SQLite content store for AI articles and news history.
+
+The database runs in WAL mode so page renders can read while the scheduler
+writes. Connections are pooled and shared across threads. The homepage
+document is cached in memory and only rebuilt when `PRAGMA data_version`
+reports a commit from any connection, including other processes.
+
+Run `python content_db.py [data.json] [content.db]` to import an existing
+data.json by hand; the app also does this once on startup.
+"""
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    summary TEXT,
+    content TEXT,
+    image_url TEXT,
+    topic TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_created_at ON articles (created_at DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS news (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url_hash TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    source TEXT,
+    title TEXT,
+    image_url TEXT,
+    published_at TEXT,
+    fetched_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_news_published_at ON news (published_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_news_source ON news (source, published_at DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+ARTICLE_FIELDS = ("title", "summary", "content", "image_url")
+NEWS_FIELDS = ("source", "title", "url", "image_url", "published_at")
+
+
+def url_hash(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class ContentDB:
+    """Articles and news history stored in a single SQLite file."""
+
+    def __init__(self, path, pool_size=8, busy_timeout_ms=5000):
+        self.path = path
+        self.pool_size = pool_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._pool = queue.LifoQueue()
+
+        # Dedicated connection for change detection and the cached homepage
+        self._home_lock = threading.Lock()
+        self._home_conn = self._connect()
+        self._home_version = None
+        self._home_document = None
+
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    # --- Connections ---
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if self._pool.qsize() < self.pool_size:
+                self._pool.put(conn)
+            else:
+                conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    # --- Writes ---
+
+    def add_article(self, article, topic=None, created_at=None):
+        """Stores a generated article and returns its id."""
+        with self._transaction() as conn:
+            return self._insert_article(conn, article, topic, created_at)
+
+    def add_news(self, articles, fetched_at=None):
+        """Inserts news articles, updating ones already stored under the same URL.
+        Returns the number of rows written."""
+        with self._transaction() as conn:
+            return self._insert_news(conn, articles, fetched_at)
+
+    def _insert_article(self, conn, article, topic, created_at):
+        cursor = conn.execute(
+            "INSERT INTO articles (title, summary, content, image_url, topic, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (article.get("title", ""), article.get("summary"), article.get("content"),
+             article.get("image_url"), topic, created_at or utc_now())
+        )
+        return cursor.lastrowid
+
+    def _insert_news(self, conn, articles, fetched_at):
+        fetched_at = fetched_at or utc_now()
+        rows = [
+            (url_hash(a["url"]), a["url"], a.get("source"), a.get("title"),
+             a.get("image_url"), a.get("published_at"), fetched_at)
+            for a in articles if a.get("url")
+        ]
+        conn.executemany(
+            "INSERT INTO news (url_hash, url, source, title, image_url, published_at, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (url_hash) DO UPDATE SET "
+            "source = excluded.source, title = excluded.title, image_url = excluded.image_url, "
+            "published_at = excluded.published_at, fetched_at = excluded.fetched_at",
+            rows
+        )
+        return len(rows)
+
+    # --- Queries ---
+
+    def latest_article(self):
+        with self._connection() as conn:
+            return self._latest_article(conn)
+
+    def list_articles(self, limit=20, before_id=None):
+        """Newest-first page of articles; pass the last id seen as `before_id`."""
+        query = "SELECT * FROM articles"
+        params = []
+        if before_id is not None:
+            query += " WHERE id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._connection() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def list_news(self, limit=20, before=None, source=None):
+        """Newest-first page of news by publish time. `before` is the
+        `(published_at, id)` of the last item on the previous page."""
+        with self._connection() as conn:
+            return self._list_news(conn, limit, before, source)
+
+    def counts(self):
+        with self._connection() as conn:
+            return {
+                "articles": conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0],
+                "news": conn.execute("SELECT COUNT(*) FROM news").fetchone()[0],
+            }
+
+    def freshness(self):
+        """Creation time of the newest article and fetch time of the newest
+        news row, as ISO strings (None when empty)."""
+        with self._connection() as conn:
+            return {
+                "article": conn.execute("SELECT MAX(created_at) FROM articles").fetchone()[0],
+                "news": conn.execute("SELECT MAX(fetched_at) FROM news").fetchone()[0],
+            }
+
+    def home_document(self, news_limit=10):
+        """The featured article and latest news in the old data.json shape,
+        rebuilt only after a commit."""
+        with self._home_lock:
+            version = self._home_conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._home_document is None or version != self._home_version:
+                article = self._latest_article(self._home_conn)
+                news = self._list_news(self._home_conn, news_limit, None, None)
+                self._home_document = {
+                    "featured_article": {k: article[k] for k in ARTICLE_FIELDS} if article else {},
+                    "news_articles": [{k: n[k] for k in NEWS_FIELDS} for n in news],
+                }
+                self._home_version = version
+            return dict(self._home_document)
+
+    def _latest_article(self, conn):
+        row = conn.execute("SELECT * FROM articles ORDER BY id DESC LIMIT 1").fetchone()
+        return dict(row) if row else {}
+
+    def _list_news(self, conn, limit, before, source):
+        query = "SELECT * FROM news"
+        clauses = []
+        params = []
+        if source:
+            clauses.append("source = ?")
+            params.append(source)
+        if before is not None:
+            clauses.append("(published_at, id) < (?, ?)")
+            params.extend(before)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY published_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in conn.execute(query, params)]
+
+    # --- Migration ---
+
+    def migrate_from_json(self, json_path):
+        """Imports a data.json document once, even with several processes
+        starting together. Returns the number of rows imported, or None if the
+        migration already ran or there is no file. An import that fails
+        leaves nothing behind and runs again on the next start."""
+        with self._connection() as conn:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_data_json'").fetchone()
+        if done:
+            return None
+
+        try:
+            with open(json_path, 'r') as f:
+                document = json.load(f)
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError as e:
+            print(f"Skipping migration of corrupt {json_path}: {e}")
+            return None
+
+        # data.json kept no timestamps; its last write is the closest to when
+        # the article was generated, and keeps the scheduler from treating
+        # the migrated content as brand new
+        written_at = datetime.fromtimestamp(os.path.getmtime(json_path), timezone.utc).isoformat(
+            timespec='seconds')
+
+        # The import and its marker commit together, under the write lock
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_data_json'").fetchone():
+                return None
+            imported = 0
+            article = document.get("featured_article") or {}
+            if article.get("title"):
+                self._insert_article(conn, article, None, article.get("created_at") or written_at)
+                imported += 1
+            imported += self._insert_news(conn, document.get("news_articles") or [], written_at)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_data_json', ?)", (utc_now(),))
+        print(f"Migrated {imported} records from {json_path} to {self.path}")
+        return imported
+
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else "data.json"
+    target = sys.argv[2] if len(sys.argv) > 2 else "content.db"
+    result = ContentDB(target).migrate_from_json(source)
+    if result is None:
+        print("Nothing to migrate.")
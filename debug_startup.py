@@ -8,14 +8,15 @@ print("🚀 Testing CryptoPulse AI startup functions...")
 
 try:
     # Import the main app components
-    from app import fetch_latest_news, generate_daily_article, read_data, write_data
+    from app import content_db, fetch_latest_news, generate_daily_article, read_data
     print("✅ App functions imported successfully")
     
     # Test reading current data
-    print("\n📄 Testing data file operations...")
+    print("\n📄 Testing content database...")
     current_data = read_data()
     print(f"✅ Data read: {len(current_data.get('news_articles', []))} news articles")
     print(f"✅ Featured article: {'Yes' if current_data.get('featured_article') else 'No'}")
+    print(f"✅ Stored: {content_db.counts()}")
     
     # Test news fetching (this might timeout)
     print("\n📰 Testing news fetch (with timeout protection)...")
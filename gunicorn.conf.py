@@ -0,0 +1,55 @@
+"""
+Gunicorn settings for production serving.
+
+Workers are separate processes, so serving scales across cores; threads let
+each worker overlap upstream I/O. A market-stream (SSE) client holds a
+thread while connected, so at most STREAM_MAX_CLIENTS (default: half the
+threads) are streamed per worker and the rest poll.
+
+SERVER_MODE=asgi serves asgi:app on uvicorn workers instead, where the chart
+routes and the market stream run on the event loop and the other routes run
+on GUNICORN_THREADS threads.
+
+Workers share their metrics through METRICS_DIR (by default a temporary
+directory made for this server and removed when it stops), so /metrics
+answers for the whole server whichever worker serves the scrape.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Worker processes (default: one per core) and threads per worker
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+if os.environ.get('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'asgi:app'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'wsgi:app'
+    worker_class = 'gthread'
+
+# Each worker must import the app itself: a scheduler lock taken in the
+# master before forking would be shared by every worker.
+preload_app = False
+
+# Set before the workers start so they all inherit the same directory
+if not os.environ.get('METRICS_DIR'):
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='cryptopulse-metrics-')
+    _owns_metrics_dir = True
+else:
+    _owns_metrics_dir = False
+
+
+def on_exit(server):
+    if _owns_metrics_dir:
+        shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
+
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
@@ -0,0 +1,218 @@
+"""
+Shared HTTP client for all upstream calls.
+
+One `requests.Session` keeps per-host connection pools alive between calls,
+so warm requests skip the TCP and TLS handshakes. Every request gets the
+same connect/read timeouts. Failed connections are retried, as nothing
+reached the upstream, and idempotent requests answered with a 5xx are
+retried, both with jittered exponential backoff and each attempt charged to
+the upstream's rate budget; a retry that would have to wait for budget is
+not made. Read timeouts are never retried, so a hung upstream costs one read
+timeout.
+Upstreams are registered by base URL rather than host, so a local
+simulator can stand in for several of them on one host and port. Upstreams
+with a registered rate budget are charged before each request and updated
+from each response. A request that has to wait for budget gives up its
+provider's concurrency slot meanwhile (see providers.slot_released()). Every request's latency (including retries, not budget
+waits) and outcome are recorded per upstream, named with
+`register_upstream()`.
+
+Fetches that should also run on the async client (see async_http.py) are
+written as plans: generators that yield `(url, params)` GET requests and are
+sent back each decoded JSON body. `run_plan()` drives one on this session.
+"""
+import contextvars
+import itertools
+import os
+import random
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+import metrics
+from providers import slot_released
+
+CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+# Connections kept alive per upstream host
+POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 20))
+RETRIES = int(os.environ.get('HTTP_RETRIES', 2))
+RETRY_BACKOFF = float(os.environ.get('HTTP_RETRY_BACKOFF', 0.3))
+
+RETRY_STATUSES = (500, 502, 503, 504)
+# Only idempotent methods are retried after reaching the upstream; POST
+# (e.g. Gemini) never is
+RETRY_METHODS = Retry.DEFAULT_ALLOWED_METHODS
+
+
+def backoff(attempt):
+    """"Full jitter" exponential backoff before retry number `attempt + 1`."""
+    return random.uniform(0, RETRY_BACKOFF * (2 ** attempt))
+
+
+# The budget charge of the request being sent in this context
+_current_charge = contextvars.ContextVar('current_charge', default=None)
+
+
+class JitteredRetry(Retry):
+    """Retry with "full jitter" backoff so retries from many threads spread
+    out, charging each retried connection to the request's budget."""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff else 0
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if error is not None and not charge_retry(_current_charge.get()):
+            raise MaxRetryError(_pool, url, error) from error
+        return retry
+
+
+def _build_session():
+    # Connection failures only. read=False re-raises read timeouts (as
+    # requests.ReadTimeout) instead of retrying them; 5xx responses are
+    # retried in request(), where each attempt can be charged to the budget
+    retry = JitteredRetry(
+        total=RETRIES,
+        connect=RETRIES,
+        read=False,
+        status=0,
+        backoff_factor=RETRY_BACKOFF,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+        'User-Agent': 'CryptoPulseAI/1.0',
+    })
+    return session
+
+
+session = _build_session()
+
+# base URL -> (RateBudget, cost function of (path, params))
+_budgets = {}
+# base URL -> upstream name used in metrics
+_upstreams = {}
+
+
+def _match(table, url):
+    """The entry for the registered base URL that `url` is under, or None."""
+    for base, entry in table.items():
+        if url.startswith(base) and url[len(base):len(base) + 1] in ('', '/', '?'):
+            return entry
+    return None
+
+UPSTREAM_SECONDS = metrics.REGISTRY.histogram(
+    'cryptopulse_upstream_request_duration_seconds', 'Upstream request latency, including retries',
+    ('upstream',), buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+UPSTREAM_REQUESTS = metrics.REGISTRY.counter(
+    'cryptopulse_upstream_requests_total',
+    'Upstream requests by outcome (ok, throttled, http_error, timeout, error)', ('upstream', 'outcome'))
+
+
+def register_upstream(base_url, name):
+    """Records requests under `base_url` in metrics as upstream `name`."""
+    _upstreams[base_url] = name
+
+
+def observe_upstream(url, started, outcome):
+    """Records one upstream request that began at `started` (perf_counter)."""
+    upstream = _match(_upstreams, url) or 'other'
+    UPSTREAM_SECONDS.labels(upstream).observe(time.perf_counter() - started)
+    UPSTREAM_REQUESTS.labels(upstream, outcome).inc()
+
+
+def response_outcome(status):
+    if status < 400:
+        return 'ok'
+    return 'throttled' if status in (418, 429) else 'http_error'
+
+
+def register_budget(base_url, budget, cost=None):
+    """Charges every request under `base_url` against `budget`.
+    `cost(path, params)` gives a request's weight; by default each request
+    costs 1."""
+    _budgets[base_url] = (budget, cost or (lambda path, params: 1))
+
+
+def budget_for(url, params=None):
+    """`(budget, cost)` for a request to `url`, or None if its upstream has no budget."""
+    entry = _match(_budgets, url)
+    if entry is None:
+        return None
+    budget, cost = entry
+    return budget, cost(urlsplit(url).path, params or {})
+
+
+def charge_retry(charge):
+    """Charges a retry to its budget if that needs no waiting; returns
+    whether the retry may go ahead."""
+    if charge is None:
+        return True
+    budget, cost = charge
+    return budget.try_acquire(cost)
+
+
+def request(method, url, read_timeout=None, **kwargs):
+    """Sends a request on the shared session with the standard timeouts,
+    retries and rate budget."""
+    kwargs.setdefault('timeout', (CONNECT_TIMEOUT, read_timeout or READ_TIMEOUT))
+    charge = budget_for(url, kwargs.get('params'))
+    if charge is not None and not charge[0].try_acquire(charge[1]):
+        with slot_released():
+            charge[0].acquire(charge[1])
+
+    retries = RETRIES if method.upper() in RETRY_METHODS else 0
+    started = time.perf_counter()
+    token = _current_charge.set(charge)
+    try:
+        for attempt in itertools.count():
+            try:
+                response = session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                observe_upstream(url, started, 'timeout' if isinstance(e, requests.Timeout) else 'error')
+                raise
+            if charge is not None:
+                charge[0].observe(response)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                break
+            time.sleep(backoff(attempt))
+            if not charge_retry(charge):
+                break
+            response.close()
+    finally:
+        _current_charge.reset(token)
+
+    observe_upstream(url, started, response_outcome(response.status_code))
+    return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def run_plan(plan):
+    """Runs a fetch plan to completion and returns its result."""
+    try:
+        url, params = next(plan)
+        while True:
+            response = get(url, params=params)
+            response.raise_for_status()
+            url, params = plan.send(response.json())
+    except StopIteration as finished:
+        return finished.value
@@ -0,0 +1,378 @@
+"""
+Vectorized technical indicators with incremental updates.
+
+Each indicator maps candle columns (NumPy arrays) to one or more output
+arrays aligned with the candles; values during the warm-up period are NaN.
+The recursive ones (EMA, RSI, ATR, MACD) are evaluated block-wise in closed
+form rather than with a Python loop.
+
+IndicatorEngine keeps the last result per (symbol, interval, indicator,
+params, first candle). When the same window comes back with new candles,
+only the rows from the last cached candle onwards (which may have been still
+open) are recomputed, seeded with the cached outputs just before them.
+Keying on the first candle keeps results identical to a fresh computation
+over the requested candles: EMA-style indicators depend on where their
+warm-up starts, so a window is never served from a longer history.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Largest power of (1 - alpha)^-1 allowed inside one closed-form EMA block
+_MAX_BLOCK_SCALE = 1e150
+
+
+def ewm(values, alpha, seed):
+    """y[i] = alpha * x[i] + (1 - alpha) * y[i - 1], starting from y[-1] = seed."""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty(len(values))
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[:] = values
+        return out
+
+    # Within a block, y[i] = decay^(i+1) * (seed + alpha * sum_j x[j] * decay^-(j+1)).
+    # Blocks are sized so the growing weights stay well inside float64 range.
+    block = max(1, min(4096, int(math.log(_MAX_BLOCK_SCALE) / -math.log(decay))))
+    weights = decay ** -np.arange(1, block + 1, dtype=np.float64)
+    previous = seed
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        w = weights[:len(chunk)]
+        out[start:start + len(chunk)] = (previous + alpha * np.cumsum(chunk * w)) / w
+        previous = out[start + len(chunk) - 1]
+    return out
+
+
+def _smoothed(values, period, alpha, seed=None):
+    """Moving average seeded with the mean of the first `period` values, or
+    continued from `seed` (the previous output)."""
+    values = np.asarray(values, dtype=np.float64)
+    if seed is not None:
+        return ewm(values, alpha, seed)
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        out[period - 1] = values[:period].mean()
+        out[period:] = ewm(values[period:], alpha, out[period - 1])
+    return out
+
+
+def _rolling_mean(values, period):
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        sums = np.cumsum(values - values[0])
+        sums[period:] = sums[period:] - sums[:-period]
+        out[period - 1:] = sums[period - 1:] / period + values[0]
+    return out
+
+
+def _rolling_std(values, period):
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        windows = np.lib.stride_tricks.sliding_window_view(values, period)
+        out[period - 1:] = windows.std(axis=1)
+    return out
+
+
+def _true_range(high, low, close, previous_close):
+    prev = np.concatenate(([np.nan if previous_close is None else previous_close], close[:-1]))
+    # fmax ignores the missing previous close of the very first candle
+    return np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+
+
+# --- Indicators ---
+# compute(columns, params, seed) returns a dict of output arrays. With a seed
+# (the outputs of the row just before `columns[lookback]`), the first
+# `lookback` rows are context only and outputs cover the remaining rows.
+# Outputs starting with an underscore are internal state, not served.
+
+class Indicator:
+    name = None
+    fields = ('close',)
+    defaults = ()
+
+    def lookback(self, params):
+        return 0
+
+    def compute(self, columns, params, seed=None):
+        raise NotImplementedError
+
+
+class SMA(Indicator):
+    name = 'sma'
+    defaults = (20,)
+
+    def lookback(self, params):
+        return params[0] - 1
+
+    def compute(self, columns, params, seed=None):
+        period, = params
+        close = np.asarray(columns['close'], dtype=np.float64)
+        out = _rolling_mean(close, period)
+        return {'sma': out if seed is None else out[period - 1:]}
+
+
+class EMA(Indicator):
+    name = 'ema'
+    defaults = (20,)
+
+    def compute(self, columns, params, seed=None):
+        period, = params
+        return {'ema': _smoothed(columns['close'], period, 2.0 / (period + 1),
+                                 None if seed is None else seed['ema'])}
+
+
+class RSI(Indicator):
+    """Wilder's RSI."""
+    name = 'rsi'
+    defaults = (14,)
+
+    def lookback(self, params):
+        return 1
+
+    def compute(self, columns, params, seed=None):
+        period, = params
+        close = np.asarray(columns['close'], dtype=np.float64)
+        change = np.diff(close)
+        gains, losses = np.maximum(change, 0.0), np.maximum(-change, 0.0)
+        alpha = 1.0 / period
+        if seed is None:
+            # No change exists for the first candle
+            avg_gain = np.concatenate(([np.nan], _smoothed(gains, period, alpha)))
+            avg_loss = np.concatenate(([np.nan], _smoothed(losses, period, alpha)))
+        else:
+            avg_gain = _smoothed(gains, period, alpha, seed['_avg_gain'])
+            avg_loss = _smoothed(losses, period, alpha, seed['_avg_loss'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+        rsi[np.isnan(avg_gain)] = np.nan
+        return {'rsi': rsi, '_avg_gain': avg_gain, '_avg_loss': avg_loss}
+
+
+class MACD(Indicator):
+    name = 'macd'
+    defaults = (12, 26, 9)
+
+    def compute(self, columns, params, seed=None):
+        fast, slow, signal_period = params
+        close = columns['close']
+        if seed is None:
+            fast_ema = _smoothed(close, fast, 2.0 / (fast + 1))
+            slow_ema = _smoothed(close, slow, 2.0 / (slow + 1))
+            macd = fast_ema - slow_ema
+            signal = np.full(len(macd), np.nan)
+            # The signal line starts once the MACD line itself is defined
+            first = max(fast, slow) - 1
+            if len(macd) > first:
+                signal[first:] = _smoothed(macd[first:], signal_period, 2.0 / (signal_period + 1))
+        else:
+            fast_ema = _smoothed(close, fast, 2.0 / (fast + 1), seed['_fast'])
+            slow_ema = _smoothed(close, slow, 2.0 / (slow + 1), seed['_slow'])
+            macd = fast_ema - slow_ema
+            signal = _smoothed(macd, signal_period, 2.0 / (signal_period + 1), seed['signal'])
+        return {'macd': macd, 'signal': signal, 'histogram': macd - signal,
+                '_fast': fast_ema, '_slow': slow_ema}
+
+
+class Bollinger(Indicator):
+    name = 'bollinger'
+    defaults = (20, 2.0)
+
+    def lookback(self, params):
+        return params[0] - 1
+
+    def compute(self, columns, params, seed=None):
+        period, width = params
+        close = np.asarray(columns['close'], dtype=np.float64)
+        middle = _rolling_mean(close, period)
+        spread = width * _rolling_std(close, period)
+        result = {'middle': middle, 'upper': middle + spread, 'lower': middle - spread}
+        if seed is not None:
+            result = {name: values[period - 1:] for name, values in result.items()}
+        return result
+
+
+class ATR(Indicator):
+    """Average true range with Wilder smoothing."""
+    name = 'atr'
+    fields = ('high', 'low', 'close')
+    defaults = (14,)
+
+    def lookback(self, params):
+        return 1
+
+    def compute(self, columns, params, seed=None):
+        period, = params
+        high, low, close = (np.asarray(columns[f], dtype=np.float64) for f in self.fields)
+        if seed is None:
+            ranges = _true_range(high, low, close, None)
+            return {'atr': _smoothed(ranges, period, 1.0 / period)}
+        ranges = _true_range(high[1:], low[1:], close[1:], close[0])
+        return {'atr': _smoothed(ranges, period, 1.0 / period, seed['atr'])}
+
+
+class VWAP(Indicator):
+    """Volume-weighted average price, reset every `session` UTC days."""
+    name = 'vwap'
+    fields = ('time', 'high', 'low', 'close', 'volume')
+    defaults = (1,)
+
+    def compute(self, columns, params, seed=None):
+        session, = params
+        typical = (np.asarray(columns['high']) + np.asarray(columns['low']) + np.asarray(columns['close'])) / 3.0
+        volume = np.asarray(columns['volume'], dtype=np.float64)
+        sessions = np.asarray(columns['time']) // (session * 86400)
+
+        # Cumulative sums that restart at each session boundary. Each session's
+        # first row cancels the previous session's total so the running sums
+        # stay session-sized; the rounding left over at each boundary is then
+        # subtracted from the session it spilled into.
+        pv, v = typical * volume, volume.copy()
+        starts = np.flatnonzero(np.diff(sessions)) + 1
+        if len(starts):
+            bounds = np.concatenate(([0], starts))
+            lengths = np.diff(np.concatenate((bounds, [len(v)])))
+            pv_totals = np.add.reduceat(pv, bounds)[:-1]
+            v_totals = np.add.reduceat(v, bounds)[:-1]
+            pv[starts] -= pv_totals
+            v[starts] -= v_totals
+        pv, v = np.cumsum(pv), np.cumsum(v)
+        if len(starts):
+            pv -= np.repeat(np.concatenate(([0.0], pv[starts - 1] - pv_totals)), lengths)
+            v -= np.repeat(np.concatenate(([0.0], v[starts - 1] - v_totals)), lengths)
+        if seed is not None and len(sessions) and sessions[0] == seed['_session']:
+            # Continue the session that was open in the previous row
+            first_run = sessions == sessions[0]
+            pv[first_run] += seed['_pv']
+            v[first_run] += seed['_v']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = np.where(v > 0, pv / v, typical)
+        return {'vwap': vwap, '_pv': pv, '_v': v, '_session': sessions.astype(np.float64)}
+
+
+INDICATORS = {cls.name: cls() for cls in (SMA, EMA, RSI, MACD, Bollinger, ATR, VWAP)}
+MAX_PERIOD = 1000
+
+
+def parse_specs(text, limit=10):
+    """Parses 'sma:20,macd:12:26:9,rsi' into [(spec, name, params)].
+    Raises ValueError for unknown indicators or bad parameters."""
+    specs = []
+    for part in (text or '').split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        name, *raw = part.split(':')
+        indicator = INDICATORS.get(name)
+        if indicator is None:
+            raise ValueError(f"unknown indicator {name!r}; expected one of {', '.join(INDICATORS)}")
+        if len(raw) > len(indicator.defaults):
+            raise ValueError(f"too many parameters for {name}")
+        try:
+            given = [float(value) if isinstance(default, float) else int(value)
+                     for value, default in zip(raw, indicator.defaults)]
+        except ValueError:
+            raise ValueError(f"invalid parameters for {name}") from None
+        params = tuple(given) + indicator.defaults[len(given):]
+        if not all(0 < p <= MAX_PERIOD for p in params):
+            raise ValueError(f"{name} parameters must be between 1 and {MAX_PERIOD}")
+        specs.append((':'.join([name, *map(str, params)]), name, params))
+    if not specs:
+        raise ValueError("no indicators requested")
+    if len(specs) > limit:
+        raise ValueError(f"at most {limit} indicators per request")
+    return specs
+
+
+def public_outputs(result):
+    return {name: values for name, values in result.items() if not name.startswith('_')}
+
+
+def outputs_to_lists(outputs):
+    """JSON-ready lists, with warm-up NaNs as None."""
+    return {name: np.where(np.isfinite(values), values, None).tolist() for name, values in outputs.items()}
+
+
+class _State:
+    def __init__(self, inputs, outputs):
+        self.lock = threading.Lock()
+        self.inputs = inputs
+        self.outputs = outputs
+
+
+class IndicatorEngine:
+    """Caches indicator results per window and extends them as candles arrive."""
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._states = OrderedDict()
+        self._counts = {"full": 0, "incremental": 0, "unchanged": 0}
+
+    def compute(self, series_key, name, params, columns):
+        """Outputs of indicator `name` for `columns`. With a `series_key`
+        (e.g. (symbol, interval)) the result is cached and later calls over
+        the same window, possibly with more candles, only compute the new
+        rows. The outputs always equal a fresh computation over `columns`."""
+        indicator = INDICATORS[name]
+        inputs = {field: np.asarray(columns[field]) for field in ('time',) + indicator.fields}
+        if series_key is None or not len(inputs['time']):
+            return public_outputs(indicator.compute(inputs, params))
+
+        key = (*series_key, name, params, inputs['time'][0].item())
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _State(None, None)
+                if len(self._states) > self.max_entries:
+                    self._states.popitem(last=False)
+            else:
+                self._states.move_to_end(key)
+
+        with state.lock:
+            kind = self._update(state, indicator, params, inputs)
+            with self._lock:
+                self._counts[kind] += 1
+            end = len(inputs['time'])
+            return {out: values[:end] for out, values in public_outputs(state.outputs).items()}
+
+    def _update(self, state, indicator, params, inputs):
+        """Brings `state` up to date with `inputs`, which start at the same
+        candle; returns the kind of update."""
+        times = inputs['time']
+        cached = state.inputs['time'] if state.inputs is not None else None
+        shared = min(len(cached), len(times)) if cached is not None else 0
+        if not shared or not np.array_equal(cached[:shared], times[:shared]):
+            state.inputs = {f: np.array(v) for f, v in inputs.items()}
+            state.outputs = indicator.compute(state.inputs, params)
+            return "full"
+
+        if len(times) < len(cached):
+            # Every indicator is causal, so a prefix of the window is a
+            # prefix of its outputs
+            return "unchanged"
+
+        # Recompute from the newest cached row, which may have been still open
+        row = len(cached) - 1
+        lookback = indicator.lookback(params)
+        seed = {out: values[row - 1] for out, values in state.outputs.items()} if row >= 1 else None
+        merged = {f: np.array(v) for f, v in inputs.items()}
+
+        if row < 1 or row - lookback < 0 or not all(np.isfinite(v) for v in seed.values()):
+            # Still warming up: nothing useful to seed from
+            state.inputs = merged
+            state.outputs = indicator.compute(merged, params)
+            return "full"
+
+        context = {f: values[row - lookback:] for f, values in merged.items()}
+        tail = indicator.compute(context, params, seed)
+        state.outputs = {out: np.concatenate((values[:row], tail[out]))
+                         for out, values in state.outputs.items()}
+        state.inputs = merged
+        return "incremental"
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._states), "max_entries": self.max_entries, **self._counts}
@@ -0,0 +1,216 @@
+"""
+Size-bounded LRU cache for kline responses with per-key single-flight.
+
+Entries are evicted least-recently-used first once their total size exceeds
+`max_bytes`. Concurrent misses for the same key share one loader call: the
+first caller loads, the rest wait for its result. Each entry carries its own
+TTL, chosen by the loader, so daily candles can be cached far longer than
+minute candles.
+
+`aget_or_load()` does the same for coroutine loaders on an event loop. Sync
+and async callers share flights: either kind waits on the other's load
+without blocking its thread or loop.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a cached kline response stays fresh, by candle interval
+INTERVAL_TTLS = {
+    '1m': 15, '3m': 30, '5m': 30, '15m': 60, '30m': 60,
+    '1h': 120, '2h': 180, '4h': 300, '6h': 300, '12h': 600,
+    '1d': 600, '3d': 1800, '1w': 3600,
+}
+
+
+def interval_ttl(interval, default=60):
+    return INTERVAL_TTLS.get(interval, default)
+
+
+class _Flight:
+    """An in-progress load that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._async_waiters = []
+
+    def finish(self):
+        with self._lock:
+            self.done.set()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    async def wait_async(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self.done.is_set():
+                return
+            self._async_waiters.append((loop, future))
+        await future
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class KlineCache:
+    """Maps keys to values that expose their size as `nbytes`."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_tracked_keys=1000):
+        self.max_bytes = max_bytes
+        self.max_tracked_keys = max_tracked_keys
+
+        self._lock = threading.Lock()
+        # key -> (value, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._bytes = 0
+        self._key_stats = OrderedDict()
+        # Lifetime totals; per-key stats are forgotten with their key
+        self._totals = {"hits": 0, "misses": 0, "coalesced": 0}
+        self._evictions = 0
+
+    def peek(self, key):
+        """Returns the cached value for `key` if it is fresh, else None,
+        without loading. A miss is not counted; get_or_load will count it."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            self._count(key, "hits")
+            return entry[0]
+
+    def get_or_load(self, key, loader):
+        """Returns the cached value for `key`, or calls `loader()`, which must
+        return `(value, ttl_seconds)`, exactly once across concurrent callers."""
+        value, flight, leader = self._lookup(key)
+        if flight is None:
+            return value
+        if not leader:
+            flight.done.wait()
+            return flight.result()
+
+        try:
+            value, ttl = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            self._complete(key, flight, value, ttl)
+            return value
+        finally:
+            self._land(key, flight)
+
+    async def aget_or_load(self, key, loader):
+        """get_or_load() for a coroutine function `loader`."""
+        value, flight, leader = self._lookup(key)
+        if flight is None:
+            return value
+        if not leader:
+            await flight.wait_async()
+            return flight.result()
+
+        try:
+            value, ttl = await loader()
+        except BaseException as e:
+            # Includes cancellation, so waiters are not left hanging
+            flight.error = e if isinstance(e, Exception) else RuntimeError("load cancelled")
+            raise
+        else:
+            self._complete(key, flight, value, ttl)
+            return value
+        finally:
+            self._land(key, flight)
+
+    def _lookup(self, key):
+        """`(value, None, _)` on a fresh hit, else `(None, flight, leader)`
+        where the leader must load and land the flight."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._count(key, "hits")
+                return entry[0], None, False
+
+            self._count(key, "misses")
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._count(key, "coalesced")
+            return None, flight, leader
+
+    def _complete(self, key, flight, value, ttl):
+        flight.value = value
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _land(self, key, flight):
+        with self._lock:
+            self._flights.pop(key, None)
+        flight.finish()
+
+    def _store(self, key, value, ttl):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[0].nbytes
+        if value.nbytes > self.max_bytes:
+            return
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._bytes += value.nbytes
+        while self._bytes > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self._evictions += 1
+
+    def _count(self, key, kind):
+        stats = self._key_stats.get(key)
+        if stats is None:
+            stats = self._key_stats[key] = {"hits": 0, "misses": 0, "coalesced": 0}
+            if len(self._key_stats) > self.max_tracked_keys:
+                self._key_stats.popitem(last=False)
+        else:
+            self._key_stats.move_to_end(key)
+        stats[kind] += 1
+        self._totals[kind] += 1
+
+    def stats(self, top=20):
+        """Memory footprint plus hit rates for the most requested keys."""
+        with self._lock:
+            keys = []
+            for key, stats in self._key_stats.items():
+                requests = stats["hits"] + stats["misses"]
+                keys.append({
+                    "key": "/".join(key) if isinstance(key, tuple) else str(key),
+                    "requests": requests,
+                    "hit_rate": round(stats["hits"] / requests, 4) if requests else None,
+                    "cached": key in self._entries,
+                    **stats,
+                })
+            keys.sort(key=lambda k: k["requests"], reverse=True)
+            hits = self._totals["hits"]
+            requests = hits + self._totals["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "in_flight": len(self._flights),
+                "hit_rate": round(hits / requests, 4) if requests else None,
+                **self._totals,
+                "keys": keys[:top],
+            }
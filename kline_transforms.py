@@ -0,0 +1,119 @@
+"""
+Candle transforms: interval parsing, resampling and LTTB downsampling.
+
+Candles are handled as dicts of NumPy columns (time, open, high, low, close,
+volume) as returned by the candle store.
+"""
+import re
+
+import numpy as np
+
+# Intervals the chart can request, in seconds
+INTERVAL_SECONDS = {
+    '1m': 60, '5m': 300, '15m': 900, '30m': 1800,
+    '1h': 3600, '4h': 14400, '1d': 86400, '1w': 604800,
+}
+
+# Binance weekly candles open on Monday 00:00 UTC; the epoch was a Thursday
+BUCKET_OFFSETS = {'1w': 4 * 86400}
+
+_DURATION_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'y': 365 * 86400}
+_DURATION = re.compile(r'^(\d{1,5})([mhdwy])$')
+
+
+def parse_duration(text):
+    """Parses '90m', '7d', '1y' etc. into seconds; returns None if invalid."""
+    match = _DURATION.match(text or '')
+    if not match:
+        return None
+    seconds = int(match.group(1)) * _DURATION_UNITS[match.group(2)]
+    return seconds or None
+
+
+def finer_intervals(interval):
+    """Intervals that resample exactly into `interval`, coarsest first."""
+    target = INTERVAL_SECONDS[interval]
+    candidates = [name for name, seconds in INTERVAL_SECONDS.items()
+                  if seconds < target and target % seconds == 0]
+    # Every finer interval also divides a day, so its candles never straddle
+    # the Monday boundary of a weekly bucket.
+    return sorted(candidates, key=INTERVAL_SECONDS.get, reverse=True)
+
+
+def bucket_start(times, interval):
+    """Open time of the `interval` candle containing each timestamp."""
+    width = INTERVAL_SECONDS[interval]
+    offset = BUCKET_OFFSETS.get(interval, 0)
+    return (times - offset) // width * width + offset
+
+
+def resample(columns, interval):
+    """Aggregates finer candles into `interval` candles (OHLC + summed volume)."""
+    times = np.asarray(columns['time'])
+    if len(times) == 0:
+        return {name: np.asarray(values)[:0] for name, values in columns.items()}
+
+    buckets = bucket_start(times, interval)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.concatenate((starts[1:], [len(times)])) - 1
+
+    return {
+        'time': buckets[starts],
+        'open': np.asarray(columns['open'])[starts],
+        'high': np.maximum.reduceat(np.asarray(columns['high']), starts),
+        'low': np.minimum.reduceat(np.asarray(columns['low']), starts),
+        'close': np.asarray(columns['close'])[ends],
+        'volume': np.add.reduceat(np.asarray(columns['volume']), starts),
+    }
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that best
+    preserve the visual shape of the series (x, y)."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    # Bucket edges for the n - 2 interior points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        areas = np.abs((x[previous] - next_x) * (bucket_y - y[previous])
+                       - (x[previous] - bucket_x) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample(columns, max_points):
+    """Keeps at most `max_points` candles, chosen by LTTB on the close price."""
+    if max_points is None or len(columns['time']) <= max_points:
+        return columns
+    keep = lttb_indices(columns['time'], columns['close'], max_points)
+    return {name: np.asarray(values)[keep] for name, values in columns.items()}
+
+
+def records_to_columns(records):
+    """Converts chart-format candle dicts into NumPy columns."""
+    return {
+        'time': np.array([r['time'] for r in records], dtype=np.int64),
+        'open': np.array([r['open'] for r in records], dtype=np.float64),
+        'high': np.array([r['high'] for r in records], dtype=np.float64),
+        'low': np.array([r['low'] for r in records], dtype=np.float64),
+        'close': np.array([r['close'] for r in records], dtype=np.float64),
+        'volume': np.array([r.get('volume', 0.0) for r in records], dtype=np.float64),
+    }
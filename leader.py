@@ -0,0 +1,108 @@
+"""
+Scheduler leader election between server worker processes.
+
+Every worker runs the same app, but background jobs (news, articles, market
+polling) must run once per host, not once per worker. Each worker tries to
+take an exclusive, non-blocking `flock` on a shared lock file; the one that
+gets it becomes the leader and starts the scheduler. The others stay
+followers and keep retrying every `interval` seconds, calling `on_follow`
+each time so they can pick up what the leader publishes (the market snapshot
+file). The OS drops the lock when the leader process exits or is killed, so
+a follower takes over within one interval.
+
+Without `fcntl` (Windows) there is no cross-process lock and every process
+leads, which is right for the single-process development server.
+"""
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class LeaderElection:
+    """Elects one process per lock file to run `on_elected()` once."""
+
+    def __init__(self, lock_path, on_elected, on_follow=None, interval=2.0):
+        self.lock_path = lock_path
+        self.on_elected = on_elected
+        self.on_follow = on_follow
+        self.interval = interval
+
+        self.is_leader = False
+        self.elected_at = None
+        self._lock_file = None
+        self._thread = None
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Tries to lead now, then keeps retrying in a background thread
+        while following. Safe to call more than once."""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        if self._try_acquire():
+            self._become_leader()
+            return
+        self._thread = threading.Thread(target=self._follow, name="scheduler-election", daemon=True)
+        self._thread.start()
+
+    def _try_acquire(self):
+        if fcntl is None:
+            return True
+        lock_file = open(self.lock_path, 'a+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Record the holder for operators; the lock itself is what counts
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{os.getpid()}\n")
+        lock_file.flush()
+        # Kept open (and locked) for the life of the process
+        self._lock_file = lock_file
+        return True
+
+    def _become_leader(self):
+        self.is_leader = True
+        self.elected_at = time.time()
+        print(f"👑 Process {os.getpid()} is the scheduler leader")
+        self.on_elected()
+
+    def _follow(self):
+        print(f"Process {os.getpid()} is a scheduler follower")
+        while True:
+            if self.on_follow:
+                try:
+                    self.on_follow()
+                except Exception as e:
+                    print(f"Follower update failed: {e}")
+            time.sleep(self.interval)
+            if self._try_acquire():
+                self._become_leader()
+                return
+
+    def leader_pid(self):
+        """Pid recorded by the current leader, if any."""
+        try:
+            with open(self.lock_path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def stats(self):
+        return {
+            "pid": os.getpid(),
+            "is_leader": self.is_leader,
+            "leader_pid": os.getpid() if self.is_leader else self.leader_pid(),
+            "elected_at": self.elected_at,
+            "lock_file": self.lock_path,
+            "cross_process": fcntl is not None,
+        }
@@ -0,0 +1,159 @@
+"""
+Process-wide in-memory market snapshot.
+
+A background poller owns the upstream fetch and calls `refresh()` on a fixed
+cadence; request handlers only ever call `peek()`, which is a memory read.
+Refreshes are single-flight, so overlapping poller runs never produce more
+than one upstream call at a time. Listeners registered with `add_listener()`
+are called with each new snapshot. `seed()` installs a snapshot saved by an
+earlier process so it can be served before the first refresh completes, and
+lets worker processes that do not poll follow the one that does.
+"""
+import threading
+import time
+from collections import deque
+
+
+class SnapshotCache:
+    """Holds the latest snapshot produced by `loader`, a zero-argument callable
+    returning `(value, source)`."""
+
+    def __init__(self, loader, ttl=30, name="snapshot", history_size=20):
+        self.loader = loader
+        # Snapshots older than this are still served but counted as stale.
+        self.ttl = ttl
+        self.name = name
+
+        self._value = None
+        self._source = None
+        self._fetched_at = None
+        self._fetched_wall = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._history = deque(maxlen=history_size)
+        self._listeners = []
+
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "skipped_refreshes": 0,
+        }
+
+    def peek(self):
+        """Returns the current snapshot (or None) without any I/O."""
+        with self._lock:
+            age = self._age()
+            if age is None:
+                self._stats["misses"] += 1
+            elif age < self.ttl:
+                self._stats["hits"] += 1
+            else:
+                self._stats["stale_hits"] += 1
+            return self._value
+
+    @property
+    def source(self):
+        return self._source
+
+    @property
+    def fetched_at(self):
+        """Wall-clock time of the current snapshot, or None."""
+        return self._fetched_wall
+
+    def age(self):
+        with self._lock:
+            return self._age()
+
+    def seed(self, value, source, fetched_at):
+        """Installs a snapshot taken elsewhere (saved by an earlier process, or
+        published by another worker) at wall-clock time `fetched_at`, unless
+        the cache already holds one at least as new. Listeners are called as
+        for a refresh. Returns True if the seed was used."""
+        with self._lock:
+            if self._value is not None and self._fetched_wall is not None and self._fetched_wall >= fetched_at:
+                return False
+            self._value = value
+            self._source = source
+            self._fetched_wall = fetched_at
+            self._fetched_at = time.monotonic() - max(time.time() - fetched_at, 0)
+        self._notify(value)
+        return True
+
+    def add_listener(self, listener):
+        """Calls `listener(value)` after every successful refresh."""
+        self._listeners.append(listener)
+
+    def refresh(self):
+        """Runs the loader once and stores its result. Returns False if another
+        refresh was already in progress or the loader failed."""
+        with self._lock:
+            if self._refreshing:
+                self._stats["skipped_refreshes"] += 1
+                return False
+            self._refreshing = True
+
+        started = time.monotonic()
+        try:
+            value, source = self.loader()
+        except Exception as e:
+            duration = time.monotonic() - started
+            print(f"{self.name} snapshot refresh failed: {e}")
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+                self._history.append(self._refresh_record(duration, None, error=str(e)))
+                self._refreshing = False
+            return False
+
+        duration = time.monotonic() - started
+        with self._lock:
+            self._value = value
+            self._source = source
+            self._fetched_at = time.monotonic()
+            self._fetched_wall = time.time()
+            self._stats["refreshes"] += 1
+            self._history.append(self._refresh_record(duration, source))
+            self._refreshing = False
+        print(f"{self.name} snapshot refreshed from {source} in {duration * 1000:.0f}ms")
+        self._notify(value)
+        return True
+
+    def _notify(self, value):
+        for listener in self._listeners:
+            try:
+                listener(value)
+            except Exception as e:
+                print(f"{self.name} snapshot listener failed: {e}")
+
+    def stats(self):
+        """Returns hit/miss/staleness counters and recent refresh timings."""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+            stats.update({
+                "name": self.name,
+                "ttl": self.ttl,
+                "source": self._source,
+                "age_seconds": self._age(),
+                "refreshing": self._refreshing,
+                "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else None,
+                "recent_refreshes": list(self._history),
+            })
+            return stats
+
+    def _age(self):
+        if self._fetched_at is None:
+            return None
+        return time.monotonic() - self._fetched_at
+
+    def _refresh_record(self, duration, source, error=None):
+        record = {
+            "at": time.time(),
+            "duration_ms": round(duration * 1000, 1),
+            "source": source,
+        }
+        if error:
+            record["error"] = error
+        return record
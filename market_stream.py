@@ -0,0 +1,175 @@
+"""
+Fan-out of market snapshot changes to Server-Sent Events clients.
+
+Each subscriber gets a bounded queue. `publish()` diffs the new snapshot
+against the previous one per symbol and queues only the changed rows. A
+client whose queue is full is dropped instead of slowing down everyone
+else; its EventSource reconnects and starts again from a full snapshot.
+
+A client served by a thread holds that thread for as long as it is
+connected, so those are capped at `max_threaded`; `subscribe()` raises
+StreamLimitReached beyond it, and the route tells the client to poll
+instead. Clients served on an event loop (the async serving mode) hold no
+thread and are not capped.
+"""
+import asyncio
+import json
+import queue
+import threading
+
+
+class StreamLimitReached(Exception):
+    """Raised by `subscribe()` when the threaded-client cap is reached."""
+
+
+def format_sse(event, data, event_id=None):
+    """Encodes one Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    """A single client's queue of pending delta events, read by a thread."""
+
+    threaded = True
+
+    def __init__(self, queue_size):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    def offer(self, item):
+        """Queues `item`; returns False if the queue is full."""
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            return False
+        return True
+
+    def drop(self):
+        self.dropped = True
+
+
+class AsyncSubscription:
+    """A single client's queue of pending delta events, read by a coroutine
+    on `loop`. Events are handed over from the publishing thread with
+    `call_soon_threadsafe`."""
+
+    threaded = False
+
+    def __init__(self, queue_size, loop):
+        self.queue_size = queue_size
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.dropped = False
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def offer(self, item):
+        with self._lock:
+            if self._pending >= self.queue_size:
+                return False
+            self._pending += 1
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+        except RuntimeError:
+            # The loop has closed; nobody is reading
+            return False
+        return True
+
+    def drop(self):
+        self.dropped = True
+        try:
+            # Wakes the reader so it notices
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+        except RuntimeError:
+            pass
+
+    async def get(self, timeout):
+        """The next `(version, delta)`, or None once dropped. Raises
+        asyncio.TimeoutError if nothing arrives within `timeout` seconds."""
+        item = await asyncio.wait_for(self.queue.get(), timeout)
+        if item is not None:
+            with self._lock:
+                self._pending -= 1
+        return item
+
+
+class MarketBroadcaster:
+    """Publishes per-symbol deltas between consecutive market snapshots."""
+
+    def __init__(self, queue_size=32, key='symbol', max_threaded=None):
+        self.queue_size = queue_size
+        self.key = key
+        self.max_threaded = max_threaded
+
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._rows = {}
+        self._snapshot = None
+        self._version = 0
+        self._threaded = 0
+        self._dropped_clients = 0
+        self._rejected_clients = 0
+
+    def subscribe(self, loop=None):
+        """Registers a client, read by a thread or, given `loop`, by a
+        coroutine on it. Returns `(subscription, snapshot, version)` so the
+        client starts from a snapshot consistent with the deltas it gets."""
+        if loop is None:
+            subscription = Subscription(self.queue_size)
+        else:
+            subscription = AsyncSubscription(self.queue_size, loop)
+        with self._lock:
+            if subscription.threaded:
+                if self.max_threaded is not None and self._threaded >= self.max_threaded:
+                    self._rejected_clients += 1
+                    raise StreamLimitReached(f"{self._threaded} threaded streams already open")
+                self._threaded += 1
+            self._subscribers.add(subscription)
+            return subscription, self._snapshot, self._version
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._discard(subscription)
+
+    def _discard(self, subscription):
+        if subscription in self._subscribers:
+            self._subscribers.discard(subscription)
+            self._threaded -= subscription.threaded
+
+    def publish(self, snapshot):
+        """Diffs `snapshot` against the previous one and queues the changes."""
+        rows = {row[self.key]: row for row in snapshot}
+        with self._lock:
+            changed = [row for symbol, row in rows.items() if self._rows.get(symbol) != row]
+            removed = [symbol for symbol in self._rows if symbol not in rows]
+            self._rows = rows
+            self._snapshot = snapshot
+            if not changed and not removed:
+                return
+            self._version += 1
+            delta = {"changed": changed, "removed": removed}
+
+            for subscription in list(self._subscribers):
+                if not subscription.offer((self._version, delta)):
+                    # Slow consumer: disconnect it rather than buffer without bound
+                    subscription.drop()
+                    self._discard(subscription)
+                    self._dropped_clients += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "threaded_subscribers": self._threaded,
+                "max_threaded": self.max_threaded,
+                "rejected_clients": self._rejected_clients,
+                "version": self._version,
+                "symbols": len(self._rows),
+                "dropped_clients": self._dropped_clients,
+                "queue_size": self.queue_size,
+            }
@@ -0,0 +1,310 @@
+"""
+In-process metrics registry, served in the Prometheus text format.
+
+Counters and histograms are recorded on the request path, so recording takes
+no lock: each series keeps one value array per recording thread, and a
+thread only ever adds to its own array. The arrays are summed when /metrics
+is scraped. Arrays of threads that have exited are folded into a retired
+total at that point, so servers that start a thread per request do not
+accumulate them. A thread takes the series lock once, the first time it
+records into that series.
+
+State that other components already count (cache hits, breaker state, rate
+budgets) is not recorded twice: collectors registered with `add_collector()`
+read it from their stats at scrape time.
+
+Worker processes each have their own registry. With `SharedMetrics`, every
+worker writes its samples to a file in a shared directory every few seconds,
+and a scrape answered by any worker merges all the files with its own live
+values: counters and histograms are summed, and gauges keep one series per
+worker under a `worker` label.
+"""
+import bisect
+import json
+import math
+import os
+import threading
+import time
+
+from atomic_write import atomic_write_json
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; suits request latencies from a cache hit to a slow upstream
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _Cells:
+    """The values of one series, as one array per recording thread."""
+
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._live = []
+        self._retired = [0.0] * size
+
+    def mine(self):
+        """The calling thread's array; no other thread writes to it."""
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = [0.0] * self._size
+            with self._lock:
+                self._live.append((threading.current_thread(), values))
+            return values
+
+    def totals(self):
+        with self._lock:
+            live = []
+            for thread, values in self._live:
+                if thread.is_alive():
+                    live.append((thread, values))
+                else:
+                    # Its thread is gone, so nothing writes to it any more
+                    for i, value in enumerate(values):
+                        self._retired[i] += value
+            self._live = live
+            totals = list(self._retired)
+            for _, values in live:
+                for i, value in enumerate(values):
+                    totals[i] += value
+        return totals
+
+
+class _CounterSeries:
+    def __init__(self):
+        self._cells = _Cells(1)
+
+    def inc(self, amount=1):
+        self._cells.mine()[0] += amount
+
+    def samples(self, name, labels):
+        return [[name, labels, self._cells.totals()[0]]]
+
+
+class _HistogramSeries:
+    def __init__(self, bounds):
+        self._bounds = bounds
+        # One count per bucket, then +Inf, then the sum of observations
+        self._cells = _Cells(len(bounds) + 2)
+
+    def observe(self, value):
+        values = self._cells.mine()
+        values[bisect.bisect_left(self._bounds, value)] += 1
+        values[-1] += value
+
+    def samples(self, name, labels):
+        totals = self._cells.totals()
+        samples, cumulative = [], 0
+        for bound, count in zip(self._bounds + (math.inf,), totals):
+            cumulative += count
+            samples.append([f"{name}_bucket", labels + [["le", _format_value(bound)]], cumulative])
+        samples.append([f"{name}_sum", labels, totals[-1]])
+        samples.append([f"{name}_count", labels, cumulative])
+        return samples
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """The series for these label values, given in `labelnames` order."""
+        try:
+            return self._series[values]
+        except KeyError:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            with self._lock:
+                return self._series.setdefault(values, self._new_series())
+
+    def collect(self):
+        samples = []
+        for values, series in list(self._series.items()):
+            labels = [[name, str(value)] for name, value in zip(self.labelnames, values)]
+            samples.extend(series.samples(self.name, labels))
+        return {"name": self.name, "type": self.type, "help": self.help, "samples": samples}
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def _new_series(self):
+        return _CounterSeries()
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+
+def family(name, type, help, samples):
+    """A metric family for collectors; `samples` holds `(labels, value)`
+    pairs, where `labels` is a dict. Samples valued None are left out."""
+    return {
+        "name": name,
+        "type": type,
+        "help": help,
+        "samples": [[name, [[k, str(v)] for k, v in labels.items()], value]
+                    for labels, value in samples if value is not None],
+    }
+
+
+class Registry:
+    """The metrics of one process."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Registers `collector()`, called at each scrape to return a list of
+        families (see `family()`)."""
+        self._collectors.append(collector)
+        return collector
+
+    def collect(self):
+        families = [metric.collect() for metric in self._metrics]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                print(f"Metrics collector {collector.__name__} failed: {e}")
+        return families
+
+
+REGISTRY = Registry()
+
+
+def merge(snapshots):
+    """Combines the families of several processes, given as `{pid: families}`."""
+    merged = {}
+    for pid, families in snapshots.items():
+        for fam in families:
+            target = merged.setdefault(fam["name"], {**fam, "samples": {}})
+            for name, labels, value in fam["samples"]:
+                labels = tuple(tuple(pair) for pair in labels)
+                if fam["type"] == 'gauge':
+                    labels += (("worker", str(pid)),)
+                target["samples"][name, labels] = target["samples"].get((name, labels), 0) + value
+    return [
+        {**fam, "samples": [[name, [list(pair) for pair in labels], value]
+                            for (name, labels), value in fam["samples"].items()]}
+        for fam in merged.values()
+    ]
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if value != value:
+        return 'NaN'
+    if isinstance(value, bool) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(families):
+    """Families in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for fam in families:
+        help_text = fam["help"].replace('\\', '\\\\').replace('\n', '\\n')
+        lines.append(f"# HELP {fam['name']} {help_text}")
+        lines.append(f"# TYPE {fam['name']} {fam['type']}")
+        for name, labels, value in fam["samples"]:
+            if labels:
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+class SharedMetrics:
+    """Shares `registry` between the worker processes of one server through
+    per-process files in `directory`."""
+
+    def __init__(self, registry, directory, interval=5.0):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    def start(self):
+        """Publishes this process's samples every `interval` seconds.
+        Safe to call more than once."""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        os.makedirs(self.directory, exist_ok=True)
+        threading.Thread(target=self._publish_loop, name="metrics-publisher", daemon=True).start()
+
+    def _publish_loop(self):
+        while True:
+            try:
+                self.publish()
+            except OSError as e:
+                print(f"Could not publish metrics: {e}")
+            time.sleep(self.interval)
+
+    def publish(self):
+        atomic_write_json(self._path(os.getpid()),
+                          {"pid": os.getpid(), "at": time.time(), "families": self.registry.collect()})
+
+    def collect(self):
+        """Every worker's families merged, with this worker's read live."""
+        pid = os.getpid()
+        snapshots = {pid: self.registry.collect()}
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            entries = []
+        for entry in entries:
+            if not entry.name.startswith('metrics-') or entry.path == self._path(pid):
+                continue
+            try:
+                with open(entry.path) as f:
+                    published = json.load(f)
+            except (OSError, ValueError):
+                continue
+            families = published["families"]
+            if time.time() - published["at"] > 3 * self.interval:
+                # An exited worker: keep its counts so totals never go
+                # backwards, but not its gauges
+                families = [fam for fam in families if fam["type"] != 'gauge']
+            snapshots[published["pid"]] = families
+        return merge(snapshots)
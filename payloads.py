@@ -0,0 +1,88 @@
+"""
+Pre-serialized JSON responses.
+
+A SerializedPayload encodes its data to JSON bytes once, precomputes gzip
+(and brotli, when the optional `brotli` package is installed) variants, and
+derives strong ETags from the body hash. Serving it is a header check and a
+byte write: no per-request serialization or compression.
+
+EncodedPayload holds the serving logic for any set of pre-encoded variants,
+so payloads read back from elsewhere (see shared_snapshot.py) are served the
+same way.
+"""
+import gzip
+import hashlib
+import json
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def join_json_object(members):
+    """Builds a JSON object from (key, encoded JSON value) pairs, splicing
+    already-serialized bodies in without decoding them."""
+    return b'{' + b','.join(json.dumps(key).encode('utf-8') + b':' + value for key, value in members) + b'}'
+
+
+def encode_json(data):
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+class EncodedPayload:
+    """Serves a JSON body from `variants`, a dict mapping content-coding
+    (None for identity) to (bytes-like body, ETag)."""
+
+    def __init__(self, variants):
+        self.variants = variants
+        self.body = variants[None][0]
+        self.etags = [etag for _, etag in variants.values()]
+        # Approximate memory held by the encoded variants
+        self.nbytes = sum(len(body) for body, _ in variants.values())
+
+    def choose_encoding(self, accept_encodings):
+        """Picks br, then gzip, then identity based on the Accept-Encoding header."""
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accept_encodings[encoding] > 0:
+                return encoding
+        return None
+
+    def make_response(self, request):
+        """Builds a 200 or 304 response for the current request."""
+        encoding = self.choose_encoding(request.accept_encodings)
+        body, etag = self.variants[encoding]
+        headers = {
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            # Clients may keep the body but must revalidate before reuse
+            'Cache-Control': 'no-cache',
+        }
+
+        if any(request.if_none_match.contains_weak(tag.strip('"')) for tag in self.etags):
+            return Response(status=304, headers=headers)
+
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        # bytes() is free for bytes and copies memoryviews, which WSGI
+        # servers do not accept as a body
+        return Response(bytes(body), mimetype='application/json', headers=headers)
+
+
+class SerializedPayload(EncodedPayload):
+    """JSON body plus compressed variants, serialized exactly once."""
+
+    def __init__(self, data):
+        self.data = data
+        body = encode_json(data)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+
+        # Each content-coding is a different representation, so each gets its
+        # own strong ETag derived from the same body hash.
+        variants = {None: (body, f'"{digest}"')}
+        variants['gzip'] = (gzip.compress(body, compresslevel=6, mtime=0), f'"{digest}-gzip"')
+        if brotli is not None:
+            variants['br'] = (brotli.compress(body), f'"{digest}-br"')
+        super().__init__(variants)
@@ -0,0 +1,204 @@
+"""
+Opt-in profiling: per-request cProfile and a background stack sampler.
+
+Both are off unless configured, and cost nothing while off.
+
+`RequestProfiler` wraps the WSGI app. A request carrying `X-Profile: 1` (or
+`?profile=1`) and the shared secret in `X-Profile-Token` runs under cProfile, from routing through view code,
+serialization and the response body, and the stats are saved to the profile
+directory (open with `python -m pstats` or snakeviz); the response is
+unchanged apart from an `X-Profile-File` header naming the file. With
+`report` instead of `1` the response is replaced by the top functions by
+cumulative time as text. cProfile sees only the request's own thread: time
+spent in provider worker threads shows as the request waiting on them.
+One request per process is profiled at a time; others that ask meanwhile are
+served unprofiled, as are requests without the right token, since profiles
+write files and reveal internals. Streamed responses (the market SSE stream) are never
+profiled, as they do not end.
+
+`StackSampler` is a wall-clock sampling profiler for a running server: every
+`interval` seconds it records the current stack of each thread, and every
+`dump_every` seconds it writes the counts in collapsed-stack format, one
+`frame;frame;frame count` line per distinct stack, ready for flamegraph.pl,
+speedscope or inferno. Threads blocked on I/O or locks are sampled too,
+which is what shows where a slow request waits.
+"""
+import cProfile
+import hmac
+import io
+import itertools
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from atomic_write import atomic_write_bytes
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+_QUERY_FLAG = re.compile(r'(?:^|&)profile=([^&]*)')
+
+
+def _slug(path):
+    return re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-')[:60] or 'root'
+
+
+class RequestProfiler:
+    """WSGI middleware profiling the requests that ask for it."""
+
+    def __init__(self, app, directory, token, top=40):
+        if not token:
+            raise ValueError("request profiling needs a token")
+        self.app = app
+        self.directory = directory
+        self.token = token.encode('utf-8')
+        self.top = top
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+
+    def _mode(self, environ):
+        mode = environ.get(PROFILE_HEADER)
+        if mode is None:
+            match = _QUERY_FLAG.search(environ.get('QUERY_STRING', ''))
+            mode = match.group(1) if match else None
+        if mode not in ('1', 'report'):
+            return None
+        token = environ.get(TOKEN_HEADER, '').encode('utf-8')
+        return mode if hmac.compare_digest(token, self.token) else None
+
+    def __call__(self, environ, start_response):
+        mode = self._mode(environ)
+        if mode is None or not self._lock.acquire(blocking=False):
+            return self.app(environ, start_response)
+        try:
+            return self._profile(environ, start_response, mode)
+        finally:
+            self._lock.release()
+
+    def _profile(self, environ, start_response, mode):
+        captured = {}
+        chunks = []
+
+        def capture(status, headers, exc_info=None):
+            captured['status'], captured['headers'] = status, headers
+            return chunks.append
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = self.app(environ, capture)
+            content_type = dict(captured.get('headers', ())).get('Content-Type', '')
+            if content_type.startswith('text/event-stream'):
+                profiler.disable()
+                start_response(captured['status'], captured['headers'])
+                return result
+            try:
+                chunks.extend(result)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        finally:
+            profiler.disable()
+
+        name = (f"request-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._sequence)}"
+                f"-{_slug(environ.get('PATH_INFO', ''))}.prof")
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.directory, name))
+        print(f"🔬 Profiled {environ.get('PATH_INFO')} -> {name}")
+
+        if mode == 'report':
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(self.top)
+            body = report.getvalue().encode('utf-8')
+            start_response('200 OK', [('Content-Type', 'text/plain; charset=utf-8'),
+                                      ('Content-Length', str(len(body))), ('X-Profile-File', name)])
+            return [body]
+        start_response(captured['status'], captured['headers'] + [('X-Profile-File', name)])
+        return chunks
+
+
+def _frame_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """Samples every thread's stack and dumps collapsed stacks periodically."""
+
+    def __init__(self, directory, interval=0.01, dump_every=60.0):
+        self.directory = directory
+        self.interval = interval
+        self.dump_every = dump_every
+
+        self._counts = Counter()
+        self._samples = 0
+        self._dumps = 0
+        self._last_file = None
+        self._thread = None
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Starts sampling in a daemon thread. Safe to call more than once."""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        print(f"🔬 Sampling stacks every {self.interval * 1000:.0f}ms into {self.directory}")
+
+    def sample(self):
+        """Records the current stack of every other thread once."""
+        # Numbered threads of one pool share a root: "ThreadPoolExecutor-N_N"
+        names = {thread.ident: re.sub(r'\d+', 'N', thread.name) for thread in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, 'thread'))
+            self._counts[';'.join(reversed(stack))] += 1
+        self._samples += 1
+
+    def dump(self):
+        """Writes the stacks counted since the last dump; returns the path,
+        or None if there was nothing to write."""
+        counts, self._counts = self._counts, Counter()
+        if not counts:
+            return None
+        lines = [f"{stack} {count}" for stack, count in counts.most_common()]
+        name = f"stacks-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.folded"
+        path = os.path.join(self.directory, name)
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write_bytes(path, ('\n'.join(lines) + '\n').encode('utf-8'))
+        self._dumps += 1
+        self._last_file = name
+        return path
+
+    def _run(self):
+        next_dump = time.monotonic() + self.dump_every
+        while True:
+            self.sample()
+            if time.monotonic() >= next_dump:
+                try:
+                    self.dump()
+                except OSError as e:
+                    print(f"Could not write stack samples: {e}")
+                next_dump = time.monotonic() + self.dump_every
+            time.sleep(self.interval)
+
+    def stats(self):
+        return {
+            "interval_ms": self.interval * 1000,
+            "dump_every_seconds": self.dump_every,
+            "samples": self._samples,
+            "pending_stacks": len(self._counts),
+            "dumps": self._dumps,
+            "last_file": self._last_file,
+        }
@@ -0,0 +1,356 @@
+"""
+Upstream provider abstraction with hedged racing.
+
+Each provider wraps a fetch function that returns data already normalized to
+the format the frontend expects, so results from different upstreams are
+interchangeable. `race()` starts the primary provider, launches the next one
+after `hedge_delay` seconds (or as soon as the previous one fails), and
+returns the first valid result. Providers that have not started yet are
+cancelled; in-flight losers are abandoned and their results discarded.
+
+A provider with a circuit breaker fails immediately while the breaker is
+open, which makes the race move on to the next provider without waiting.
+Providers of the same upstream can share a ConcurrencyLimit, which caps how
+many calls are in flight to it at once; a call that cannot get a slot in
+time fails with UpstreamBusy, also without touching the breaker. A call
+waiting for rate budget has nothing in flight, so the HTTP clients give up
+its slot for the wait (`slot_released()`) and take it back to send.
+
+`arace()` is the asyncio counterpart for the ASGI serving mode: providers
+with an `afetch` coroutine are awaited on the event loop, the rest run on
+worker threads.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager, contextmanager
+
+# Shared worker pool for all provider calls
+_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('PROVIDER_POOL_SIZE', 32)),
+                               thread_name_prefix="provider")
+
+
+class AllProvidersFailed(Exception):
+    """Raised when no provider returned a valid result."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        details = ", ".join(f"{name}: {error}" for name, error in errors.items())
+        super().__init__(f"All providers failed ({details})")
+
+
+class UpstreamBusy(Exception):
+    """Raised when an upstream's concurrency limit had no free slot in time."""
+
+
+class ConcurrencyLimit:
+    """Caps concurrent calls to one upstream across all its providers."""
+
+    def __init__(self, name, max_concurrent, wait_timeout=5.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waited = 0
+        self._rejected = 0
+
+    def acquire(self):
+        if not self._slots.acquire(blocking=False):
+            self._count("_waited")
+            if not self._slots.acquire(timeout=self.wait_timeout):
+                self._reject()
+        self._count("_in_flight")
+
+    async def aacquire(self):
+        """Waits for a slot without blocking the event loop."""
+        if not self._slots.acquire(blocking=False):
+            self._count("_waited")
+            deadline = time.monotonic() + self.wait_timeout
+            delay = 0.005
+            while not self._slots.acquire(blocking=False):
+                if time.monotonic() >= deadline:
+                    self._reject()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.1)
+        self._count("_in_flight")
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    async def __aenter__(self):
+        await self.aacquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _reject(self):
+        self._count("_rejected")
+        raise UpstreamBusy(f"{self.name} has {self.max_concurrent} calls in flight")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "in_flight": self._in_flight,
+                "waited": self._waited,
+                "rejected": self._rejected,
+            }
+
+
+class _Slot:
+    """The place a provider call holds under its ConcurrencyLimit."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.held = False
+
+    def acquire(self):
+        self.limit.acquire()
+        self.held = True
+
+    async def aacquire(self):
+        await self.limit.aacquire()
+        self.held = True
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self.limit.release()
+
+
+# The slot held by the provider call running in this context, if any
+_current_slot = contextvars.ContextVar('provider_slot', default=None)
+
+
+@contextmanager
+def _holding(limit):
+    slot = _Slot(limit)
+    slot.acquire()
+    token = _current_slot.set(slot)
+    try:
+        yield
+    finally:
+        _current_slot.reset(token)
+        slot.release()
+
+
+@asynccontextmanager
+async def _aholding(limit):
+    slot = _Slot(limit)
+    await slot.aacquire()
+    token = _current_slot.set(slot)
+    try:
+        yield
+    finally:
+        _current_slot.reset(token)
+        slot.release()
+
+
+@contextmanager
+def slot_released():
+    """Gives up the current provider call's concurrency slot, if it holds
+    one, for the enclosed wait, and takes it back afterwards. If the wait
+    raises, the call is failing and the slot is not taken back."""
+    slot = _current_slot.get()
+    if slot is None or not slot.held:
+        yield
+        return
+    slot.release()
+    yield
+    slot.acquire()
+
+
+@asynccontextmanager
+async def aslot_released():
+    """slot_released() for a wait on the event loop."""
+    slot = _current_slot.get()
+    if slot is None or not slot.held:
+        yield
+        return
+    slot.release()
+    yield
+    await slot.aacquire()
+
+
+class Provider:
+    """A named upstream fetch that returns a normalized result."""
+
+    def __init__(self, name, fetch, validate=None, breaker=None, limit=None, afetch=None):
+        self.name = name
+        self.fetch = fetch
+        # By default any non-empty result counts as valid
+        self.validate = validate or bool
+        self.breaker = breaker
+        self.limit = limit
+        # Optional coroutine function doing the same fetch on the async client
+        self.afetch = afetch
+
+    def __call__(self, *args, **kwargs):
+        if self.limit is not None:
+            with _holding(self.limit):
+                result = self._call(*args, **kwargs)
+        else:
+            result = self._call(*args, **kwargs)
+        if not self.validate(result):
+            raise ValueError("invalid or empty result")
+        return result
+
+    def _call(self, *args, **kwargs):
+        if self.breaker is not None:
+            return self.breaker.call(self.fetch, *args, **kwargs)
+        return self.fetch(*args, **kwargs)
+
+    async def acall(self, *args, **kwargs):
+        """Async __call__: awaits `afetch`, or runs the sync fetch on a worker
+        thread if the provider has none."""
+        if self.afetch is None:
+            return await asyncio.to_thread(self, *args, **kwargs)
+        if self.limit is not None:
+            async with _aholding(self.limit):
+                result = await self._acall(*args, **kwargs)
+        else:
+            result = await self._acall(*args, **kwargs)
+        if not self.validate(result):
+            raise ValueError("invalid or empty result")
+        return result
+
+    async def _acall(self, *args, **kwargs):
+        if self.breaker is not None:
+            return await self.breaker.acall(self.afetch, *args, **kwargs)
+        return await self.afetch(*args, **kwargs)
+
+    def __repr__(self):
+        return f"Provider({self.name!r})"
+
+
+def race(providers, *args, hedge_delay=1.0, timeout=None, **kwargs):
+    """Returns `(result, provider_name)` from the first provider to succeed.
+
+    Providers are started in order, each one `hedge_delay` seconds after the
+    previous (0 starts them all at once). A failure starts the next provider
+    immediately. Raises AllProvidersFailed if every provider fails or
+    `timeout` seconds pass without a valid result.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    pending = {}
+    errors = {}
+    waiting = list(providers)
+
+    def launch_next():
+        provider = waiting.pop(0)
+        # Run in a copy of the caller's context so e.g. its rate-limit
+        # priority applies to the provider call
+        pending[_executor.submit(contextvars.copy_context().run, provider, *args, **kwargs)] = provider
+
+    launch_next()
+    try:
+        while pending:
+            wait_for = hedge_delay if waiting else None
+            if deadline is not None:
+                remaining = max(deadline - time.monotonic(), 0)
+                wait_for = remaining if wait_for is None else min(wait_for, remaining)
+
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    return future.result(), provider.name
+                except Exception as e:
+                    errors[provider.name] = e
+
+            if deadline is not None and time.monotonic() >= deadline:
+                for provider in pending.values():
+                    errors[provider.name] = TimeoutError("race timed out")
+                break
+
+            # Hedge delay elapsed or a provider failed: start the next one
+            if waiting:
+                launch_next()
+    finally:
+        for future in pending:
+            future.cancel()
+
+    for provider in waiting:
+        errors.setdefault(provider.name, RuntimeError("not attempted"))
+    raise AllProvidersFailed(errors)
+
+
+# Abandoned arace() losers, kept referenced until they finish
+_abandoned = set()
+
+
+def _abandon(task):
+    _abandoned.add(task)
+
+    def finished(task):
+        _abandoned.discard(task)
+        if not task.cancelled():
+            # Retrieve the error so it is not reported as never retrieved
+            task.exception()
+    task.add_done_callback(finished)
+
+
+async def arace(providers, *args, hedge_delay=1.0, timeout=None, **kwargs):
+    """Async race(): same ordering, hedging and errors, with each provider
+    run as a task on the running event loop."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    pending = {}
+    errors = {}
+    waiting = list(providers)
+
+    def launch_next():
+        provider = waiting.pop(0)
+        pending[asyncio.ensure_future(provider.acall(*args, **kwargs))] = provider
+
+    launch_next()
+    try:
+        while pending:
+            wait_for = hedge_delay if waiting else None
+            if deadline is not None:
+                remaining = max(deadline - loop.time(), 0)
+                wait_for = remaining if wait_for is None else min(wait_for, remaining)
+
+            done, _ = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                provider = pending.pop(task)
+                try:
+                    return task.result(), provider.name
+                except Exception as e:
+                    errors[provider.name] = e
+
+            if deadline is not None and loop.time() >= deadline:
+                for provider in pending.values():
+                    errors[provider.name] = TimeoutError("race timed out")
+                break
+
+            if waiting:
+                launch_next()
+    finally:
+        # As in race(), in-flight losers finish in the background and their
+        # results are discarded
+        for task in pending:
+            _abandon(task)
+
+    for provider in waiting:
+        errors.setdefault(provider.name, RuntimeError("not attempted"))
+    raise AllProvidersFailed(errors)
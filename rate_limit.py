@@ -0,0 +1,187 @@
+"""
+Per-upstream request budgets.
+
+Each upstream gets a token bucket sized to its published limit (calls or,
+for Binance, request weight per minute). A request takes its cost from the
+bucket before it is sent; when the bucket is short, callers queue and are
+served strictly by priority, then arrival order. Background work (polling,
+scheduled jobs) may not dip into the last `reserve` fraction of the bucket,
+which is kept for user-triggered fetches.
+
+Responses feed back into the bucket: a used-weight header (Binance's
+X-MBX-USED-WEIGHT-1M) caps the local token count at what the upstream says
+is left, and a 429/418 with Retry-After pauses the upstream entirely until
+then, so we back off before being throttled again rather than after.
+
+The current priority is a context variable, so it follows work submitted
+through `providers.race()`.
+"""
+import contextvars
+import functools
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_priority = contextvars.ContextVar('upstream_priority', default=INTERACTIVE)
+
+# Pause applied after a 429/418 that carries no Retry-After header
+DEFAULT_RETRY_AFTER = 60
+
+
+class RateLimited(Exception):
+    """Raised when no budget became available within the caller's wait time.
+
+    The request was never sent, so circuit breakers ignore this error."""
+    before_request = True
+
+
+def current_priority():
+    return _priority.get()
+
+
+@contextmanager
+def priority(level):
+    """Runs the enclosed upstream calls at `level` priority."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def background(func):
+    """Decorator running `func`'s upstream calls at background priority."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with priority(BACKGROUND):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class RateBudget:
+    """Token bucket for one upstream with priority-ordered waiting."""
+
+    def __init__(self, name, limit, period=60.0, reserve=0.2, used_weight_header=None,
+                 max_wait=None):
+        self.name = name
+        self.capacity = float(limit)
+        self.refill_rate = limit / period
+        self.reserve = self.capacity * reserve
+        self.used_weight_header = used_weight_header
+        # Longest a caller waits for budget, by priority
+        self.max_wait = {INTERACTIVE: 2.0, BACKGROUND: 30.0, **(max_wait or {})}
+
+        self._cond = threading.Condition()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._granted = {level: 0 for level in PRIORITY_NAMES}
+        self._rejected = {level: 0 for level in PRIORITY_NAMES}
+        self._spent = 0.0
+        self._throttled = 0
+        self._last_used_weight = None
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+    def acquire(self, cost=1, level=None, timeout=None):
+        """Takes `cost` tokens, waiting behind higher-priority and earlier
+        callers. Raises RateLimited if that takes longer than `timeout`
+        (default: the budget's max wait for the priority)."""
+        level = current_priority() if level is None else level
+        cost = min(float(cost), self.capacity)
+        floor = self.reserve if level == BACKGROUND else 0.0
+        deadline = time.monotonic() + (self.max_wait[level] if timeout is None else timeout)
+
+        with self._cond:
+            ticket = (level, next(self._sequence))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    remaining = deadline - now
+                    if now < self._blocked_until:
+                        wait = self._blocked_until - now
+                    elif self._waiters[0] != ticket:
+                        # Woken when someone ahead is served or gives up
+                        wait = None
+                    elif self._tokens - cost >= floor:
+                        self._tokens -= cost
+                        self._spent += cost
+                        self._granted[level] += 1
+                        return
+                    else:
+                        wait = max((cost + floor - self._tokens) / self.refill_rate, 0.001)
+                    # Give up now rather than sleep through a wait that is
+                    # known to outlast the deadline
+                    if remaining <= 0 or (wait is not None and wait > remaining):
+                        self._rejected[level] += 1
+                        raise RateLimited(f"{self.name} request budget exhausted")
+                    self._cond.wait(remaining if wait is None else wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                # The next waiter in line may be able to go now
+                self._cond.notify_all()
+
+    def try_acquire(self, cost=1, level=None):
+        """Takes `cost` tokens only if that needs no waiting, as acquire()
+        would grant them; returns whether it did."""
+        level = current_priority() if level is None else level
+        cost = min(float(cost), self.capacity)
+        floor = self.reserve if level == BACKGROUND else 0.0
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._blocked_until or self._waiters or self._tokens - cost < floor:
+                return False
+            self._tokens -= cost
+            self._spent += cost
+            self._granted[level] += 1
+            return True
+
+    def observe(self, response):
+        """Updates the budget from an upstream response's status and headers."""
+        headers = response.headers
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if self.used_weight_header:
+                used = headers.get(self.used_weight_header)
+                if used is not None and used.isdigit():
+                    self._last_used_weight = int(used)
+                    self._tokens = min(self._tokens, self.capacity - int(used))
+            if response.status_code in (418, 429):
+                self._throttled += 1
+                retry_after = headers.get('Retry-After', '')
+                pause = int(retry_after) if retry_after.isdigit() else DEFAULT_RETRY_AFTER
+                self._blocked_until = max(self._blocked_until, now + pause)
+                self._tokens = min(self._tokens, 0.0)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "capacity": self.capacity,
+                "tokens": round(self._tokens, 2),
+                "reserve": self.reserve,
+                "spent": self._spent,
+                "waiting": len(self._waiters),
+                "blocked_for": round(max(self._blocked_until - now, 0), 1),
+                "throttled_responses": self._throttled,
+                "last_used_weight": self._last_used_weight,
+                "granted": {PRIORITY_NAMES[k]: v for k, v in self._granted.items()},
+                "rejected": {PRIORITY_NAMES[k]: v for k, v in self._rejected.items()},
+            }
@@ -0,0 +1,151 @@
+"""
+Market snapshot shared between worker processes through a memory-mapped file.
+
+The scheduler leader publishes each snapshot as an immutable, versioned file
+holding every pre-encoded variant of the response (identity, gzip, br) with
+its ETag:
+
+    header  magic, version, fetched_at, metadata length
+    meta    JSON: source and each variant's encoding, offset, length, ETag
+    bodies  the variant bytes, back to back
+
+The file is written beside the target and swapped in with os.replace(), so a
+reader sees either the old version or the new one, never a mix. Readers map
+it read-only: the bytes live once in the page cache however many workers
+serve them, and a worker serves a request by slicing the map, with no JSON
+decoding or compression. A reader that mapped an older version keeps a valid
+view of it until the last response using it is done; the replaced file is
+freed once nobody maps it.
+
+The same file persists the snapshot across restarts.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from atomic_write import atomic_write_bytes
+from payloads import EncodedPayload, encode_json
+
+MAGIC = b'CPSNAP01'
+_HEADER = struct.Struct('<8sQdI')
+
+
+class MappedPayload(EncodedPayload):
+    """A published snapshot served straight from the mapped file."""
+
+    def __init__(self, buffer, version, fetched_at, source, variants):
+        super().__init__(variants)
+        self.version = version
+        self.fetched_at = fetched_at
+        self.source = source
+        self._buffer = buffer
+        self._data = None
+
+    @property
+    def data(self):
+        """The decoded snapshot, decoded on first use (the market stream
+        needs rows to diff; plain responses never decode)."""
+        if self._data is None:
+            self._data = json.loads(bytes(self.body))
+        return self._data
+
+
+def read_version(path):
+    """Version of the snapshot currently at `path`, or 0."""
+    try:
+        with open(path, 'rb') as f:
+            magic, version, _, _ = _HEADER.unpack(f.read(_HEADER.size))
+    except (OSError, struct.error):
+        return 0
+    return version if magic == MAGIC else 0
+
+
+def publish(path, payload, source, fetched_at):
+    """Writes `payload`'s encoded variants as the next snapshot version and
+    atomically swaps it in at `path`. Returns the new version."""
+    version = read_version(path) + 1
+    variants, offset = [], 0
+    for encoding, (body, etag) in payload.variants.items():
+        variants.append({'encoding': encoding, 'offset': offset, 'length': len(body), 'etag': etag})
+        offset += len(body)
+    meta = encode_json({'source': source, 'variants': variants})
+    atomic_write_bytes(path, b''.join([
+        _HEADER.pack(MAGIC, version, fetched_at, len(meta)), meta,
+        *(bytes(body) for body, _ in payload.variants.values()),
+    ]))
+    return version
+
+
+def _load(path):
+    with open(path, 'rb') as f:
+        if os.name == 'nt':
+            # Windows cannot replace a file while it is mapped
+            buffer = f.read()
+        else:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(buffer)
+    magic, version, fetched_at, meta_length = _HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("not a market snapshot file")
+    start = _HEADER.size + meta_length
+    meta = json.loads(bytes(view[_HEADER.size:start]))
+    variants = {}
+    for variant in meta['variants']:
+        begin = start + variant['offset']
+        end = begin + variant['length']
+        if end > len(view):
+            raise ValueError("truncated market snapshot file")
+        variants[variant['encoding']] = (view[begin:end], variant['etag'])
+    return MappedPayload(buffer, version, fetched_at, meta['source'], variants)
+
+
+class SnapshotReader:
+    """Follows the snapshot file at `path`, mapping each new version once."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._identity = None
+        self._current = None
+        self._swaps = 0
+        self._swapped_at = None
+        self._last_error = None
+
+    def poll(self):
+        """Maps the file if it changed since the last call. Returns the new
+        MappedPayload, or None if unchanged, missing or unreadable."""
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        identity = (info.st_ino, info.st_mtime_ns, info.st_size)
+        with self._lock:
+            if identity == self._identity:
+                return None
+            self._identity = identity
+            try:
+                payload = _load(self.path)
+            except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+                self._last_error = str(e)
+                print(f"Ignoring unreadable market snapshot {self.path}: {e}")
+                return None
+            self._current = payload
+            self._swaps += 1
+            self._swapped_at = time.time()
+            self._last_error = None
+            return payload
+
+    def stats(self):
+        current = self._current
+        return {
+            "path": self.path,
+            "version": current.version if current else None,
+            "fetched_at": current.fetched_at if current else None,
+            "mapped_bytes": current.nbytes if current else 0,
+            "swaps": self._swaps,
+            "swapped_at": self._swapped_at,
+            "last_error": self._last_error,
+        }
@@ -27,20 +27,39 @@ document.addEventListener('DOMContentLoaded', async function() {
         wickUpColor: '#26a69a',
     });
 
-    // Fetch data and apply it to the chart
-    try {
-        const response = await fetch(`/api/kline-data/${coinSymbol}`);
-        if (!response.ok) {
-            throw new Error('Failed to fetch chart data');
+    // Cap the candles per response to roughly one per pixel of chart width
+    const maxPoints = () => Math.max(100, Math.round(chartContainer.clientWidth));
+
+    // Fetch data for an interval/range and apply it to the chart
+    async function loadCandles(interval, range) {
+        try {
+            const params = new URLSearchParams({ interval, range, max_points: maxPoints() });
+            const response = await fetch(`/api/kline-data/${coinSymbol}?${params}`);
+            if (!response.ok) {
+                throw new Error('Failed to fetch chart data');
+            }
+            const data = await response.json();
+            candleSeries.setData(data);
+            chart.applyOptions({ timeScale: { timeVisible: interval !== '1d' && interval !== '1w' } });
+            chart.timeScale().fitContent();
+        } catch (error) {
+            console.error('Error fetching K-line data:', error);
+            // Display an error message on the chart
         }
-        const data = await response.json();
-        candleSeries.setData(data);
-        chart.timeScale().fitContent();
-    } catch (error) {
-        console.error('Error fetching K-line data:', error);
-        // Display an error message on the chart
     }
 
+    // Zoom buttons switch the interval and range together
+    const rangeButtons = document.querySelectorAll('#chart-ranges button');
+    rangeButtons.forEach(button => {
+        button.addEventListener('click', () => {
+            rangeButtons.forEach(b => b.classList.toggle('active', b === button));
+            loadCandles(button.dataset.interval, button.dataset.range);
+        });
+    });
+
+    const initial = document.querySelector('#chart-ranges button.active');
+    await loadCandles(initial.dataset.interval, initial.dataset.range);
+
     // Resize chart with window
     window.addEventListener('resize', () => {
         chart.resize(chartContainer.clientWidth, 500);
@@ -1,82 +1,188 @@
 document.addEventListener('DOMContentLoaded', function() {
     const cryptoTableBody = document.getElementById('crypto-table-body');
 
-    async function fetchMarketData() {
-        try {
-            const response = await fetch('/api/market-data');
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            const data = await response.json();
-
-            // Clear loading message
-            cryptoTableBody.innerHTML = ''; 
-
-            // Handle both real API data and fallback data
-            let processedData = data;
-            
-            // If this is Binance API data, filter for USDT pairs
-            if (data.length > 0 && data[0].symbol && !data[0].symbol.endsWith('USDT')) {
-                // This might be a different format, handle accordingly
-                processedData = data.filter(coin => coin.symbol && coin.symbol.endsWith('USDT'));
-            }
-            
-            // Sort by quote volume (or use a default sort)
-            processedData.sort((a, b) => {
-                const volumeA = parseFloat(a.quoteVolume || a.volume || 0);
-                const volumeB = parseFloat(b.quoteVolume || b.volume || 0);
-                return volumeB - volumeA;
-            });
-
-            // Take top 100
-            const sortedData = processedData.slice(0, 100);
-
-            if (sortedData.length === 0) {
-                cryptoTableBody.innerHTML = '<tr><td colspan="6" class="text-center text-warning">No market data available at the moment.</td></tr>';
-                return;
-            }
+    // Latest known row for each symbol, updated by full snapshots and deltas
+    const coinsBySymbol = new Map();
+    let pollTimer = null;
+
+    function formatCells(coin) {
+        const price = parseFloat(coin.lastPrice || 0).toFixed(2);
+        const change = parseFloat(coin.priceChangePercent || 0);
+        const volume = parseFloat(coin.volume || 0).toLocaleString();
+        const marketCap = (parseFloat(coin.lastPrice || 0) * parseFloat(coin.weightedAvgPrice || coin.lastPrice || 0)).toLocaleString(undefined, { maximumFractionDigits: 0 });
+
+        return {
+            name: coin.symbol.replace('USDT', ''),
+            price: `$${price}`,
+            change: `${change.toFixed(2)}%`,
+            changeClass: change >= 0 ? 'text-success' : 'text-danger',
+            volume: `$${volume}`,
+            marketCap: `$${marketCap}`
+        };
+    }
+
+    function sortKey(coin) {
+        return parseFloat(coin.quoteVolume || coin.volume || 0);
+    }
+
+    function rankedCoins() {
+        // Handle both real API data and fallback data
+        let processedData = Array.from(coinsBySymbol.values())
+            .filter(coin => coin.symbol && coin.symbol.endsWith('USDT'));
 
-            sortedData.forEach((coin, index) => {
-                try {
-                    const price = parseFloat(coin.lastPrice || 0).toFixed(2);
-                    const change = parseFloat(coin.priceChangePercent || 0);
-                    const volume = parseFloat(coin.volume || 0).toLocaleString();
-                    const marketCap = (parseFloat(coin.lastPrice || 0) * parseFloat(coin.weightedAvgPrice || coin.lastPrice || 0)).toLocaleString(undefined, { maximumFractionDigits: 0 });
-
-                    const row = document.createElement('tr');
-                    const symbolName = coin.symbol.replace('USDT', '');
-                    row.dataset.symbol = symbolName;
-                    
-                    row.innerHTML = `
-                        <td>${index + 1}</td>
-                        <td>${symbolName}</td>
-                        <td>$${price}</td>
-                        <td class="${change >= 0 ? 'text-success' : 'text-danger'}">${change.toFixed(2)}%</td>
-                        <td>$${volume}</td>
-                        <td>$${marketCap}</td>
-                    `;
-                    cryptoTableBody.appendChild(row);
-                } catch (coinError) {
-                    console.warn('Error processing coin data:', coin, coinError);
-                }
-            });
-            
-            // Add click listeners to rows
-            document.querySelectorAll('#crypto-table tbody tr').forEach(row => {
+        // Sort by quote volume (or use a default sort)
+        processedData.sort((a, b) => sortKey(b) - sortKey(a));
+
+        // Take top 100
+        return processedData.slice(0, 100);
+    }
+
+    function renderTable() {
+        // Clear loading message
+        cryptoTableBody.innerHTML = '';
+
+        const sortedData = rankedCoins();
+
+        if (sortedData.length === 0) {
+            cryptoTableBody.innerHTML = '<tr><td colspan="6" class="text-center text-warning">No market data available at the moment.</td></tr>';
+            return;
+        }
+
+        sortedData.forEach((coin, index) => {
+            try {
+                const cells = formatCells(coin);
+                const row = document.createElement('tr');
+                row.dataset.symbol = cells.name;
+
+                row.innerHTML = `
+                    <td data-field="rank">${index + 1}</td>
+                    <td>${cells.name}</td>
+                    <td data-field="price">${cells.price}</td>
+                    <td data-field="change" class="${cells.changeClass}">${cells.change}</td>
+                    <td data-field="volume">${cells.volume}</td>
+                    <td data-field="marketCap">${cells.marketCap}</td>
+                `;
                 row.addEventListener('click', () => {
                     window.location.href = `/coin/${row.dataset.symbol}`;
                 });
-            });
+                cryptoTableBody.appendChild(row);
+            } catch (coinError) {
+                console.warn('Error processing coin data:', coin, coinError);
+            }
+        });
+
+        console.log(`✅ Market data loaded successfully: ${sortedData.length} coins`);
+    }
+
+    function patchRow(coin) {
+        const cells = formatCells(coin);
+        const row = cryptoTableBody.querySelector(`tr[data-symbol="${CSS.escape(cells.name)}"]`);
+        if (!row) {
+            return false;
+        }
+        row.querySelector('[data-field="price"]').textContent = cells.price;
+        const changeCell = row.querySelector('[data-field="change"]');
+        changeCell.textContent = cells.change;
+        changeCell.className = cells.changeClass;
+        row.querySelector('[data-field="volume"]').textContent = cells.volume;
+        row.querySelector('[data-field="marketCap"]').textContent = cells.marketCap;
+        return true;
+    }
+
+    function reorderRows() {
+        // Moves the existing rows into rank order; false if a row is missing
+        const rows = new Map();
+        cryptoTableBody.querySelectorAll('tr[data-symbol]').forEach(row => rows.set(row.dataset.symbol, row));
+        const sortedData = rankedCoins();
+        if (sortedData.length !== rows.size) {
+            return false;
+        }
+        const ordered = [];
+        for (const coin of sortedData) {
+            const row = rows.get(formatCells(coin).name);
+            if (!row) {
+                return false;
+            }
+            ordered.push(row);
+        }
+        ordered.forEach((row, index) => {
+            row.querySelector('[data-field="rank"]').textContent = index + 1;
+            cryptoTableBody.appendChild(row);
+        });
+        return true;
+    }
+
+    function applySnapshot(data) {
+        coinsBySymbol.clear();
+        data.forEach(coin => coinsBySymbol.set(coin.symbol, coin));
+        renderTable();
+    }
 
-            console.log(`✅ Market data loaded successfully: ${sortedData.length} coins`);
+    function applyDelta(delta) {
+        let needsRender = delta.removed.length > 0;
+        let needsReorder = false;
+        delta.removed.forEach(symbol => coinsBySymbol.delete(symbol));
+        delta.changed.forEach(coin => {
+            const previous = coinsBySymbol.get(coin.symbol);
+            if (previous && sortKey(previous) !== sortKey(coin)) {
+                needsReorder = true;
+            }
+            coinsBySymbol.set(coin.symbol, coin);
+            // New symbols have no row yet, so the table is rebuilt once
+            if (!needsRender && !patchRow(coin)) {
+                needsRender = true;
+            }
+        });
+        // A changed volume can move rows, or swap one in or out of the top 100
+        if (needsRender || (needsReorder && !reorderRows())) {
+            renderTable();
+        }
+    }
 
+    async function fetchMarketData() {
+        try {
+            const response = await fetch('/api/market-data');
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            applySnapshot(await response.json());
         } catch (error) {
             console.error("Could not fetch market data:", error);
             cryptoTableBody.innerHTML = '<tr><td colspan="6" class="text-center text-danger">Failed to load market data. Please try again later.</td></tr>';
         }
     }
 
-    fetchMarketData();
-    // Refresh data every 30 seconds
-    setInterval(fetchMarketData, 30000);
+    function startPolling() {
+        if (pollTimer) {
+            return;
+        }
+        fetchMarketData();
+        // Refresh data every 30 seconds
+        pollTimer = setInterval(fetchMarketData, 30000);
+    }
+
+    function startStream() {
+        if (!window.EventSource) {
+            startPolling();
+            return;
+        }
+
+        const source = new EventSource('/api/market-stream');
+        let opened = false;
+
+        source.onopen = () => { opened = true; };
+        source.addEventListener('snapshot', event => applySnapshot(JSON.parse(event.data)));
+        source.addEventListener('delta', event => applyDelta(JSON.parse(event.data)));
+        source.onerror = () => {
+            // The browser reconnects on its own after a dropped stream; only
+            // fall back to polling if the stream never worked at all (or the
+            // server turned us away with a 503 at its stream limit).
+            if (!opened) {
+                source.close();
+                startPolling();
+            }
+        };
+    }
+
+    startStream();
 });
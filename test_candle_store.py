@@ -0,0 +1,88 @@
+"""
+Unit tests for the memory-mapped candle store
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from candle_store import CandleSeries, CandleStore
+
+DAY = 86400
+
+
+def candles(first, last, close=1.0):
+    return [{'time': t * DAY, 'open': close, 'high': close, 'low': close, 'close': close, 'volume': 1.0}
+            for t in range(first, last + 1)]
+
+
+def days(columns):
+    return [t // DAY for t in columns['time'].tolist()]
+
+
+def test_write_appends_and_overwrites_open_candle(tmp_path):
+    series = CandleSeries(str(tmp_path))
+    assert series.write(candles(1, 5)) == 5
+    assert series.write(candles(3, 6, close=2.0)) == 1
+    columns = series.read()
+    assert days(columns) == [1, 2, 3, 4, 5, 6]
+    # Day 5 was the open candle and is replaced; older ones are kept
+    assert columns['close'].tolist() == [1.0] * 4 + [2.0, 2.0]
+
+
+def test_read_window_and_limit(tmp_path):
+    series = CandleSeries(str(tmp_path))
+    series.write(candles(1, 10))
+    assert days(series.read(start=3 * DAY, end=6 * DAY)) == [3, 4, 5, 6]
+    assert days(series.read(start=3 * DAY, limit=2)) == [9, 10]
+    assert days(series.tail(3)) == [8, 9, 10]
+
+
+def test_merge_appends_to_earlier_series(tmp_path):
+    series = CandleSeries(str(tmp_path))
+    series.write(candles(1, 10))
+    result = series.merge(candles(8, 12, close=2.0), fetched_from=8 * DAY, start=9 * DAY)
+    assert days(result) == [9, 10, 11, 12]
+    assert days(series.read()) == list(range(1, 13))
+
+
+def test_merge_of_older_window_keeps_newer_candles(tmp_path):
+    series = CandleSeries(str(tmp_path))
+    series.write(candles(5, 10))
+    series.merge(candles(1, 7, close=2.0), fetched_from=1 * DAY)
+    columns = series.read()
+    assert days(columns) == list(range(1, 11))
+    assert columns['close'].tolist() == [2.0] * 7 + [1.0] * 3
+
+
+def test_merge_past_a_gap_replaces_series(tmp_path):
+    series = CandleSeries(str(tmp_path))
+    series.write(candles(1, 3))
+    series.merge(candles(6, 8), fetched_from=6 * DAY)
+    assert days(series.read()) == [6, 7, 8]
+
+
+def test_merge_remembers_where_history_starts(tmp_path):
+    series = CandleSeries(str(tmp_path))
+    assert series.history_start() is None
+    series.merge(candles(5, 10), fetched_from=1 * DAY)
+    assert series.history_start() == 5 * DAY
+    # Reaches back as far as the upstream goes, so only the newest is fetched
+    assert series.top_up_start(1 * DAY) == 10 * DAY
+
+
+def test_top_up_start(tmp_path):
+    series = CandleSeries(str(tmp_path))
+    assert series.top_up_start(1 * DAY) == 1 * DAY
+    series.write(candles(5, 10))
+    assert series.top_up_start(6 * DAY) == 10 * DAY
+    assert series.top_up_start(2 * DAY) == 2 * DAY
+    assert series.top_up_start(20 * DAY) == 20 * DAY
+
+
+def test_store_rejects_unsafe_keys(tmp_path):
+    store = CandleStore(str(tmp_path))
+    assert store.series('btcusdt', '1d') is store.series('BTCUSDT', '1d')
+    with pytest.raises(ValueError):
+        store.series('../etc', '1d')
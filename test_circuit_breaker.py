@@ -0,0 +1,122 @@
+"""
+Unit tests for the per-upstream circuit breakers
+"""
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from rate_limit import RateLimited
+
+
+class HTTPError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(status)
+        self.response = type('Response', (), {'status_code': status, 'headers': headers or {}})()
+
+
+def fail(error):
+    def call():
+        raise error
+    return call
+
+
+def opened(reset_timeout=0):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=reset_timeout)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail(ConnectionError()))
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_opens_after_consecutive_failures_and_rejects():
+    breaker = opened(reset_timeout=60)
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+    assert breaker.stats()["rejected_calls"] == 1
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail(ConnectionError()))
+    breaker.call(lambda: "ok")
+    with pytest.raises(ConnectionError):
+        breaker.call(fail(ConnectionError()))
+    assert breaker.state == CLOSED
+
+
+def test_client_errors_do_not_trip():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    with pytest.raises(HTTPError):
+        breaker.call(fail(HTTPError(404)))
+    assert breaker.state == CLOSED
+    with pytest.raises(HTTPError):
+        breaker.call(fail(HTTPError(429)))
+    assert breaker.state == OPEN
+
+
+def test_ban_opens_at_once_for_retry_after():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=0)
+    with pytest.raises(HTTPError):
+        breaker.call(fail(HTTPError(418, {'Retry-After': '120'})))
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["retry_in_seconds"] > 119
+
+
+def test_throttled_opens_at_once():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+    with pytest.raises(HTTPError):
+        breaker.call(fail(HTTPError(429)))
+    assert breaker.state == OPEN
+    assert breaker.stats()["retry_in_seconds"] > 59
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = opened()
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+    breaker = opened()
+    with pytest.raises(ConnectionError):
+        breaker.call(fail(ConnectionError()))
+    assert breaker.state == OPEN
+
+
+def test_only_one_probe_at_a_time():
+    breaker = opened()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_probe_released_without_outcome_lets_next_call_probe():
+    breaker = opened()
+    with pytest.raises(RateLimited):
+        breaker.call(fail(RateLimited("no budget")))
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_cancelled_async_probe_is_released():
+    breaker = opened()
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def cancel_probe():
+        task = asyncio.ensure_future(breaker.acall(hang))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
@@ -0,0 +1,88 @@
+"""
+Unit tests for coin registry lookups and search
+"""
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from coin_registry import CoinRegistry
+
+COINS = [
+    {'id': 'ethereum', 'symbol': 'eth', 'name': 'Ethereum', 'rank': 2},
+    {'id': 'ethereum-classic', 'symbol': 'etc', 'name': 'Ethereum Classic', 'rank': 30},
+    {'id': 'ether-fi', 'symbol': 'ethfi', 'name': 'ether.fi', 'rank': 150},
+    {'id': 'bridged-eth', 'symbol': 'eth', 'name': 'Bridged ETH', 'rank': None},
+    {'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin', 'rank': 1},
+    {'id': 'tether', 'symbol': 'usdt', 'name': 'Tether', 'rank': 3},
+]
+
+
+def loaded(tmp_path, coins=COINS):
+    registry = CoinRegistry(str(tmp_path / 'coins.json'), lambda: coins)
+    registry.refresh()
+    return registry
+
+
+def wait_until_loaded(registry):
+    deadline = time.monotonic() + 5
+    while not registry.stats()["loaded"]:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def ids(coins):
+    return [coin['id'] for coin in coins]
+
+
+def test_resolve_prefers_best_ranked_coin(tmp_path):
+    registry = loaded(tmp_path)
+    assert registry.resolve('ETH') == 'ethereum'
+    assert registry.resolve('usdt') == 'tether'
+    assert registry.resolve('NOPE') is None
+    assert registry.get('bitcoin')['symbol'] == 'btc'
+
+
+def test_search_exact_symbol_first_then_by_rank(tmp_path):
+    registry = loaded(tmp_path)
+    assert ids(registry.search('eth')) == ['ethereum', 'bridged-eth', 'ethereum-classic', 'ether-fi']
+    assert ids(registry.search('ETHER ')) == ['ethereum', 'ethereum-classic', 'ether-fi']
+    assert ids(registry.search('te')) == ['tether']
+    assert ids(registry.search('e', limit=2)) == ['ethereum', 'ethereum-classic']
+    assert registry.search('  ') == []
+    assert registry.search('zzz') == []
+
+
+def test_disk_copy_is_used_without_upstream(tmp_path):
+    loaded(tmp_path)
+
+    def unreachable():
+        raise ConnectionError("down")
+
+    registry = CoinRegistry(str(tmp_path / 'coins.json'), unreachable)
+    registry.start()
+    wait_until_loaded(registry)
+    assert registry.resolve('btc') == 'bitcoin'
+    assert registry.stats()["coins"] == len(COINS)
+
+
+def test_fallback_served_until_first_load(tmp_path):
+    release = threading.Event()
+
+    def slow_loader():
+        release.wait()
+        return COINS
+
+    fallback = [{'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin', 'rank': None}]
+    registry = CoinRegistry(str(tmp_path / 'coins.json'), slow_loader, fallback=fallback)
+    started = time.monotonic()
+    assert registry.resolve('btc') == 'bitcoin'
+    assert registry.resolve('eth') is None
+    assert time.monotonic() - started < 1
+    assert registry.stats()["refreshing"]
+
+    release.set()
+    wait_until_loaded(registry)
+    assert registry.resolve('eth') == 'ethereum'
+    assert os.path.exists(tmp_path / 'coins.json')
@@ -0,0 +1,45 @@
+"""
+Unit tests for the paginated article and news endpoints
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import app as app_module
+from content_db import ContentDB
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    db = ContentDB(str(tmp_path / 'content.db'))
+    for n in range(3):
+        db.add_article({'title': f'Article {n}'})
+    db.add_news([{'url': f'https://example.com/{n}', 'source': 'CoinDesk', 'title': f'News {n}',
+                  'published_at': f'2026-01-0{n + 1}T00:00:00Z'} for n in range(3)])
+    monkeypatch.setattr(app_module, 'content_db', db)
+    return app_module.app.test_client()
+
+
+def test_articles_cursor(client):
+    page = client.get('/api/articles?limit=2').get_json()
+    assert [a['title'] for a in page['articles']] == ['Article 2', 'Article 1']
+    page = client.get(f"/api/articles?limit=2&cursor={page['next_cursor']}").get_json()
+    assert [a['title'] for a in page['articles']] == ['Article 0']
+    assert page['next_cursor'] is None
+
+
+def test_news_cursor(client):
+    page = client.get('/api/news?limit=2').get_json()
+    assert [n['title'] for n in page['news']] == ['News 2', 'News 1']
+    page = client.get(f"/api/news?limit=2&cursor={page['next_cursor']}").get_json()
+    assert [n['title'] for n in page['news']] == ['News 0']
+
+
+@pytest.mark.parametrize('path', ['/api/articles?cursor=abc', '/api/articles?cursor=-1',
+                                  '/api/news?cursor=abc', '/api/news?cursor=2026|x'])
+def test_malformed_cursor_is_rejected(client, path):
+    response = client.get(path)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'invalid cursor'}
@@ -0,0 +1,91 @@
+"""
+Unit tests for the SQLite content store
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from content_db import ContentDB
+
+
+def news(n, source='CoinDesk'):
+    return {'url': f'https://example.com/{n}', 'source': source, 'title': f'News {n}',
+            'published_at': f'2026-01-{n:02d}T00:00:00Z'}
+
+
+def test_list_articles_pages_by_id(tmp_path):
+    db = ContentDB(str(tmp_path / 'content.db'))
+    article_ids = [db.add_article({'title': f'Article {n}'}) for n in range(5)]
+    page = db.list_articles(limit=2)
+    assert [a['id'] for a in page] == article_ids[:2:-1]
+    page = db.list_articles(limit=2, before_id=page[-1]['id'])
+    assert [a['id'] for a in page] == article_ids[2:0:-1]
+    assert db.latest_article()['title'] == 'Article 4'
+
+
+def test_list_news_pages_by_publish_time(tmp_path):
+    db = ContentDB(str(tmp_path / 'content.db'))
+    db.add_news([news(n) for n in range(1, 6)] + [news(9, source='Decrypt')])
+    page = db.list_news(limit=3)
+    assert [n['title'] for n in page] == ['News 9', 'News 5', 'News 4']
+    page = db.list_news(limit=3, before=(page[-1]['published_at'], page[-1]['id']))
+    assert [n['title'] for n in page] == ['News 3', 'News 2', 'News 1']
+    assert [n['title'] for n in db.list_news(source='Decrypt')] == ['News 9']
+
+
+def test_add_news_updates_same_url(tmp_path):
+    db = ContentDB(str(tmp_path / 'content.db'))
+    db.add_news([news(1)])
+    db.add_news([dict(news(1), title='Updated'), {'title': 'no url'}])
+    assert db.counts() == {'articles': 0, 'news': 1}
+    assert db.list_news()[0]['title'] == 'Updated'
+
+
+def test_home_document_follows_commits(tmp_path):
+    db = ContentDB(str(tmp_path / 'content.db'))
+    assert db.home_document() == {'featured_article': {}, 'news_articles': []}
+    db.add_article({'title': 'First', 'summary': 's'})
+    db.add_news([news(1)])
+    document = db.home_document()
+    assert document['featured_article']['title'] == 'First'
+    assert [n['title'] for n in document['news_articles']] == ['News 1']
+
+
+def test_migration_keeps_file_timestamp_and_runs_once(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps({
+        'featured_article': {'title': 'Old', 'summary': 's', 'content': 'c', 'image_url': None},
+        'news_articles': [news(1), news(2)],
+    }))
+    written = time.time() - 2 * 86400
+    os.utime(path, (written, written))
+    written_at = datetime.fromtimestamp(written, timezone.utc).isoformat(timespec='seconds')
+
+    db = ContentDB(str(tmp_path / 'content.db'))
+    assert db.migrate_from_json(str(path)) == 3
+    assert db.latest_article()['created_at'] == written_at
+    assert db.freshness() == {'article': written_at, 'news': written_at}
+    assert db.migrate_from_json(str(path)) is None
+    assert db.counts() == {'articles': 1, 'news': 2}
+
+
+def test_migration_without_file(tmp_path):
+    db = ContentDB(str(tmp_path / 'content.db'))
+    assert db.migrate_from_json(str(tmp_path / 'missing.json')) is None
+
+
+def test_failed_migration_is_retried(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps({'featured_article': {'title': 'Old'}, 'news_articles': [news(1), 42]}))
+    db = ContentDB(str(tmp_path / 'content.db'))
+    with pytest.raises(AttributeError):
+        db.migrate_from_json(str(path))
+    assert db.counts() == {'articles': 0, 'news': 0}
+
+    path.write_text(json.dumps({'featured_article': {'title': 'Old'}, 'news_articles': [news(1)]}))
+    assert db.migrate_from_json(str(path)) == 2
@@ -0,0 +1,139 @@
+"""
+Unit tests for budget charging and concurrency slots in the HTTP clients
+"""
+import asyncio
+import os
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+import pytest
+import requests
+
+import async_http
+import http_client
+from providers import ConcurrencyLimit, Provider, UpstreamBusy
+from rate_limit import RateBudget
+
+
+class OK(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), OK)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def closed_port_url():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def drained_budget(base_url, limit=10, period=60.0):
+    budget = RateBudget(base_url, limit, period=period, reserve=0)
+    budget.acquire(limit)
+    http_client.register_budget(base_url, budget)
+    return budget
+
+
+def test_budget_wait_does_not_hold_the_slot(server):
+    # Two tokens a second: the first call waits about half a second
+    drained_budget(server, limit=2, period=1.0)
+    limit = ConcurrencyLimit("test", 1, wait_timeout=0.1)
+    waiting = Provider("waiting", lambda: http_client.get(server).status_code, limit=limit)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(waiting()))
+    thread.start()
+    try:
+        # Takes the slot the budget wait gave up, instead of UpstreamBusy
+        assert Provider("other", lambda: "ok", limit=limit)() == "ok"
+    finally:
+        thread.join()
+    assert results == [200]
+    assert limit.stats()["in_flight"] == 0
+    assert limit.stats()["rejected"] == 0
+
+
+def test_slot_is_held_while_sending(server):
+    limit = ConcurrencyLimit("test", 1, wait_timeout=0.05)
+
+    def fetch():
+        with pytest.raises(UpstreamBusy):
+            Provider("other", lambda: "ok", limit=limit)()
+        return http_client.get(server).status_code
+
+    assert Provider("sending", fetch, limit=limit)() == 200
+
+
+def test_connect_retries_are_charged():
+    url = closed_port_url()
+    budget = RateBudget(url, 10, period=60)
+    http_client.register_budget(url, budget)
+    with pytest.raises(requests.ConnectionError):
+        http_client.get(url)
+    assert budget.stats()["spent"] == 1 + http_client.RETRIES
+
+
+def test_connect_retries_stop_without_budget():
+    url = closed_port_url()
+    budget = RateBudget(url, 1, period=3600)
+    http_client.register_budget(url, budget)
+    with pytest.raises(requests.ConnectionError):
+        http_client.get(url)
+    assert budget.stats()["spent"] == 1
+
+
+def test_async_connect_retries_are_charged():
+    url = closed_port_url()
+    budget = RateBudget(url, 10, period=60)
+    http_client.register_budget(url, budget)
+
+    async def main():
+        try:
+            with pytest.raises(httpx.ConnectError):
+                await async_http.get(url)
+        finally:
+            await async_http.aclose()
+
+    asyncio.run(main())
+    assert budget.stats()["spent"] == 1 + http_client.RETRIES
+
+
+def test_async_budget_wait_does_not_hold_the_slot(server):
+    drained_budget(server, limit=2, period=1.0)
+    limit = ConcurrencyLimit("test", 1, wait_timeout=0.1)
+
+    async def fetch():
+        return (await async_http.get(server)).status_code
+
+    async def other():
+        return "ok"
+
+    async def main():
+        try:
+            waiting = asyncio.ensure_future(Provider("waiting", None, limit=limit, afetch=fetch).acall())
+            await asyncio.sleep(0.05)
+            assert await Provider("other", None, limit=limit, afetch=other).acall() == "ok"
+            return await waiting
+        finally:
+            await async_http.aclose()
+
+    assert asyncio.run(main()) == 200
+    assert limit.stats()["rejected"] == 0
@@ -0,0 +1,123 @@
+"""
+Unit tests for the vectorized indicators and the incremental indicator engine
+"""
+import math
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+
+from indicators import INDICATORS, IndicatorEngine, parse_specs, public_outputs
+
+CASES = [
+    ('sma', (5,)), ('ema', (5,)), ('rsi', (5,)), ('macd', (3, 6, 4)),
+    ('bollinger', (5, 2.0)), ('atr', (5,)), ('vwap', (1,)),
+]
+
+
+def candles(count=200, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, count)))
+    spread = rng.uniform(0.1, 1.0, count)
+    return {
+        'time': np.arange(count, dtype=np.int64) * 3600 + 1_700_000_000,
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.uniform(1, 10, count),
+    }
+
+
+def window(columns, start=None, end=None):
+    return {field: values[start:end] for field, values in columns.items()}
+
+
+def fresh(name, params, columns):
+    return public_outputs(INDICATORS[name].compute(columns, params))
+
+
+def assert_same(expected, actual):
+    assert expected.keys() == actual.keys()
+    for output, values in expected.items():
+        np.testing.assert_allclose(actual[output], values, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def loop_ema(values, period, alpha):
+    out = [math.nan] * len(values)
+    if len(values) >= period:
+        out[period - 1] = sum(values[:period]) / period
+        for i in range(period, len(values)):
+            out[i] = alpha * values[i] + (1 - alpha) * out[i - 1]
+    return out
+
+
+def test_sma_and_ema_match_loops():
+    close = candles(30)['close']
+    sma = fresh('sma', (4,), {'close': close})['sma']
+    assert np.isnan(sma[:3]).all()
+    np.testing.assert_allclose(sma[3:], [close[i - 3:i + 1].mean() for i in range(3, 30)])
+    ema = fresh('ema', (4,), {'close': close})['ema']
+    np.testing.assert_allclose(ema, loop_ema(close.tolist(), 4, 0.4), equal_nan=True)
+
+
+def test_rsi_is_100_without_losses():
+    rsi = fresh('rsi', (3,), {'close': np.arange(1.0, 11.0)})['rsi']
+    assert np.isnan(rsi[:3]).all()
+    assert (rsi[3:] == 100.0).all()
+
+
+def test_vwap_resets_each_session():
+    columns = {'time': np.array([0, 3600, 86400, 90000]), 'high': np.array([2.0, 4.0, 6.0, 8.0]),
+               'low': np.array([2.0, 4.0, 6.0, 8.0]), 'close': np.array([2.0, 4.0, 6.0, 8.0]),
+               'volume': np.array([1.0, 3.0, 1.0, 1.0])}
+    np.testing.assert_allclose(fresh('vwap', (1,), columns)['vwap'], [2.0, 3.5, 6.0, 7.0])
+
+
+@pytest.mark.parametrize('name, params', CASES)
+def test_incremental_matches_fresh(name, params):
+    columns = candles()
+    engine = IndicatorEngine()
+    engine.compute(('BTC', '1h'), name, params, window(columns, end=150))
+    # The last candle was still open when it was cached
+    moved = window(columns)
+    moved['close'] = moved['close'].copy()
+    moved['close'][149] *= 1.01
+    assert_same(fresh(name, params, moved), engine.compute(('BTC', '1h'), name, params, moved))
+    assert engine.stats()['incremental'] == 1
+
+
+@pytest.mark.parametrize('name, params', CASES)
+def test_window_does_not_depend_on_cache(name, params):
+    columns = candles()
+    engine = IndicatorEngine()
+    engine.compute(('BTC', '1h'), name, params, columns)
+    for start, end in ((120, None), (0, 50), (120, 180)):
+        part = window(columns, start, end)
+        assert_same(fresh(name, params, part), engine.compute(('BTC', '1h'), name, params, part))
+
+
+def test_shorter_window_keeps_its_own_warm_up():
+    columns = candles()
+    engine = IndicatorEngine()
+    engine.compute(('BTC', '1h'), 'ema', (20,), columns)
+    ema = engine.compute(('BTC', '1h'), 'ema', (20,), window(columns, 150))['ema']
+    assert np.isnan(ema[:19]).all() and np.isfinite(ema[19:]).all()
+
+
+def test_windows_are_cached_separately():
+    columns = candles()
+    engine = IndicatorEngine(max_entries=1)
+    engine.compute(('BTC', '1h'), 'sma', (5,), columns)
+    engine.compute(('BTC', '1h'), 'sma', (5,), window(columns, 10))
+    engine.compute(('BTC', '1h'), 'sma', (5,), window(columns, 10))
+    assert engine.stats() == {'entries': 1, 'max_entries': 1, 'full': 2, 'incremental': 1, 'unchanged': 0}
+
+
+def test_parse_specs():
+    assert parse_specs('SMA:10, macd') == [('sma:10', 'sma', (10,)), ('macd:12:26:9', 'macd', (12, 26, 9))]
+    assert parse_specs('bollinger:20:2.5') == [('bollinger:20:2.5', 'bollinger', (20, 2.5))]
+    for text in ('', 'foo', 'sma:10:2', 'sma:x', 'sma:0', 'rsi:5000', ','.join(['sma'] * 11)):
+        with pytest.raises(ValueError):
+            parse_specs(text)
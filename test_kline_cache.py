@@ -0,0 +1,124 @@
+"""
+Unit tests for the size-bounded kline cache and its single-flight loads
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+
+from kline_cache import KlineCache
+
+
+def value(size=100):
+    return np.zeros(size, dtype=np.uint8)
+
+
+def test_hit_after_load():
+    cache = KlineCache()
+    loaded = value()
+    assert cache.get_or_load("k", lambda: (loaded, 60)) is loaded
+    assert cache.get_or_load("k", lambda: pytest.fail("reloaded")) is loaded
+    assert cache.peek("k") is loaded
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_expired_entry_is_reloaded():
+    cache = KlineCache()
+    cache.get_or_load("k", lambda: (value(), 0))
+    assert cache.peek("k") is None
+    reloaded = value()
+    assert cache.get_or_load("k", lambda: (reloaded, 60)) is reloaded
+
+
+def test_concurrent_misses_share_one_load():
+    cache = KlineCache()
+    calls = []
+    start = threading.Barrier(5)
+    results = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return value(), 60
+
+    def get():
+        start.wait()
+        results.append(cache.get_or_load("k", loader))
+
+    threads = [threading.Thread(target=get) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_load_error_reaches_waiters_and_is_not_cached():
+    cache = KlineCache()
+    entered = threading.Event()
+    errors = []
+
+    def loader():
+        entered.set()
+        time.sleep(0.05)
+        raise ConnectionError("down")
+
+    def waiter():
+        entered.wait()
+        try:
+            cache.get_or_load("k", lambda: pytest.fail("second load"))
+        except ConnectionError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    with pytest.raises(ConnectionError):
+        cache.get_or_load("k", loader)
+    thread.join()
+    assert len(errors) == 1
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_evicts_least_recently_used_over_max_bytes():
+    cache = KlineCache(max_bytes=250)
+    cache.get_or_load("a", lambda: (value(), 60))
+    cache.get_or_load("b", lambda: (value(), 60))
+    cache.peek("a")
+    cache.get_or_load("c", lambda: (value(), 60))
+    assert cache.peek("b") is None
+    assert cache.peek("a") is not None
+    stats = cache.stats()
+    assert (stats["bytes"], stats["evictions"]) == (200, 1)
+
+
+def test_oversized_value_is_returned_but_not_cached():
+    cache = KlineCache(max_bytes=50)
+    big = value(100)
+    assert cache.get_or_load("k", lambda: (big, 60)) is big
+    assert cache.stats()["entries"] == 0
+
+
+def test_async_callers_share_one_load():
+    cache = KlineCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return value(), 60
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_load("k", loader) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
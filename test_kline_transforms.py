@@ -0,0 +1,79 @@
+"""
+Unit tests for candle resampling and LTTB downsampling
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from kline_transforms import (bucket_start, downsample, finer_intervals, lttb_indices, parse_duration,
+                              records_to_columns, resample)
+
+# Monday 2024-01-01 00:00 UTC
+MONDAY = 1704067200
+
+
+def test_parse_duration():
+    assert parse_duration('90m') == 5400
+    assert parse_duration('1y') == 365 * 86400
+    assert parse_duration('0d') is None
+    assert parse_duration('7 days') is None
+    assert parse_duration(None) is None
+
+
+def test_finer_intervals():
+    assert finer_intervals('1h') == ['30m', '15m', '5m', '1m']
+    assert finer_intervals('1m') == []
+
+
+def test_weekly_buckets_start_on_monday():
+    times = np.array([MONDAY, MONDAY + 6 * 86400 + 3600, MONDAY + 7 * 86400])
+    assert bucket_start(times, '1w').tolist() == [MONDAY, MONDAY, MONDAY + 7 * 86400]
+
+
+def test_resample_aggregates_ohlcv():
+    columns = {
+        'time': np.arange(8) * 900 + MONDAY,
+        'open': np.arange(8, dtype=float),
+        'high': np.arange(8, dtype=float) + 10,
+        'low': np.arange(8, dtype=float) - 10,
+        'close': np.arange(8, dtype=float) + 0.5,
+        'volume': np.ones(8),
+    }
+    hourly = resample(columns, '1h')
+    assert hourly['time'].tolist() == [MONDAY, MONDAY + 3600]
+    assert hourly['open'].tolist() == [0, 4]
+    assert hourly['high'].tolist() == [13, 17]
+    assert hourly['low'].tolist() == [-10, -6]
+    assert hourly['close'].tolist() == [3.5, 7.5]
+    assert hourly['volume'].tolist() == [4, 4]
+
+
+def test_resample_empty():
+    empty = records_to_columns([])
+    assert len(resample(empty, '1h')['time']) == 0
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    y = np.zeros(1000)
+    y[437] = 100
+    keep = lttb_indices(np.arange(1000), y, 50)
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    assert 437 in keep
+
+
+def test_lttb_below_threshold_keeps_everything():
+    assert lttb_indices(np.arange(10), np.arange(10), 20).tolist() == list(range(10))
+
+
+def test_downsample_selects_whole_candles():
+    records = [{'time': t, 'open': t, 'high': t, 'low': t, 'close': float(t % 7)} for t in range(200)]
+    columns = records_to_columns(records)
+    assert downsample(columns, None) is columns
+    assert downsample(columns, 500) is columns
+    small = downsample(columns, 20)
+    assert len(small['time']) == 20
+    assert small['open'].tolist() == small['time'].tolist()
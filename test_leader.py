@@ -0,0 +1,65 @@
+"""
+Unit tests for scheduler leader election
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import leader
+from leader import LeaderElection
+
+pytestmark = pytest.mark.skipif(leader.fcntl is None, reason="needs flock")
+
+
+def election(path, elected, followed=None):
+    return LeaderElection(str(path), elected.set, on_follow=followed, interval=0.05)
+
+
+def test_one_leader_per_lock_file(tmp_path):
+    path = tmp_path / 'scheduler.lock'
+    first_elected, second_elected = threading.Event(), threading.Event()
+    follows = []
+    first = election(path, first_elected)
+    second = election(path, second_elected, lambda: follows.append(1))
+    first.start()
+    first.start()
+    second.start()
+
+    assert first.is_leader and first_elected.is_set()
+    assert not second_elected.wait(0.2)
+    assert follows
+    assert second.stats()['leader_pid'] == os.getpid()
+
+    # Closing the file drops the lock, as the OS does when the leader exits
+    first._lock_file.close()
+    assert second_elected.wait(2)
+    assert second.is_leader
+
+
+def test_follower_takes_over_from_killed_process(tmp_path):
+    path = tmp_path / 'scheduler.lock'
+    holder = subprocess.Popen(
+        [sys.executable, '-c', 'import fcntl, sys, time\n'
+         'f = open(sys.argv[1], "a+")\n'
+         'fcntl.flock(f, fcntl.LOCK_EX)\n'
+         'print("locked", flush=True)\n'
+         'time.sleep(60)\n', str(path)],
+        stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == 'locked'
+        elected = threading.Event()
+        follower = election(path, elected)
+        follower.start()
+        assert not follower.is_leader
+        holder.kill()
+        holder.wait()
+        assert elected.wait(2)
+        assert follower.stats()['leader_pid'] == os.getpid()
+    finally:
+        holder.kill()
+        holder.wait()
@@ -0,0 +1,84 @@
+"""
+Unit tests for the market snapshot broadcaster
+"""
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from market_stream import MarketBroadcaster, StreamLimitReached, format_sse
+
+
+def row(symbol, price):
+    return {'symbol': symbol, 'price': price}
+
+
+def test_publish_queues_only_changes():
+    broadcaster = MarketBroadcaster()
+    broadcaster.publish([row('BTC', 1), row('ETH', 2)])
+    subscription, snapshot, version = broadcaster.subscribe()
+    assert snapshot == [row('BTC', 1), row('ETH', 2)] and version == 1
+
+    broadcaster.publish([row('BTC', 1), row('ETH', 2)])
+    broadcaster.publish([row('BTC', 3), row('SOL', 4)])
+    assert subscription.queue.get_nowait() == (2, {'changed': [row('BTC', 3), row('SOL', 4)], 'removed': ['ETH']})
+    assert subscription.queue.empty()
+
+
+def test_slow_consumer_is_dropped():
+    broadcaster = MarketBroadcaster(queue_size=2)
+    slow, _, _ = broadcaster.subscribe()
+    for price in range(3):
+        broadcaster.publish([row('BTC', price)])
+    assert slow.dropped
+    assert broadcaster.stats()['subscribers'] == 0
+    assert broadcaster.stats()['dropped_clients'] == 1
+
+
+def test_threaded_subscribers_are_capped():
+    broadcaster = MarketBroadcaster(max_threaded=2)
+    first, _, _ = broadcaster.subscribe()
+    broadcaster.subscribe()
+    with pytest.raises(StreamLimitReached):
+        broadcaster.subscribe()
+    assert broadcaster.stats()['rejected_clients'] == 1
+
+    broadcaster.unsubscribe(first)
+    broadcaster.unsubscribe(first)
+    broadcaster.subscribe()
+    assert broadcaster.stats()['threaded_subscribers'] == 2
+
+
+def test_dropped_subscribers_free_their_slot():
+    broadcaster = MarketBroadcaster(queue_size=1, max_threaded=1)
+    broadcaster.subscribe()
+    broadcaster.publish([row('BTC', 1)])
+    broadcaster.publish([row('BTC', 2)])
+    broadcaster.subscribe()
+
+
+def test_async_subscribers_are_not_capped():
+    async def main():
+        broadcaster = MarketBroadcaster(queue_size=1, max_threaded=0)
+        loop = asyncio.get_running_loop()
+        fast, _, _ = broadcaster.subscribe(loop)
+        slow, _, _ = broadcaster.subscribe(loop)
+        broadcaster.publish([row('BTC', 1)])
+        assert await fast.get(1) == (1, {'changed': [row('BTC', 1)], 'removed': []})
+
+        broadcaster.publish([row('BTC', 2)])
+        assert await fast.get(1) == (2, {'changed': [row('BTC', 2)], 'removed': []})
+        assert slow.dropped
+        assert await slow.get(1) == (1, {'changed': [row('BTC', 1)], 'removed': []})
+        assert await slow.get(1) is None
+        with pytest.raises(asyncio.TimeoutError):
+            await fast.get(0.01)
+
+    asyncio.run(main())
+
+
+def test_format_sse():
+    assert format_sse('delta', {'a': [1]}, 7) == 'id: 7\nevent: delta\ndata: {"a":[1]}\n\n'
+    assert format_sse('ping', None) == 'event: ping\ndata: null\n\n'
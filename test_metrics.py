@@ -0,0 +1,111 @@
+"""
+Unit tests for the metrics registry and Prometheus rendering
+"""
+import json
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from metrics import Registry, SharedMetrics, family, merge, render
+
+
+def samples(families, name):
+    for fam in families:
+        for sample, labels, value in fam["samples"]:
+            if sample == name:
+                yield dict(labels), value
+
+
+def test_counter_sums_threads_including_exited_ones():
+    registry = Registry()
+    requests = registry.counter('requests_total', 'Requests', ['route'])
+    series = requests.labels('/api/market')
+
+    def record():
+        for _ in range(1000):
+            series.inc()
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    series.inc(5)
+    assert list(samples(registry.collect(), 'requests_total')) == [({'route': '/api/market'}, 4005)]
+    # Retired arrays are counted once
+    assert list(samples(registry.collect(), 'requests_total')) == [({'route': '/api/market'}, 4005)]
+
+
+def test_labels_must_match():
+    counter = Registry().counter('errors_total', 'Errors', ['provider'])
+    assert counter.labels('binance') is counter.labels('binance')
+    with pytest.raises(ValueError):
+        counter.labels('binance', 'extra')
+
+
+def test_histogram_rendering():
+    registry = Registry()
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.labels().observe(value)
+    text = render(registry.collect())
+    assert text == (
+        '# HELP latency_seconds Latency\n'
+        '# TYPE latency_seconds histogram\n'
+        'latency_seconds_bucket{le="0.1"} 2\n'
+        'latency_seconds_bucket{le="1"} 3\n'
+        'latency_seconds_bucket{le="+Inf"} 4\n'
+        'latency_seconds_sum 3.65\n'
+        'latency_seconds_count 4\n'
+    )
+
+
+def test_collectors():
+    registry = Registry()
+    registry.add_collector(lambda: [family('cache_entries', 'gauge', 'Entries "now"',
+                                           [({'cache': 'kline\n'}, 3), ({'cache': 'news'}, None)])])
+
+    def broken():
+        raise RuntimeError("boom")
+    registry.add_collector(broken)
+    assert render(registry.collect()) == (
+        '# HELP cache_entries Entries "now"\n'
+        '# TYPE cache_entries gauge\n'
+        'cache_entries{cache="kline\\n"} 3\n'
+    )
+
+
+def test_merge_sums_counters_and_keeps_gauges_per_worker():
+    def families(count, entries):
+        return [family('hits_total', 'counter', 'Hits', [({'cache': 'kline'}, count)]),
+                family('entries', 'gauge', 'Entries', [({}, entries)])]
+
+    merged = merge({1: families(2, 10), 2: families(3, 20)})
+    assert list(samples(merged, 'hits_total')) == [({'cache': 'kline'}, 5)]
+    assert list(samples(merged, 'entries')) == [({'worker': '1'}, 10), ({'worker': '2'}, 20)]
+
+
+def test_shared_metrics_merges_other_workers(tmp_path):
+    registry = Registry()
+    registry.counter('requests_total', 'Requests').labels().inc(2)
+    registry.add_collector(lambda: [family('entries', 'gauge', 'Entries', [({}, 1)])])
+    shared = SharedMetrics(registry, str(tmp_path), interval=5.0)
+    shared.publish()
+
+    def worker(pid, at):
+        (tmp_path / f'metrics-{pid}.json').write_text(json.dumps({'pid': pid, 'at': at, 'families': [
+            family('requests_total', 'counter', 'Requests', [({}, 3)]),
+            family('entries', 'gauge', 'Entries', [({}, 7)]),
+        ]}))
+    worker(101, time.time())
+    # Exited long ago: its counts stay, its gauges go
+    worker(102, time.time() - 60)
+    (tmp_path / 'metrics-103.json').write_text('{')
+
+    merged = shared.collect()
+    assert list(samples(merged, 'requests_total')) == [({}, 8)]
+    assert sorted(labels['worker'] for labels, _ in samples(merged, 'entries')) == sorted([str(os.getpid()), '101'])
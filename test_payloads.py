@@ -0,0 +1,70 @@
+"""
+Unit tests for pre-serialized JSON payloads
+"""
+import gzip
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, request
+
+from payloads import EncodedPayload, SerializedPayload, join_json_object
+
+app = Flask(__name__)
+
+
+def respond(payload, **headers):
+    with app.test_request_context('/', headers=headers):
+        return payload.make_response(request)
+
+
+def test_identity_when_gzip_not_accepted():
+    payload = SerializedPayload({'price': 1.5})
+    response = respond(payload)
+    assert response.status_code == 200
+    assert response.get_data() == b'{"price":1.5}'
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+
+def test_gzip_negotiation():
+    payload = SerializedPayload({'price': 1.5})
+    response = respond(payload, **{'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.get_data())) == {'price': 1.5}
+    assert response.headers['ETag'] != respond(payload).headers['ETag']
+    assert 'Content-Encoding' not in respond(payload, **{'Accept-Encoding': 'gzip;q=0'}).headers
+
+
+def test_brotli_is_preferred_when_available():
+    payload = EncodedPayload({None: (b'{}', '"a"'), 'gzip': (b'gz', '"a-gzip"'), 'br': (b'br', '"a-br"')})
+    response = respond(payload, **{'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.get_data() == b'br'
+
+
+def test_etag_revalidation():
+    payload = SerializedPayload([1, 2, 3])
+    etag = respond(payload).headers['ETag']
+    response = respond(payload, **{'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+
+    # Any variant's tag matches, since they share one body
+    gzip_etag = respond(payload, **{'Accept-Encoding': 'gzip'}).headers['ETag']
+    assert respond(payload, **{'If-None-Match': gzip_etag}).status_code == 304
+    assert respond(payload, **{'If-None-Match': '"other"'}).status_code == 200
+    assert respond(SerializedPayload([1, 2]), **{'If-None-Match': etag}).status_code == 200
+
+
+def test_memoryview_bodies_are_served():
+    payload = EncodedPayload({None: (memoryview(b'[1]'), '"m"')})
+    assert respond(payload).get_data() == b'[1]'
+    assert payload.nbytes == 3
+
+
+def test_join_json_object():
+    body = join_json_object([('a', b'[1]'), ('b"', b'{}')])
+    assert json.loads(body) == {'a': [1], 'b"': {}}
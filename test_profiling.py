@@ -0,0 +1,53 @@
+"""
+Unit tests for on-demand request profiling
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from profiling import RequestProfiler
+
+
+def hello(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'hello']
+
+
+def call(profiler, **headers):
+    environ = {'PATH_INFO': '/api/test', 'QUERY_STRING': ''}
+    environ.update({'HTTP_' + name.upper(): value for name, value in headers.items()})
+    captured = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        captured.update(response_headers)
+
+    body = b''.join(profiler(environ, start_response))
+    return body, captured
+
+
+def test_profiles_only_with_the_token(tmp_path):
+    profiler = RequestProfiler(hello, str(tmp_path), 'secret')
+
+    body, headers = call(profiler, x_profile='1')
+    assert body == b'hello' and 'X-Profile-File' not in headers
+    body, headers = call(profiler, x_profile='1', x_profile_token='wrong')
+    assert 'X-Profile-File' not in headers
+    assert os.listdir(tmp_path) == []
+
+    body, headers = call(profiler, x_profile='1', x_profile_token='secret')
+    assert body == b'hello'
+    assert os.listdir(tmp_path) == [headers['X-Profile-File']]
+
+
+def test_report_replaces_the_response(tmp_path):
+    profiler = RequestProfiler(hello, str(tmp_path), 'secret')
+    body, headers = call(profiler, x_profile='report', x_profile_token='secret')
+    assert headers['Content-Type'].startswith('text/plain')
+    assert b'cumulative' in body
+
+
+def test_token_is_required():
+    with pytest.raises(ValueError):
+        RequestProfiler(hello, 'profiles', '')
@@ -0,0 +1,127 @@
+"""
+Unit tests for hedged provider racing and upstream concurrency limits
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from providers import AllProvidersFailed, ConcurrencyLimit, Provider, UpstreamBusy, arace, race
+
+
+def returns(value, delay=0):
+    def fetch(*args):
+        time.sleep(delay)
+        return value
+    return fetch
+
+
+def fails(error):
+    def fetch(*args):
+        raise error
+    return fetch
+
+
+def test_fast_primary_wins_without_hedging():
+    started = []
+    backup = Provider("backup", lambda: started.append("backup") or "b")
+    assert race([Provider("primary", returns("a")), backup], hedge_delay=1.0) == ("a", "primary")
+    assert started == []
+
+
+def test_slow_primary_is_hedged():
+    providers = [Provider("slow", returns("a", delay=0.5)), Provider("fast", returns("b"))]
+    started = time.monotonic()
+    assert race(providers, hedge_delay=0.05) == ("b", "fast")
+    assert time.monotonic() - started < 0.4
+
+
+def test_failure_starts_next_provider_immediately():
+    providers = [Provider("broken", fails(ConnectionError("down"))), Provider("backup", returns("b"))]
+    started = time.monotonic()
+    assert race(providers, hedge_delay=10) == ("b", "backup")
+    assert time.monotonic() - started < 1
+
+
+def test_empty_result_counts_as_failure():
+    providers = [Provider("empty", returns([])), Provider("backup", returns([1]))]
+    assert race(providers, hedge_delay=10) == ([1], "backup")
+
+
+def test_all_failed_reports_every_provider():
+    providers = [Provider("a", fails(ConnectionError("down"))), Provider("b", fails(ValueError("bad")))]
+    with pytest.raises(AllProvidersFailed) as failed:
+        race(providers, hedge_delay=0)
+    assert set(failed.value.errors) == {"a", "b"}
+    assert isinstance(failed.value.errors["a"], ConnectionError)
+
+
+def test_timeout_gives_up_on_slow_providers():
+    with pytest.raises(AllProvidersFailed) as failed:
+        race([Provider("slow", returns("a", delay=0.5))], timeout=0.05)
+    assert isinstance(failed.value.errors["slow"], TimeoutError)
+
+
+def test_open_breaker_moves_on_without_calling_upstream():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    with pytest.raises(ConnectionError):
+        breaker.call(fails(ConnectionError()))
+    calls = []
+    guarded = Provider("guarded", lambda: calls.append(1) or "a", breaker=breaker)
+    assert race([guarded, Provider("backup", returns("b"))], hedge_delay=10) == ("b", "backup")
+    assert calls == []
+
+
+def test_arguments_are_passed_to_providers():
+    provider = Provider("echo", lambda symbol, interval: f"{symbol}/{interval}")
+    assert race([provider], "BTC", "1h") == ("BTC/1h", "echo")
+
+
+def test_async_race_hedges_and_falls_back():
+    async def slow():
+        await asyncio.sleep(0.5)
+        return "a"
+
+    async def fast():
+        return "b"
+
+    async def broken():
+        raise ConnectionError("down")
+
+    providers = [Provider("slow", None, afetch=slow), Provider("fast", None, afetch=fast)]
+    assert asyncio.run(arace(providers, hedge_delay=0.05)) == ("b", "fast")
+
+    providers = [Provider("broken", None, afetch=broken), Provider("sync", returns("c"))]
+    assert asyncio.run(arace(providers, hedge_delay=10)) == ("c", "sync")
+
+
+def test_concurrency_limit_rejects_when_full():
+    limit = ConcurrencyLimit("test", 1, wait_timeout=0.01)
+    inside = threading.Event()
+    release = threading.Event()
+    holder = Provider("holder", lambda: inside.set() or release.wait() and "a", limit=limit)
+    thread = threading.Thread(target=holder)
+    thread.start()
+    inside.wait()
+    try:
+        with pytest.raises(UpstreamBusy):
+            Provider("second", returns("b"), limit=limit)()
+        assert limit.stats()["rejected"] == 1
+    finally:
+        release.set()
+        thread.join()
+    assert limit.stats()["in_flight"] == 0
+
+
+def test_open_breaker_error_is_reported():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    with pytest.raises(ConnectionError):
+        breaker.call(fails(ConnectionError()))
+    with pytest.raises(AllProvidersFailed) as failed:
+        race([Provider("guarded", returns("a"), breaker=breaker)])
+    assert isinstance(failed.value.errors["guarded"], CircuitOpenError)
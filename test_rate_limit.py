@@ -0,0 +1,88 @@
+"""
+Unit tests for the per-upstream request budgets
+"""
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from rate_limit import BACKGROUND, INTERACTIVE, RateBudget, RateLimited, background, current_priority
+
+
+def response(status=200, **headers):
+    return SimpleNamespace(status_code=status, headers=headers)
+
+
+def test_acquire_until_exhausted():
+    budget = RateBudget("test", 5, period=60)
+    budget.acquire(3)
+    budget.acquire(2)
+    with pytest.raises(RateLimited):
+        budget.acquire(1, timeout=0)
+    stats = budget.stats()
+    assert stats["spent"] == 5
+    assert stats["rejected"]["interactive"] == 1
+
+
+def test_waits_for_refill():
+    budget = RateBudget("test", 10, period=1)
+    budget.acquire(10)
+    started = time.monotonic()
+    budget.acquire(1, timeout=1)
+    assert 0.05 < time.monotonic() - started < 0.5
+
+
+def test_background_keeps_out_of_reserve():
+    budget = RateBudget("test", 10, period=60, reserve=0.2)
+    budget.acquire(8, level=BACKGROUND)
+    with pytest.raises(RateLimited):
+        budget.acquire(1, level=BACKGROUND, timeout=0)
+    budget.acquire(2, level=INTERACTIVE, timeout=0)
+
+
+def test_interactive_waiters_go_first():
+    budget = RateBudget("test", 10, period=1, reserve=0)
+    budget.acquire(10)
+    served = []
+
+    def wait(level):
+        budget.acquire(1, level=level, timeout=2)
+        served.append(level)
+
+    waiters = [threading.Thread(target=wait, args=(BACKGROUND,))]
+    waiters[0].start()
+    time.sleep(0.02)
+    waiters.append(threading.Thread(target=wait, args=(INTERACTIVE,)))
+    waiters[1].start()
+    for thread in waiters:
+        thread.join()
+    assert served == [INTERACTIVE, BACKGROUND]
+
+
+def test_background_decorator_sets_priority():
+    assert current_priority() == INTERACTIVE
+    assert background(current_priority)() == BACKGROUND
+    assert current_priority() == INTERACTIVE
+
+
+def test_throttled_response_pauses_upstream():
+    budget = RateBudget("test", 100, period=60)
+    budget.observe(response(429, **{'Retry-After': '30'}))
+    with pytest.raises(RateLimited):
+        budget.acquire(1, timeout=1)
+    stats = budget.stats()
+    assert stats["throttled_responses"] == 1
+    assert stats["blocked_for"] > 29
+
+
+def test_used_weight_header_caps_tokens():
+    budget = RateBudget("test", 100, period=60, used_weight_header='X-MBX-USED-WEIGHT-1M')
+    budget.observe(response(200, **{'X-MBX-USED-WEIGHT-1M': '95'}))
+    assert budget.stats()["tokens"] <= 5
+    assert budget.stats()["last_used_weight"] == 95
+    with pytest.raises(RateLimited):
+        budget.acquire(10, timeout=0)
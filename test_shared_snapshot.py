@@ -0,0 +1,73 @@
+"""
+Unit tests for the memory-mapped market snapshot file
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, request
+
+from payloads import SerializedPayload
+from shared_snapshot import SnapshotReader, publish, read_version
+
+SNAPSHOT = [{'symbol': 'BTCUSDT', 'price': 65000.5}, {'symbol': 'ETHUSDT', 'price': 3200.25}]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'market_snapshot.bin')
+    payload = SerializedPayload(SNAPSHOT)
+    assert publish(path, payload, 'binance', 1700000000.5) == 1
+    assert read_version(path) == 1
+
+    mapped = SnapshotReader(path).poll()
+    assert mapped.version == 1
+    assert mapped.fetched_at == 1700000000.5
+    assert mapped.source == 'binance'
+    assert mapped.data == SNAPSHOT
+    assert {encoding: (bytes(body), etag) for encoding, (body, etag) in mapped.variants.items()} == payload.variants
+    assert mapped.nbytes == payload.nbytes
+
+
+def test_mapped_payload_is_served(tmp_path):
+    path = str(tmp_path / 'market_snapshot.bin')
+    payload = SerializedPayload(SNAPSHOT)
+    publish(path, payload, 'binance', 0.0)
+    mapped = SnapshotReader(path).poll()
+    with Flask(__name__).test_request_context('/', headers={'Accept-Encoding': 'gzip'}):
+        response = mapped.make_response(request)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.get_data() == payload.variants['gzip'][0]
+
+
+def test_reader_maps_each_version_once(tmp_path):
+    path = str(tmp_path / 'market_snapshot.bin')
+    reader = SnapshotReader(path)
+    assert reader.poll() is None
+
+    publish(path, SerializedPayload(SNAPSHOT), 'binance', 1.0)
+    first = reader.poll()
+    assert reader.poll() is None
+
+    publish(path, SerializedPayload(SNAPSHOT[:1]), 'coingecko', 2.0)
+    second = reader.poll()
+    assert second.version == 2 and second.data == SNAPSHOT[:1]
+    # The replaced version stays readable for responses still using it
+    assert first.data == SNAPSHOT
+    assert reader.stats()['swaps'] == 2
+
+
+def test_unreadable_file_is_ignored(tmp_path):
+    path = tmp_path / 'market_snapshot.bin'
+    path.write_bytes(b'not a snapshot file at all')
+    reader = SnapshotReader(str(path))
+    assert reader.poll() is None
+    assert reader.stats()['last_error']
+    assert read_version(str(path)) == 0
+
+    publish(str(path), SerializedPayload(SNAPSHOT), 'binance', 1.0)
+    data = path.read_bytes()
+    path.write_bytes(data[:-10])
+    assert reader.poll() is None
+    assert 'truncated' in reader.stats()['last_error']
+    os.remove(path)
+    assert reader.poll() is None
@@ -0,0 +1,57 @@
+"""
+Unit tests for the columnar Binance ticker table
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from tickers import TickerTable
+
+
+def ticker(symbol, change, volume):
+    return {'symbol': symbol, 'priceChangePercent': str(change), 'quoteVolume': str(volume),
+            'lastPrice': '1.0'}
+
+
+PAYLOAD = [
+    ticker('BTCUSDT', 2.5, 900),
+    ticker('ETHBTC', 9.0, 5000),
+    ticker('ETHUSDT', -1.0, 700),
+    ticker('USDTTRY', 0.1, 10000),
+    ticker('SOLUSDT', 7.5, 300),
+    ticker('DOGEUSDT', 7.5, 50),
+]
+
+
+def test_filter_quote_matches_suffix_only():
+    usdt = TickerTable.from_payload(PAYLOAD).filter_quote('USDT')
+    assert usdt.symbols() == ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'DOGEUSDT']
+    assert usdt['quoteVolume'].tolist() == [900, 700, 300, 50]
+    assert usdt.records()[0] is PAYLOAD[0]
+
+
+def test_top_k_orders_and_keeps_ties_stable():
+    usdt = TickerTable.from_payload(PAYLOAD).filter_quote('USDT')
+    assert usdt.top_k('quoteVolume', 2).symbols() == ['BTCUSDT', 'ETHUSDT']
+    assert usdt.top_k('priceChangePercent', 3).symbols() == ['SOLUSDT', 'DOGEUSDT', 'BTCUSDT']
+    assert usdt.top_k('priceChangePercent', 1, descending=False).symbols() == ['ETHUSDT']
+    assert usdt.top_k('quoteVolume', 10).base_assets('USDT') == ['BTC', 'ETH', 'SOL', 'DOGE']
+    assert len(usdt.top_k('quoteVolume', 0)) == 0
+
+
+def test_matches_python_sort():
+    table = TickerTable.from_payload(PAYLOAD)
+    expected = sorted((t for t in PAYLOAD if t['symbol'].endswith('USDT')),
+                      key=lambda t: float(t['quoteVolume']), reverse=True)
+    assert table.filter_quote('USDT').top_k('quoteVolume', 100).records() == expected
+
+
+def test_rank():
+    table = TickerTable.from_payload(PAYLOAD)
+    assert table.rank('quoteVolume').tolist() == [3, 2, 4, 1, 5, 6]
+
+
+def test_empty_payload():
+    usdt = TickerTable.from_payload([]).filter_quote('USDT')
+    assert len(usdt) == 0
+    assert usdt.top_k('quoteVolume', 100).records() == []
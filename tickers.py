@@ -0,0 +1,102 @@
+"""
+Columnar view of Binance /ticker/24hr payloads.
+
+A payload is converted once, when its table is built: symbols become one
+string array and each numeric field the app ranks by becomes a float64
+column. The app builds one table per fetched payload and shares it between
+callers, so that conversion is paid once per fetch rather than per query.
+
+Queries are then NumPy array operations: the quote-asset filter is a single
+vectorized suffix match over the symbol array, and top-k selection and
+rankings use argpartition/argsort instead of Python sorts with a `float()`
+key. The original row dicts are kept in an object array, so subsets are
+taken by index and returned unchanged.
+"""
+from operator import itemgetter
+
+import numpy as np
+
+# Numeric fields converted when a table is built
+NUMERIC_FIELDS = ('priceChangePercent', 'quoteVolume')
+
+
+def _object_array(items):
+    array = np.empty(len(items), dtype=object)
+    array[:] = items
+    return array
+
+
+class TickerTable:
+    """Ticker rows with a symbol array and typed numeric columns."""
+
+    def __init__(self, rows, symbols, columns):
+        self.rows = rows
+        self.symbols_array = symbols
+        self._columns = columns
+
+    @classmethod
+    def from_payload(cls, payload, fields=NUMERIC_FIELDS):
+        """Builds a table from ticker dicts, converting `fields` to float64."""
+        symbols = np.array(list(map(itemgetter('symbol'), payload)), dtype=str)
+        columns = {
+            field: np.fromiter(map(float, map(itemgetter(field), payload)), np.float64, len(payload))
+            for field in fields
+        }
+        return cls(_object_array(payload), symbols, columns)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def column(self, field):
+        """The float64 column for `field`, one of the fields the table was
+        built with."""
+        return self._columns[field]
+
+    __getitem__ = column
+
+    def take(self, positions):
+        """Returns the rows at `positions` (an index or boolean array)."""
+        return TickerTable(
+            self.rows[positions],
+            self.symbols_array[positions],
+            {field: values[positions] for field, values in self._columns.items()},
+        )
+
+    def filter_quote(self, quote='USDT'):
+        """Keeps pairs quoted in `quote`, e.g. BTCUSDT for 'USDT'."""
+        return self.take(np.char.endswith(self.symbols_array, quote))
+
+    def top_k(self, field, k, descending=True):
+        """Returns the `k` rows with the largest (or smallest) `field`, in order."""
+        values = self.column(field)
+        keys = -values if descending else values
+        if k <= 0:
+            order = np.arange(0)
+        elif k < len(keys):
+            # Everything up to the k-th key, so ties keep payload order as
+            # in a stable sort
+            kth = np.partition(keys, k - 1)[k - 1]
+            candidates = np.flatnonzero(keys <= kth)
+            order = candidates[np.argsort(keys[candidates], kind='stable')][:k]
+        else:
+            order = np.argsort(keys, kind='stable')
+        return self.take(order)
+
+    def rank(self, field, descending=True):
+        """1-based rank of every row by `field`."""
+        values = self.column(field)
+        order = np.argsort(-values if descending else values, kind='stable')
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(1, len(order) + 1)
+        return ranks
+
+    def records(self):
+        """The original ticker dicts for this table's rows."""
+        return self.rows.tolist()
+
+    def symbols(self):
+        return self.symbols_array.tolist()
+
+    def base_assets(self, quote='USDT'):
+        """Symbols with the quote asset suffix removed."""
+        return [symbol[:-len(quote)] for symbol in self.symbols_array.tolist()]
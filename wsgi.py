@@ -0,0 +1,11 @@
+"""
+Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every worker imports this module and serves requests; exactly one of them
+(elected through SCHEDULER_LOCK_FILE) also runs the background jobs.
+"""
+from app import app, start_background_jobs
+
+start_background_jobs()